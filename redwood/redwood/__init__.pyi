@@ -4,12 +4,45 @@ from pathlib import Path
 from typing import BinaryIO
 
 def generate_source_key_pair(passphrase: str, email: str) -> tuple[str, str, str]: ...
+def generate_unbound_key_pair(passphrase: str) -> tuple[str, str]: ...
+def bind_source_key_pair(
+    secret_key: str, unbound_passphrase: str, passphrase: str, email: str
+) -> tuple[str, str, str]: ...
 def is_valid_public_key(input: str) -> str: ...
 def is_valid_secret_key(input: str, passphrase: str) -> str: ...
 def encrypt_message(
-    recipients: list[str], plaintext: str, destination: Path, *, armor: bool = False
+    recipients: list[str | RecipientSet], plaintext: str, destination: Path, *, armor: bool = False
+) -> None: ...
+def encrypt_stream(
+    recipients: list[str | RecipientSet],
+    plaintext: BinaryIO,
+    destination: Path,
+    source_key: bytes | None = None,
+    source_iv: bytes | None = None,
+) -> None: ...
+def encrypt_many(
+    recipients: list[str | RecipientSet],
+    plaintexts: list[str | bytes],
+    destinations: list[Path],
+    threads: int | None = None,
+) -> None: ...
+def compress_and_encrypt_file(
+    recipients: list[str | RecipientSet],
+    source: Path,
+    filename: str,
+    destination: Path,
+    source_key: bytes | None = None,
+    source_iv: bytes | None = None,
 ) -> None: ...
-def encrypt_stream(recipients: list[str], plaintext: BinaryIO, destination: Path) -> None: ...
 def decrypt(ciphertext: bytes, secret_key: str, passphrase: str) -> bytes: ...
+def decrypt_many(
+    ciphertexts: list[bytes], secret_key: str, passphrase: str
+) -> list[bytes | RedwoodError]: ...
+def decrypt_stream(
+    ciphertext: Path | BinaryIO, destination: Path, secret_key: str, passphrase: str
+) -> None: ...
+
+class RecipientSet:
+    def __init__(self, recipients: list[str]) -> None: ...
 
 class RedwoodError(Exception): ...
@@ -1,15 +1,16 @@
 //! Decryption is much more complicated than encryption,
 //! This code is mostly lifted from https://docs.sequoia-pgp.org/sequoia_guide/chapter_02/index.html
 
-use crate::keys::secret_key_from_cert;
 use anyhow::anyhow;
-use sequoia_openpgp::crypto::{Password, SessionKey};
+use sequoia_openpgp::crypto::SessionKey;
+use sequoia_openpgp::packet::key::{SecretParts, UnspecifiedRole};
+use sequoia_openpgp::packet::Key;
 use sequoia_openpgp::parse::stream::*;
 use sequoia_openpgp::types::SymmetricAlgorithm;
 
 pub(crate) struct Helper<'a> {
-    pub(crate) secret: &'a sequoia_openpgp::Cert,
-    pub(crate) passphrase: &'a Password,
+    /// The secret encryption key, already unlocked with its passphrase
+    pub(crate) secret: &'a Key<SecretParts, UnspecifiedRole>,
 }
 
 impl<'a> VerificationHelper for Helper<'a> {
@@ -43,17 +44,14 @@ impl<'a> DecryptionHelper for Helper<'a> {
     where
         D: FnMut(SymmetricAlgorithm, &SessionKey) -> bool,
     {
-        let key = secret_key_from_cert(self.secret)?;
+        let key = self.secret;
 
         for pkesk in pkesks {
             // Note: this check won't work for messages encrypted with --throw-keyids,
             // but we don't generate any messages that use it.
             if pkesk.recipient() == &key.keyid() {
-                // Decrypt the secret key with the specified passphrase.
-                let mut pair = key
-                    .clone()
-                    .decrypt_secret(self.passphrase)?
-                    .into_keypair()?;
+                // The secret key was already unlocked by the caller.
+                let mut pair = key.clone().into_keypair()?;
                 pkesk
                     .decrypt(&mut pair, sym_algo)
                     .map(|(algo, session_key)| decrypt(algo, &session_key));
@@ -1,20 +1,26 @@
 #![deny(clippy::all)]
 
+use flate2::{Compression, GzBuilder};
 use pyo3::create_exception;
 use pyo3::exceptions::PyException;
 use pyo3::prelude::*;
+use pyo3::types::PyBytes;
 use sequoia_openpgp::cert::{CertBuilder, CipherSuite};
 use sequoia_openpgp::crypto::Password;
+use sequoia_openpgp::packet::key::{SecretParts, UnspecifiedRole};
+use sequoia_openpgp::packet::signature::SignatureBuilder;
+use sequoia_openpgp::packet::{Key, UserID};
 use sequoia_openpgp::parse::{stream::DecryptorBuilder, Parse};
 use sequoia_openpgp::policy::StandardPolicy;
 use sequoia_openpgp::serialize::{
     stream::{Armorer, Encryptor2 as Encryptor, LiteralWriter, Message},
     SerializeInto,
 };
-use sequoia_openpgp::Cert;
+use sequoia_openpgp::types::SignatureType;
+use sequoia_openpgp::{Cert, Packet};
 use std::borrow::Cow;
 use std::fs::File;
-use std::io::{self, BufWriter, Read, Write};
+use std::io::{self, BufReader, BufWriter, Read, Write};
 use std::path::{Path, PathBuf};
 use std::str::FromStr;
 use std::string::FromUtf8Error;
@@ -22,10 +28,18 @@ use std::time::{Duration, SystemTime};
 
 mod decryption;
 mod keys;
+mod recipients;
+mod secure_tempfile;
 mod stream;
 
+use recipients::PublicKey;
+pub use recipients::{Recipient, RecipientSet};
+
 const STANDARD_POLICY: &StandardPolicy = &StandardPolicy::new();
 
+/// How much plaintext `decrypt_stream()` holds in memory at once
+const DECRYPT_STREAM_BUFFER_SIZE: usize = 64 * 1024;
+
 #[derive(thiserror::Error, Debug)]
 pub enum Error {
     #[error("OpenPGP error: {0}")]
@@ -38,6 +52,10 @@ pub enum Error {
     NoSupportedKeys(String),
     #[error("Contains secret key material")]
     HasSecretKeyMaterial,
+    #[error("OpenSSL error: {0}")]
+    OpenSsl(#[from] openssl::error::ErrorStack),
+    #[error("Got {0} plaintexts but {1} destinations")]
+    LengthMismatch(usize, usize),
 }
 
 create_exception!(redwood, RedwoodError, PyException);
@@ -62,20 +80,107 @@ const KEY_CREATION_SECONDS_FROM_EPOCH: u64 = 1368507600;
 /// A Python module implemented in Rust.
 #[pymodule]
 fn redwood(py: Python, m: &PyModule) -> PyResult<()> {
-    m.add_function(wrap_pyfunction!(generate_source_key_pair, m)?)?;
+    m.add_function(wrap_pyfunction!(py_generate_source_key_pair, m)?)?;
+    m.add_function(wrap_pyfunction!(py_generate_unbound_key_pair, m)?)?;
+    m.add_function(wrap_pyfunction!(py_bind_source_key_pair, m)?)?;
     m.add_function(wrap_pyfunction!(is_valid_public_key, m)?)?;
-    m.add_function(wrap_pyfunction!(is_valid_secret_key, m)?)?;
-    m.add_function(wrap_pyfunction!(encrypt_message, m)?)?;
+    m.add_function(wrap_pyfunction!(py_is_valid_secret_key, m)?)?;
+    m.add_function(wrap_pyfunction!(py_encrypt_message, m)?)?;
     m.add_function(wrap_pyfunction!(encrypt_stream, m)?)?;
-    m.add_function(wrap_pyfunction!(decrypt, m)?)?;
+    m.add_function(wrap_pyfunction!(encrypt_many, m)?)?;
+    m.add_function(wrap_pyfunction!(compress_and_encrypt_file, m)?)?;
+    m.add_function(wrap_pyfunction!(py_decrypt, m)?)?;
+    m.add_function(wrap_pyfunction!(decrypt_many, m)?)?;
+    m.add_function(wrap_pyfunction!(decrypt_stream, m)?)?;
+    m.add_class::<RecipientSet>()?;
     m.add("RedwoodError", py.get_type::<RedwoodError>())?;
     Ok(())
 }
 
+// The following functions are exposed to Python under the name of the
+// function they wrap. Once their arguments have been converted to Rust types,
+// they run the (slow) public key operations without holding the GIL, so other
+// Python threads can keep running in the meantime.
+
+#[pyfunction]
+#[pyo3(name = "generate_source_key_pair")]
+fn py_generate_source_key_pair(
+    py: Python,
+    passphrase: &str,
+    email: &str,
+) -> Result<(String, String, String)> {
+    py.allow_threads(|| generate_source_key_pair(passphrase, email))
+}
+
+#[pyfunction]
+#[pyo3(name = "generate_unbound_key_pair")]
+fn py_generate_unbound_key_pair(
+    py: Python,
+    passphrase: &str,
+) -> Result<(String, String)> {
+    py.allow_threads(|| generate_unbound_key_pair(passphrase))
+}
+
+#[pyfunction]
+#[pyo3(name = "bind_source_key_pair")]
+fn py_bind_source_key_pair(
+    py: Python,
+    secret_key: &str,
+    unbound_passphrase: String,
+    passphrase: String,
+    email: &str,
+) -> Result<(String, String, String)> {
+    py.allow_threads(|| {
+        bind_source_key_pair(secret_key, unbound_passphrase, passphrase, email)
+    })
+}
+
+#[pyfunction]
+#[pyo3(name = "is_valid_secret_key")]
+fn py_is_valid_secret_key(
+    py: Python,
+    input: &str,
+    passphrase: String,
+) -> Result<String> {
+    py.allow_threads(|| is_valid_secret_key(input, passphrase))
+}
+
+#[pyfunction]
+#[pyo3(name = "encrypt_message")]
+fn py_encrypt_message(
+    py: Python,
+    recipients: Vec<Recipient>,
+    plaintext: String,
+    destination: PathBuf,
+    armor: Option<bool>,
+) -> Result<()> {
+    py.allow_threads(|| {
+        encrypt_message(recipients, plaintext, destination, armor)
+    })
+}
+
+#[pyfunction]
+#[pyo3(name = "decrypt")]
+fn py_decrypt(
+    py: Python,
+    ciphertext: Vec<u8>,
+    secret_key: String,
+    passphrase: String,
+) -> Result<Cow<'static, [u8]>> {
+    py.allow_threads(|| decrypt(ciphertext, secret_key, passphrase))
+}
+
+/// All reply keypairs will be "created" on the same day, 2013-05-14
+fn key_creation_time() -> SystemTime {
+    SystemTime::UNIX_EPOCH
+        .checked_add(Duration::from_secs(KEY_CREATION_SECONDS_FROM_EPOCH))
+        // unwrap: Safe because the value is fixed and we know it won't overflow
+        .unwrap()
+}
+
 /// Generate a new PGP key pair using the given email (user ID) and protected
 /// with the specified passphrase.
 /// Returns the public key, private key, and 40-character fingerprint
-#[pyfunction]
 pub fn generate_source_key_pair(
     passphrase: &str,
     email: &str,
@@ -83,15 +188,7 @@ pub fn generate_source_key_pair(
     let (cert, _revocation) = CertBuilder::new()
         .set_cipher_suite(CipherSuite::RSA4k)
         .add_userid(format!("Source Key <{}>", email))
-        .set_creation_time(
-            // All reply keypairs will be "created" on the same day, 2013-05-14
-            SystemTime::UNIX_EPOCH
-                .checked_add(Duration::from_secs(
-                    KEY_CREATION_SECONDS_FROM_EPOCH,
-                ))
-                // unwrap: Safe because the value is fixed and we know it won't overflow
-                .unwrap(),
-        )
+        .set_creation_time(key_creation_time())
         .add_storage_encryption_subkey()
         .set_password(Some(passphrase.into()))
         .generate()?;
@@ -100,6 +197,78 @@ pub fn generate_source_key_pair(
     Ok((public_key, secret_key, format!("{}", cert.fingerprint())))
 }
 
+/// Generate a new PGP key pair that isn't bound to any source (it has no user
+/// ID), protected with the specified passphrase. It can be assigned to a
+/// source later on with `bind_source_key_pair()`.
+/// Returns the private key and 40-character fingerprint
+pub fn generate_unbound_key_pair(passphrase: &str) -> Result<(String, String)> {
+    let (cert, _revocation) = CertBuilder::new()
+        .set_cipher_suite(CipherSuite::RSA4k)
+        .set_creation_time(key_creation_time())
+        .add_storage_encryption_subkey()
+        .set_password(Some(passphrase.into()))
+        .generate()?;
+    let secret_key = String::from_utf8(cert.as_tsk().armored().to_vec()?)?;
+    Ok((secret_key, format!("{}", cert.fingerprint())))
+}
+
+/// Assign a key pair generated by `generate_unbound_key_pair()` to a source:
+/// add the given email (user ID) to it, and protect it with the source's
+/// passphrase instead of the one it was generated with.
+/// Returns the public key, private key, and 40-character fingerprint, just like
+/// `generate_source_key_pair()`
+pub fn bind_source_key_pair(
+    secret_key: &str,
+    unbound_passphrase: String,
+    passphrase: String,
+    email: &str,
+) -> Result<(String, String, String)> {
+    let cert = Cert::from_str(secret_key)?;
+    let unbound_passphrase: Password = unbound_passphrase.into();
+    let passphrase: Password = passphrase.into();
+
+    // Certify the user ID with the primary key, re-using the preferences of
+    // the key's direct key signature and backdating it like the rest of the key
+    let mut signer = cert
+        .primary_key()
+        .key()
+        .clone()
+        .parts_into_secret()?
+        .decrypt_secret(&unbound_passphrase)?
+        .into_keypair()?;
+    let template: SignatureBuilder = cert
+        .with_policy(STANDARD_POLICY, None)?
+        .direct_key_signature()?
+        .clone()
+        .into();
+    let template = template
+        .set_type(SignatureType::PositiveCertification)
+        .set_signature_creation_time(key_creation_time())?;
+    let userid = UserID::from(format!("Source Key <{}>", email));
+    let binding = userid.bind(&mut signer, &cert, template)?;
+
+    // Re-protect all the secret keys with the source's passphrase
+    let mut packets: Vec<Packet> = vec![userid.into(), binding.into()];
+    for key in cert.keys().secret() {
+        let is_primary = key.primary();
+        let key = key
+            .key()
+            .clone()
+            .decrypt_secret(&unbound_passphrase)?
+            .encrypt_secret(&passphrase)?;
+        packets.push(if is_primary {
+            key.role_into_primary().into()
+        } else {
+            key.role_into_subordinate().into()
+        });
+    }
+    let cert = cert.insert_packets(packets)?;
+
+    let public_key = String::from_utf8(cert.armored().to_vec()?)?;
+    let secret_key = String::from_utf8(cert.as_tsk().armored().to_vec()?)?;
+    Ok((public_key, secret_key, format!("{}", cert.fingerprint())))
+}
+
 #[pyfunction]
 pub fn is_valid_public_key(input: &str) -> Result<String> {
     let cert = Cert::from_str(input)?;
@@ -112,7 +281,6 @@ pub fn is_valid_public_key(input: &str) -> Result<String> {
     Ok(cert.fingerprint().to_string())
 }
 
-#[pyfunction]
 pub fn is_valid_secret_key(input: &str, passphrase: String) -> Result<String> {
     let passphrase: Password = passphrase.into();
     let cert = Cert::from_str(input)?;
@@ -122,51 +290,219 @@ pub fn is_valid_secret_key(input: &str, passphrase: String) -> Result<String> {
 }
 
 /// Encrypt a message (text) for the specified recipients. The list of
-/// recipients is a set of PGP public keys. The encrypted message will
-/// be written to `destination`.
-#[pyfunction]
+/// recipients is a set of PGP public keys and/or `RecipientSet`s. The
+/// encrypted message will be written to `destination`.
 pub fn encrypt_message(
-    recipients: Vec<String>,
+    recipients: Vec<Recipient>,
     plaintext: String,
     destination: PathBuf,
     armor: Option<bool>,
 ) -> Result<()> {
     let plaintext = plaintext.as_bytes();
-    encrypt(&recipients, plaintext, &destination, armor)
+    let keys = recipients::recipient_keys(&recipients)?;
+    encrypt(&keys, plaintext, &destination, armor)
 }
 
 /// Encrypt a Python stream (`typing.BinaryIO`) for the specified recipients.
-/// The list of recipients is a set of PGP public keys. The encrypted file
-/// will be written to `destination`.
+/// The list of recipients is a set of PGP public keys and/or `RecipientSet`s.
+/// The encrypted file will be written to `destination`.
+///
+/// In-memory streams and regular files are read natively and encrypted without
+/// holding the GIL, other streams are read through their `.read()` method.
+///
+/// If `source_key` and `source_iv` are given, the stream must be a Python
+/// `SecureTemporaryFile` that was prepared with `prepare_native_read()`: its
+/// file is read directly and decrypted natively.
 #[pyfunction]
 pub fn encrypt_stream(
-    recipients: Vec<String>,
+    py: Python,
+    recipients: Vec<Recipient>,
     plaintext: &PyAny,
     destination: PathBuf,
+    source_key: Option<Vec<u8>>,
+    source_iv: Option<Vec<u8>>,
+) -> Result<()> {
+    let reader: Option<Box<dyn Read + Send>> = match (source_key, source_iv) {
+        (Some(key), Some(iv)) => {
+            let file = stream::file_from_py(plaintext)?;
+            Some(Box::new(secure_tempfile::SecureTempFileReader::new(
+                file, &key, &iv,
+            )?))
+        }
+        _ => stream::native_reader(plaintext)?,
+    };
+    match reader {
+        Some(reader) => py.allow_threads(|| {
+            let keys = recipients::recipient_keys(&recipients)?;
+            encrypt(&keys, reader, &destination, None)
+        }),
+        None => {
+            let stream = stream::Stream { reader: plaintext };
+            let keys = recipients::recipient_keys(&recipients)?;
+            encrypt(&keys, stream, &destination, None)
+        }
+    }
+}
+
+/// A plaintext passed in from Python, either as text or as bytes.
+#[derive(FromPyObject)]
+pub enum Plaintext<'a> {
+    Text(String),
+    Bytes(&'a PyBytes),
+}
+
+impl Plaintext<'_> {
+    fn into_bytes(self) -> Vec<u8> {
+        match self {
+            Plaintext::Text(text) => text.into_bytes(),
+            Plaintext::Bytes(bytes) => bytes.as_bytes().to_vec(),
+        }
+    }
+}
+
+/// Encrypt several plaintexts (text or bytes) for the same recipients, with
+/// the recipients' keys only being parsed and selected once. The list of
+/// recipients is a set of PGP public keys and/or `RecipientSet`s. Each
+/// plaintext is written, encrypted, to the destination at the same position
+/// in `destinations`.
+///
+/// The work is spread across up to `threads` native threads (one by default),
+/// without holding the GIL. If any plaintext fails to be encrypted, an error
+/// is raised once all the others have been processed.
+#[pyfunction]
+pub fn encrypt_many(
+    py: Python,
+    recipients: Vec<Recipient>,
+    plaintexts: Vec<Plaintext>,
+    destinations: Vec<PathBuf>,
+    threads: Option<usize>,
+) -> Result<()> {
+    let plaintexts: Vec<Vec<u8>> =
+        plaintexts.into_iter().map(Plaintext::into_bytes).collect();
+    py.allow_threads(|| {
+        let keys = recipients::recipient_keys(&recipients)?;
+        encrypt_all(&keys, &plaintexts, &destinations, threads.unwrap_or(1))
+    })
+}
+
+/// Helper function to encrypt several plaintexts, see `encrypt_many()`.
+fn encrypt_all(
+    recipient_keys: &[PublicKey],
+    plaintexts: &[Vec<u8>],
+    destinations: &[PathBuf],
+    threads: usize,
+) -> Result<()> {
+    if plaintexts.len() != destinations.len() {
+        return Err(Error::LengthMismatch(
+            plaintexts.len(),
+            destinations.len(),
+        ));
+    }
+    let jobs: Vec<_> = plaintexts.iter().zip(destinations).collect();
+    let encrypt_jobs = |jobs: &[(&Vec<u8>, &PathBuf)]| -> Result<()> {
+        let mut result = Ok(());
+        for (plaintext, destination) in jobs {
+            let job_result = encrypt(
+                recipient_keys,
+                plaintext.as_slice(),
+                destination,
+                None,
+            );
+            if result.is_ok() {
+                result = job_result;
+            }
+        }
+        result
+    };
+
+    if threads <= 1 || jobs.len() <= 1 {
+        return encrypt_jobs(&jobs);
+    }
+    let chunk_size = jobs.len().div_ceil(threads);
+    let encrypt_jobs = &encrypt_jobs;
+    std::thread::scope(|scope| {
+        let handles: Vec<_> = jobs
+            .chunks(chunk_size)
+            .map(|chunk| scope.spawn(move || encrypt_jobs(chunk)))
+            .collect();
+        // Wait for all the threads before reporting the first error, if any
+        let results: Vec<Result<()>> = handles
+            .into_iter()
+            .map(|handle| handle.join().expect("encryption thread panicked"))
+            .collect();
+        results.into_iter().collect()
+    })
+}
+
+/// Compress the file at `source` with gzip, recording `filename` as the
+/// original file name in the gzip header, and encrypt it for the specified
+/// recipients. The list of recipients is a set of PGP public keys and/or
+/// `RecipientSet`s. The encrypted file will be written to `destination`.
+///
+/// If `source_key` and `source_iv` are given, the file at `source` was written
+/// by a Python `SecureTemporaryFile` and is decrypted while it's being read.
+///
+/// The file is read, compressed and encrypted without holding the GIL.
+#[pyfunction]
+pub fn compress_and_encrypt_file(
+    py: Python,
+    recipients: Vec<Recipient>,
+    source: PathBuf,
+    filename: String,
+    destination: PathBuf,
+    source_key: Option<Vec<u8>>,
+    source_iv: Option<Vec<u8>>,
+) -> Result<()> {
+    py.allow_threads(|| {
+        let source_key_iv = match (&source_key, &source_iv) {
+            (Some(key), Some(iv)) => Some((key.as_slice(), iv.as_slice())),
+            _ => None,
+        };
+        let keys = recipients::recipient_keys(&recipients)?;
+        compress_and_encrypt(
+            &keys,
+            &source,
+            &filename,
+            &destination,
+            source_key_iv,
+        )
+    })
+}
+
+/// Helper function to compress and encrypt a file, see
+/// `compress_and_encrypt_file()`.
+fn compress_and_encrypt(
+    recipient_keys: &[PublicKey],
+    source: &Path,
+    filename: &str,
+    destination: &Path,
+    source_key_iv: Option<(&[u8], &[u8])>,
 ) -> Result<()> {
-    let stream = stream::Stream { reader: plaintext };
-    encrypt(&recipients, stream, &destination, None)
+    let file = BufReader::new(File::open(source)?);
+    let plaintext: Box<dyn Read> = match source_key_iv {
+        Some((key, iv)) => {
+            Box::new(secure_tempfile::SecureTempFileReader::new(file, key, iv)?)
+        }
+        None => Box::new(file),
+    };
+    // Like Python's gzip module, don't record a ".gz" extension in the header
+    let filename = filename.strip_suffix(".gz").unwrap_or(filename);
+    let compressed = GzBuilder::new()
+        .filename(filename)
+        .mtime(0)
+        .read(plaintext, Compression::best());
+    encrypt(recipient_keys, compressed, destination, None)
 }
 
 /// Helper function to encrypt readable things.
 ///
 /// This is largely based on <https://gitlab.com/sequoia-pgp/sequoia/-/blob/main/guide/src/chapter_02.md>.
 fn encrypt(
-    recipients: &[String],
+    recipient_keys: &[PublicKey],
     mut plaintext: impl Read,
     destination: &Path,
     armor: Option<bool>,
 ) -> Result<()> {
-    let mut certs = vec![];
-    let mut recipient_keys = vec![];
-    for recipient in recipients {
-        certs.push(Cert::from_str(recipient)?);
-    }
-
-    for cert in certs.iter() {
-        recipient_keys.extend(keys::keys_from_cert(STANDARD_POLICY, cert)?);
-    }
-
     // In reverse order, we set up a writer that will write an encrypted and
     // armored message to a newly-created file at `destination`.
     // TODO: Use `File::create_new()` once it's stabilized: https://github.com/rust-lang/rust/issues/105135
@@ -182,7 +518,8 @@ fn encrypt(
     } else {
         message
     };
-    let message = Encryptor::for_recipients(message, recipient_keys).build()?;
+    let message =
+        Encryptor::for_recipients(message, recipient_keys.iter()).build()?;
     let mut message = LiteralWriter::new(message).build()?;
 
     // Feed the plaintext into the writer for encryption and writing to disk
@@ -198,28 +535,150 @@ fn encrypt(
 /// Given a ciphertext, private key, and passphrase, unlock the private key with
 /// the passphrase, and use it to decrypt the ciphertext. Arbitrary bytes are
 /// returned, which may or may not be valid UTF-8.
-#[pyfunction]
 pub fn decrypt(
     ciphertext: Vec<u8>,
     secret_key: String,
     passphrase: String,
 ) -> Result<Cow<'static, [u8]>> {
-    let recipient = Cert::from_str(&secret_key)?;
-    let passphrase: Password = passphrase.into();
-    let helper = decryption::Helper {
-        secret: &recipient,
-        passphrase: &passphrase,
+    let secret = unlock_secret_key(&secret_key, passphrase)?;
+    // pyo3 maps Cow<[u8]> to Python's bytes
+    Ok(Cow::from(decrypt_with_key(&ciphertext, &secret)?))
+}
+
+/// Given a list of ciphertexts, private key, and passphrase, unlock the private
+/// key with the passphrase once, and use it to decrypt each of the ciphertexts.
+///
+/// A list with one entry per ciphertext is returned, in the same order: either
+/// the decrypted bytes, or a `RedwoodError` instance if that ciphertext could
+/// not be decrypted. An error is raised if the key itself can't be unlocked.
+///
+/// The decryption happens without holding the GIL.
+#[pyfunction]
+pub fn decrypt_many(
+    py: Python,
+    ciphertexts: Vec<Vec<u8>>,
+    secret_key: String,
+    passphrase: String,
+) -> Result<Vec<PyObject>> {
+    let plaintexts = py
+        .allow_threads(|| decrypt_all(&ciphertexts, &secret_key, passphrase))?;
+    Ok(plaintexts
+        .into_iter()
+        .map(|plaintext| match plaintext {
+            Ok(plaintext) => PyBytes::new(py, &plaintext).into_py(py),
+            Err(err) => PyErr::from(err).value(py).into_py(py),
+        })
+        .collect())
+}
+
+/// A ciphertext passed in from Python, either as the path of a file or as a
+/// file object backed by a file descriptor.
+#[derive(FromPyObject)]
+pub enum Ciphertext<'a> {
+    Path(PathBuf),
+    File(&'a PyAny),
+}
+
+/// Given a ciphertext, private key, and passphrase, unlock the private key with
+/// the passphrase, and use it to decrypt the ciphertext into a newly-created
+/// file at `destination`.
+///
+/// The ciphertext can be the path of a file, or a Python file object backed by
+/// a file descriptor, which is read from its current position. It is decrypted
+/// incrementally, so memory usage doesn't depend on its size, and without
+/// holding the GIL. If decryption fails, no file is left at `destination`.
+#[pyfunction]
+pub fn decrypt_stream(
+    py: Python,
+    ciphertext: Ciphertext,
+    destination: PathBuf,
+    secret_key: String,
+    passphrase: String,
+) -> Result<()> {
+    let ciphertext = match ciphertext {
+        Ciphertext::Path(path) => File::open(path)?,
+        Ciphertext::File(file) => stream::file_from_py(file)?,
     };
+    py.allow_threads(|| {
+        let secret = unlock_secret_key(&secret_key, passphrase)?;
+        decrypt_to_file(ciphertext, &destination, &secret)
+    })
+}
 
-    // Now, create a decryptor with a helper using the given Certs.
-    let mut decryptor = DecryptorBuilder::from_bytes(&ciphertext)?
-        .with_policy(STANDARD_POLICY, None, helper)?;
+/// Helper function to decrypt a ciphertext into a file with an already
+/// unlocked key, see `decrypt_stream()`.
+fn decrypt_to_file(
+    ciphertext: impl Read + Send + Sync,
+    destination: &Path,
+    secret: &Key<SecretParts, UnspecifiedRole>,
+) -> Result<()> {
+    let sink = File::options()
+        .write(true)
+        .create_new(true)
+        .open(destination)?;
+    let result: Result<()> = (|| {
+        let helper = decryption::Helper { secret };
+        // We don't verify signatures, so there's no need to hold back
+        // plaintext until the end of the message has been seen
+        let mut decryptor = DecryptorBuilder::from_reader(ciphertext)?
+            .buffer_size(DECRYPT_STREAM_BUFFER_SIZE)
+            .with_policy(STANDARD_POLICY, None, helper)?;
+        let mut writer = BufWriter::new(sink);
+        io::copy(&mut decryptor, &mut writer)?;
+        writer.flush()?;
+        Ok(())
+    })();
+    if result.is_err() {
+        // Don't leave unauthenticated or partial plaintext behind
+        let _ = std::fs::remove_file(destination);
+    }
+    result
+}
+
+/// Helper function to decrypt several ciphertexts with the same secret key,
+/// which is only parsed and unlocked once.
+fn decrypt_all(
+    ciphertexts: &[Vec<u8>],
+    secret_key: &str,
+    passphrase: String,
+) -> Result<Vec<Result<Vec<u8>>>> {
+    let secret = unlock_secret_key(secret_key, passphrase)?;
+    Ok(ciphertexts
+        .iter()
+        .map(|ciphertext| decrypt_with_key(ciphertext, &secret))
+        .collect())
+}
+
+/// Parse the armored secret key and unlock its encryption key with the
+/// passphrase.
+fn unlock_secret_key(
+    secret_key: &str,
+    passphrase: String,
+) -> Result<Key<SecretParts, UnspecifiedRole>> {
+    let recipient = Cert::from_str(secret_key)?;
+    let passphrase: Password = passphrase.into();
+    let secret = keys::secret_key_from_cert(&recipient)?;
+    Ok(secret.decrypt_secret(&passphrase)?)
+}
+
+/// Helper function to decrypt a ciphertext with an already unlocked key.
+fn decrypt_with_key(
+    ciphertext: &[u8],
+    secret: &Key<SecretParts, UnspecifiedRole>,
+) -> Result<Vec<u8>> {
+    let helper = decryption::Helper { secret };
+
+    // Now, create a decryptor with a helper using the given key.
+    let mut decryptor = DecryptorBuilder::from_bytes(ciphertext)?.with_policy(
+        STANDARD_POLICY,
+        None,
+        helper,
+    )?;
 
     // Decrypt the data.
     let mut buffer: Vec<u8> = vec![];
     io::copy(&mut decryptor, &mut buffer)?;
-    // pyo3 maps Cow<[u8]> to Python's bytes
-    Ok(Cow::from(buffer))
+    Ok(buffer)
 }
 
 #[cfg(test)]
@@ -253,6 +712,71 @@ mod tests {
         assert_eq!(format!("{}", cert.fingerprint()), fingerprint);
     }
 
+    #[test]
+    fn test_bind_source_key_pair() {
+        let (unbound_secret_key, unbound_fingerprint) =
+            generate_unbound_key_pair("pool passphrase").unwrap();
+        let unbound_cert = Cert::from_str(&unbound_secret_key).unwrap();
+        assert_eq!(unbound_cert.userids().count(), 0);
+
+        let (public_key, secret_key, fingerprint) = bind_source_key_pair(
+            &unbound_secret_key,
+            "pool passphrase".to_string(),
+            PASSPHRASE.to_string(),
+            "foo@example.org",
+        )
+        .unwrap();
+        // It's the same key, now with the source's user ID
+        assert_eq!(fingerprint, unbound_fingerprint);
+        assert_eq!(is_valid_public_key(&public_key).unwrap(), fingerprint);
+        assert!(public_key.contains("Comment: Source Key <foo@example.org>"));
+        let cert = Cert::from_str(&public_key).unwrap();
+        let valid_cert = cert.with_policy(STANDARD_POLICY, None).unwrap();
+        let userid = valid_cert.primary_userid().unwrap();
+        assert_eq!(
+            userid.binding_signature().signature_creation_time(),
+            Some(key_creation_time())
+        );
+
+        // And it's only protected by the source's passphrase now
+        assert_eq!(
+            is_valid_secret_key(&secret_key, PASSPHRASE.to_string()).unwrap(),
+            fingerprint
+        );
+        assert!(is_valid_secret_key(
+            &secret_key,
+            "pool passphrase".to_string()
+        )
+        .is_err());
+
+        // Messages encrypted to it can be decrypted by the source
+        let tmp_dir = TempDir::new().unwrap();
+        let tmp = tmp_dir.path().join("message.asc");
+        encrypt_message(
+            vec![public_key.into()],
+            SECRET_MESSAGE.to_string(),
+            tmp.clone(),
+            None,
+        )
+        .unwrap();
+        let ciphertext = std::fs::read(tmp).unwrap();
+        let plaintext =
+            decrypt(ciphertext, secret_key, PASSPHRASE.to_string()).unwrap();
+        assert_eq!(
+            SECRET_MESSAGE,
+            String::from_utf8(plaintext.to_vec()).unwrap()
+        );
+
+        // It can't be bound without the passphrase it was generated with
+        assert!(bind_source_key_pair(
+            &unbound_secret_key,
+            "wrong passphrase".to_string(),
+            PASSPHRASE.to_string(),
+            "foo@example.org",
+        )
+        .is_err());
+    }
+
     #[test]
     fn test_is_valid_public_key() {
         let (good_key, secret_key, fingerprint) =
@@ -315,7 +839,7 @@ mod tests {
         );
 
         let err = encrypt_message(
-            vec![good_key, BAD_KEY.to_string()],
+            vec![good_key.into(), BAD_KEY.to_string().into()],
             SECRET_MESSAGE.to_string(),
             tmp_dir.path().join("message.asc"),
             None,
@@ -363,7 +887,7 @@ mod tests {
         println!("{}", tmp.to_string_lossy());
         // Encrypt a message to keys 1 and 2 but not 3
         encrypt_message(
-            vec![public_key1, public_key2],
+            vec![public_key1.into(), public_key2.into()],
             SECRET_MESSAGE.to_string(),
             tmp.clone(),
             None,
@@ -397,6 +921,256 @@ mod tests {
         );
     }
 
+    #[test]
+    fn test_recipient_set() {
+        let (public_key1, secret_key1, _) =
+            generate_source_key_pair(PASSPHRASE, "foo1@example.org").unwrap();
+        let (public_key2, secret_key2, _) =
+            generate_source_key_pair(PASSPHRASE, "foo2@example.org").unwrap();
+        let recipient_set = RecipientSet::new(vec![public_key1]).unwrap();
+
+        let tmp_dir = TempDir::new().unwrap();
+        // A recipient set can be reused, and mixed with other recipients
+        for i in 0..2 {
+            let tmp = tmp_dir.path().join(format!("message{i}.asc"));
+            encrypt_message(
+                vec![
+                    Recipient::Set(recipient_set.clone()),
+                    public_key2.clone().into(),
+                ],
+                SECRET_MESSAGE.to_string(),
+                tmp.clone(),
+                None,
+            )
+            .unwrap();
+            let ciphertext = std::fs::read(tmp).unwrap();
+            for secret_key in [&secret_key1, &secret_key2] {
+                let plaintext = decrypt(
+                    ciphertext.clone(),
+                    secret_key.clone(),
+                    PASSPHRASE.to_string(),
+                )
+                .unwrap();
+                assert_eq!(SECRET_MESSAGE.as_bytes(), plaintext.as_ref());
+            }
+        }
+
+        // Invalid keys are rejected when creating the set
+        let err = RecipientSet::new(vec![BAD_KEY.to_string()]).unwrap_err();
+        assert_eq!(
+            err.to_string(),
+            format!(
+                "No supported keys for certificate {}",
+                BAD_KEY_FINGERPRINT
+            )
+        );
+    }
+
+    #[test]
+    fn test_decrypt_all() {
+        let (public_key1, secret_key1, _) =
+            generate_source_key_pair(PASSPHRASE, "foo1@example.org").unwrap();
+        let (public_key2, _secret_key2, _) =
+            generate_source_key_pair(PASSPHRASE, "foo2@example.org").unwrap();
+
+        let tmp_dir = TempDir::new().unwrap();
+        let mut ciphertexts = vec![];
+        // Encrypt two messages to key 1 and one to key 2
+        for (i, recipient) in [&public_key1, &public_key2, &public_key1]
+            .iter()
+            .enumerate()
+        {
+            let tmp = tmp_dir.path().join(format!("message{i}.asc"));
+            encrypt_message(
+                vec![recipient.to_string().into()],
+                format!("{SECRET_MESSAGE} {i}"),
+                tmp.clone(),
+                None,
+            )
+            .unwrap();
+            ciphertexts.push(std::fs::read(tmp).unwrap());
+        }
+
+        // Decrypt all of them as key 1
+        let plaintexts =
+            decrypt_all(&ciphertexts, &secret_key1, PASSPHRASE.to_string())
+                .unwrap();
+        assert_eq!(plaintexts.len(), 3);
+        assert_eq!(
+            format!("{SECRET_MESSAGE} 0"),
+            String::from_utf8(plaintexts[0].as_ref().unwrap().to_vec())
+                .unwrap()
+        );
+        // The message for key 2 fails on its own
+        assert_eq!(
+            plaintexts[1].as_ref().unwrap_err().to_string(),
+            "OpenPGP error: no matching pkesk, wrong secret key provided?"
+        );
+        assert_eq!(
+            format!("{SECRET_MESSAGE} 2"),
+            String::from_utf8(plaintexts[2].as_ref().unwrap().to_vec())
+                .unwrap()
+        );
+
+        // A wrong passphrase fails for the whole batch
+        let err = decrypt_all(
+            &ciphertexts,
+            &secret_key1,
+            "not the correct passphrase".to_string(),
+        )
+        .unwrap_err();
+        assert_eq!(err.to_string(), "OpenPGP error: unexpected EOF");
+    }
+
+    #[test]
+    fn test_decrypt_to_file() {
+        let (public_key, secret_key, _) =
+            generate_source_key_pair(PASSPHRASE, "foo@example.org").unwrap();
+        let (_, other_secret_key, _) =
+            generate_source_key_pair(PASSPHRASE, "bar@example.org").unwrap();
+        let tmp_dir = TempDir::new().unwrap();
+        let tmp = tmp_dir.path().join("message.asc");
+        // Bigger than the buffer, to make sure it's streamed
+        let plaintext = SECRET_MESSAGE.repeat(100_000);
+        encrypt_message(
+            vec![public_key.into()],
+            plaintext.clone(),
+            tmp.clone(),
+            None,
+        )
+        .unwrap();
+
+        let secret =
+            unlock_secret_key(&secret_key, PASSPHRASE.to_string()).unwrap();
+        let destination = tmp_dir.path().join("message.txt");
+        decrypt_to_file(File::open(&tmp).unwrap(), &destination, &secret)
+            .unwrap();
+        assert_eq!(plaintext, std::fs::read_to_string(&destination).unwrap());
+
+        // The destination is never overwritten
+        let err =
+            decrypt_to_file(File::open(&tmp).unwrap(), &destination, &secret)
+                .unwrap_err();
+        assert!(matches!(err, Error::Io(_)));
+
+        // Nothing is left behind if decryption fails
+        let other_secret =
+            unlock_secret_key(&other_secret_key, PASSPHRASE.to_string())
+                .unwrap();
+        let destination = tmp_dir.path().join("other.txt");
+        let err = decrypt_to_file(
+            File::open(&tmp).unwrap(),
+            &destination,
+            &other_secret,
+        )
+        .unwrap_err();
+        assert_eq!(
+            err.to_string(),
+            "OpenPGP error: no matching pkesk, wrong secret key provided?"
+        );
+        assert!(!destination.exists());
+    }
+
+    #[test]
+    fn test_encrypt_all() {
+        let (public_key, secret_key, _) =
+            generate_source_key_pair(PASSPHRASE, "foo@example.org").unwrap();
+        let keys = recipients::recipient_keys(&[public_key.into()]).unwrap();
+        let plaintexts: Vec<Vec<u8>> = (0..5)
+            .map(|i| format!("{SECRET_MESSAGE} {i}").into_bytes())
+            .collect();
+
+        let tmp_dir = TempDir::new().unwrap();
+        for threads in [1, 2, 8] {
+            let destinations: Vec<PathBuf> = (0..5)
+                .map(|i| tmp_dir.path().join(format!("{threads}-{i}.asc")))
+                .collect();
+            encrypt_all(&keys, &plaintexts, &destinations, threads).unwrap();
+            for (plaintext, destination) in plaintexts.iter().zip(&destinations)
+            {
+                let ciphertext = std::fs::read(destination).unwrap();
+                let decrypted = decrypt(
+                    ciphertext,
+                    secret_key.clone(),
+                    PASSPHRASE.to_string(),
+                )
+                .unwrap();
+                assert_eq!(plaintext.as_slice(), decrypted.as_ref());
+            }
+        }
+
+        // Every plaintext needs a destination
+        let err = encrypt_all(&keys, &plaintexts, &[], 1).unwrap_err();
+        assert_eq!(err.to_string(), "Got 5 plaintexts but 0 destinations");
+
+        // Existing files are never overwritten, but the other plaintexts
+        // still get encrypted
+        let destinations: Vec<PathBuf> = (0..5)
+            .map(|i| tmp_dir.path().join(format!("again-{i}.asc")))
+            .collect();
+        std::fs::write(&destinations[2], "existing").unwrap();
+        let err =
+            encrypt_all(&keys, &plaintexts, &destinations, 2).unwrap_err();
+        assert!(matches!(err, Error::Io(_)));
+        assert_eq!(
+            std::fs::read_to_string(&destinations[2]).unwrap(),
+            "existing"
+        );
+        for i in [0, 1, 3, 4] {
+            assert!(destinations[i].exists());
+        }
+    }
+
+    #[test]
+    fn test_compress_and_encrypt() {
+        let (public_key, secret_key, _) =
+            generate_source_key_pair(PASSPHRASE, "foo@example.org").unwrap();
+        let plaintext = SECRET_MESSAGE.repeat(10_000).into_bytes();
+        let aes_key = [7u8; 32];
+        let aes_iv = [3u8; 16];
+        let spooled = openssl::symm::encrypt(
+            openssl::symm::Cipher::aes_256_ctr(),
+            &aes_key,
+            Some(&aes_iv),
+            &plaintext,
+        )
+        .unwrap();
+
+        let tmp_dir = TempDir::new().unwrap();
+        let cases: Vec<(&[u8], Option<(&[u8], &[u8])>)> = vec![
+            // A regular file
+            (plaintext.as_slice(), None),
+            // A file written by SecureTemporaryFile
+            (spooled.as_slice(), Some((&aes_key[..], &aes_iv[..]))),
+        ];
+        for (i, (contents, source_key_iv)) in cases.into_iter().enumerate() {
+            let source = tmp_dir.path().join(format!("source{i}"));
+            std::fs::write(&source, contents).unwrap();
+            let destination = tmp_dir.path().join(format!("doc{i}.gz.gpg"));
+            compress_and_encrypt(
+                &recipients::recipient_keys(&[public_key.clone().into()])
+                    .unwrap(),
+                &source,
+                "report.pdf",
+                &destination,
+                source_key_iv,
+            )
+            .unwrap();
+
+            let ciphertext = std::fs::read(destination).unwrap();
+            let compressed =
+                decrypt(ciphertext, secret_key.clone(), PASSPHRASE.to_string())
+                    .unwrap();
+            let mut decoder = flate2::read::GzDecoder::new(&compressed[..]);
+            let mut decompressed = vec![];
+            decoder.read_to_end(&mut decompressed).unwrap();
+            assert_eq!(plaintext, decompressed);
+            let header = decoder.header().unwrap();
+            assert_eq!(header.filename(), Some(&b"report.pdf"[..]));
+            assert_eq!(header.mtime(), 0);
+        }
+    }
+
     #[test]
     fn test_encryption_missing_malformed_recipient_key() {
         // Bad fingerprints can be: empty, empty string, or malformed
@@ -418,7 +1192,8 @@ mod tests {
         let tmp_dir = TempDir::new().unwrap();
         for (key, error) in bad_keys {
             let err = encrypt_message(
-                key, // missing or malformed recipient key
+                // missing or malformed recipient key
+                key.into_iter().map(Recipient::from).collect(),
                 "Look ma, no key".to_string(),
                 tmp_dir.path().join("message.asc"),
                 None,
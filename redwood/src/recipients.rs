@@ -0,0 +1,68 @@
+use crate::{keys, Result, STANDARD_POLICY};
+use pyo3::prelude::*;
+use sequoia_openpgp::packet::key::{PublicParts, UnspecifiedRole};
+use sequoia_openpgp::packet::Key;
+use sequoia_openpgp::Cert;
+use std::str::FromStr;
+
+pub(crate) type PublicKey = Key<PublicParts, UnspecifiedRole>;
+
+/// A set of recipients whose certificates have already been parsed and
+/// checked against the policy, so it can be reused to encrypt any number
+/// of messages without doing that work again.
+#[pyclass]
+#[derive(Clone)]
+pub struct RecipientSet {
+    keys: Vec<PublicKey>,
+}
+
+#[pymethods]
+impl RecipientSet {
+    /// Create a recipient set from a list of PGP public keys.
+    #[new]
+    pub fn new(recipients: Vec<String>) -> Result<Self> {
+        let mut keys = vec![];
+        for recipient in recipients {
+            keys.extend(encryption_keys(&recipient)?);
+        }
+        Ok(Self { keys })
+    }
+}
+
+/// A recipient passed in from Python, either as a PGP public key or as a
+/// `RecipientSet`.
+#[derive(Clone, FromPyObject)]
+pub enum Recipient {
+    Set(RecipientSet),
+    Cert(String),
+}
+
+impl From<String> for Recipient {
+    fn from(cert: String) -> Self {
+        Recipient::Cert(cert)
+    }
+}
+
+/// Get the encryption keys of all of the specified recipients.
+pub(crate) fn recipient_keys(
+    recipients: &[Recipient],
+) -> Result<Vec<PublicKey>> {
+    let mut keys = vec![];
+    for recipient in recipients {
+        match recipient {
+            Recipient::Set(set) => keys.extend(set.keys.iter().cloned()),
+            Recipient::Cert(cert) => keys.extend(encryption_keys(cert)?),
+        }
+    }
+    Ok(keys)
+}
+
+/// Parse a PGP public key and get its encryption keys.
+fn encryption_keys(recipient: &str) -> Result<Vec<PublicKey>> {
+    let cert = Cert::from_str(recipient)?;
+    let keys = keys::keys_from_cert(STANDARD_POLICY, &cert)?
+        .into_iter()
+        .map(|ka| ka.key().clone())
+        .collect();
+    Ok(keys)
+}
@@ -0,0 +1,72 @@
+use openssl::error::ErrorStack;
+use openssl::symm::{Cipher, Crypter, Mode};
+use std::io::{self, ErrorKind, Read};
+
+/// Reader for the contents of a file written by the Python
+/// `SecureTemporaryFile` class, which encrypts data with AES-256-CTR
+/// before it hits the disk. The contents are decrypted as they are read.
+pub(crate) struct SecureTempFileReader<R> {
+    inner: R,
+    crypter: Crypter,
+    ciphertext: Vec<u8>,
+}
+
+impl<R: Read> SecureTempFileReader<R> {
+    pub(crate) fn new(
+        inner: R,
+        key: &[u8],
+        iv: &[u8],
+    ) -> std::result::Result<Self, ErrorStack> {
+        let crypter =
+            Crypter::new(Cipher::aes_256_ctr(), Mode::Decrypt, key, Some(iv))?;
+        Ok(Self {
+            inner,
+            crypter,
+            ciphertext: vec![],
+        })
+    }
+}
+
+impl<R: Read> Read for SecureTempFileReader<R> {
+    fn read(&mut self, buf: &mut [u8]) -> io::Result<usize> {
+        self.ciphertext.resize(buf.len(), 0);
+        let len = self.inner.read(&mut self.ciphertext)?;
+        // CTR is a stream cipher, so the plaintext is exactly as long as the
+        // ciphertext and fits in `buf`
+        self.crypter
+            .update(&self.ciphertext[..len], buf)
+            .map_err(|err| io::Error::new(ErrorKind::Other, err))
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use openssl::symm::encrypt;
+
+    #[test]
+    fn test_secure_temp_file_reader() {
+        let key = [7u8; 32];
+        let iv = [3u8; 16];
+        let plaintext = "Rust is great 🦀".repeat(10_000).into_bytes();
+        let ciphertext =
+            encrypt(Cipher::aes_256_ctr(), &key, Some(&iv), &plaintext)
+                .unwrap();
+        assert_ne!(plaintext, ciphertext);
+
+        let mut reader =
+            SecureTempFileReader::new(ciphertext.as_slice(), &key, &iv)
+                .unwrap();
+        // Read in small, odd-sized chunks to exercise the counter handling
+        let mut decrypted = vec![];
+        let mut buf = [0u8; 7];
+        loop {
+            let len = reader.read(&mut buf).unwrap();
+            if len == 0 {
+                break;
+            }
+            decrypted.extend_from_slice(&buf[..len]);
+        }
+        assert_eq!(plaintext, decrypted);
+    }
+}
@@ -1,6 +1,8 @@
 use pyo3::types::PyBytes;
-use pyo3::{intern, PyAny, PyResult};
-use std::io::{self, ErrorKind, Read, Write};
+use pyo3::{intern, PyAny, PyErr, PyResult};
+use std::fs::File;
+use std::io::{self, ErrorKind, Read, Seek, SeekFrom, Write};
+use std::os::fd::{BorrowedFd, RawFd};
 
 /// Wrapper to implement the `Read` trait around a Python
 /// object that contains a `.read()` function.
@@ -30,3 +32,67 @@ impl Read for Stream<'_> {
         buf.write(bytes.as_bytes())
     }
 }
+
+/// Get a reader for a Python stream that doesn't go through Python (and so
+/// can be used without holding the GIL), if the kind of stream allows it:
+///
+/// * in-memory streams (`io.BytesIO`) are read in one go
+/// * regular files (`io.FileIO` and the buffered readers around it) are read
+///   directly from their file descriptor, from their current position
+///
+/// Other kinds of streams, including wrappers that expose the file descriptor
+/// of the data they transform (e.g. `gzip.GzipFile`), are not supported.
+pub(crate) fn native_reader(
+    obj: &PyAny,
+) -> io::Result<Option<Box<dyn Read + Send>>> {
+    let py = obj.py();
+    let io_module = py.import(intern!(py, "io")).map_err(py_to_io_error)?;
+    let is_instance = |class: &str| -> io::Result<bool> {
+        io_module
+            .getattr(class)
+            .and_then(|class| obj.is_instance(class))
+            .map_err(py_to_io_error)
+    };
+
+    if is_instance("BytesIO")? {
+        let contents = obj
+            .call_method0(intern!(py, "read"))
+            .and_then(|bytes| {
+                Ok(bytes.downcast::<PyBytes>()?.as_bytes().to_vec())
+            })
+            .map_err(py_to_io_error)?;
+        return Ok(Some(Box::new(io::Cursor::new(contents))));
+    }
+    if is_instance("FileIO")?
+        || is_instance("BufferedReader")?
+        || is_instance("BufferedRandom")?
+    {
+        return Ok(Some(Box::new(file_from_py(obj)?)));
+    }
+    Ok(None)
+}
+
+/// Get a native handle on the file backing a Python file object (i.e. one
+/// with a `.fileno()` method), positioned where the Python object currently
+/// is, so the file can be read without going through Python.
+pub(crate) fn file_from_py(obj: &PyAny) -> io::Result<File> {
+    let py = obj.py();
+    let fd: RawFd = obj
+        .call_method0(intern!(py, "fileno"))
+        .and_then(|fd| fd.extract())
+        .map_err(py_to_io_error)?;
+    let position: u64 = obj
+        .call_method0(intern!(py, "tell"))
+        .and_then(|position| position.extract())
+        .map_err(py_to_io_error)?;
+    // SAFETY: The file descriptor belongs to the Python object, which is alive
+    // for the duration of this call, and we duplicate it right away.
+    let fd = unsafe { BorrowedFd::borrow_raw(fd) };
+    let mut file = File::from(fd.try_clone_to_owned()?);
+    file.seek(SeekFrom::Start(position))?;
+    Ok(file)
+}
+
+fn py_to_io_error(err: PyErr) -> io::Error {
+    io::Error::new(ErrorKind::Other, err.to_string())
+}
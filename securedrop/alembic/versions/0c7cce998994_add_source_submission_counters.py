@@ -0,0 +1,75 @@
+"""add source submission counters
+
+Revision ID: 0c7cce998994
+Revises: 17c559a7a685
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0c7cce998994"
+down_revision = "17c559a7a685"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("sources", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("num_documents", sa.Integer(), nullable=False, server_default="0")
+        )
+        batch_op.add_column(
+            sa.Column("num_messages", sa.Integer(), nullable=False, server_default="0")
+        )
+        batch_op.add_column(
+            sa.Column("num_unread", sa.Integer(), nullable=False, server_default="0")
+        )
+        batch_op.add_column(
+            sa.Column("total_size", sa.Integer(), nullable=False, server_default="0")
+        )
+
+    # Count the existing submissions. A submission is unread until it has
+    # been downloaded or seen by a journalist.
+    op.execute(
+        sa.text(
+            """
+            UPDATE sources SET
+            num_documents = (
+                SELECT COUNT(*) FROM submissions
+                WHERE submissions.source_id = sources.id
+                AND (filename LIKE '%doc.gz.gpg' OR filename LIKE '%doc.zip.gpg')
+            ),
+            num_messages = (
+                SELECT COUNT(*) FROM submissions
+                WHERE submissions.source_id = sources.id
+                AND filename LIKE '%msg.gpg'
+            ),
+            num_unread = (
+                SELECT COUNT(*) FROM submissions
+                WHERE submissions.source_id = sources.id
+                AND (downloaded IS NULL OR downloaded = 0)
+                AND NOT EXISTS (
+                    SELECT 1 FROM seen_files WHERE seen_files.file_id = submissions.id
+                )
+                AND NOT EXISTS (
+                    SELECT 1 FROM seen_messages WHERE seen_messages.message_id = submissions.id
+                )
+            ),
+            total_size = (
+                SELECT COALESCE(SUM(size), 0) FROM submissions
+                WHERE submissions.source_id = sources.id
+            )
+            """
+        )
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("sources", schema=None) as batch_op:
+        batch_op.drop_column("total_size")
+        batch_op.drop_column("num_unread")
+        batch_op.drop_column("num_messages")
+        batch_op.drop_column("num_documents")
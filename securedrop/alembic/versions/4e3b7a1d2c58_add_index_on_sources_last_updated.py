@@ -0,0 +1,25 @@
+"""add index on sources.last_updated
+
+Revision ID: 4e3b7a1d2c58
+Revises: 9b2c6e1e5b3f
+Create Date: 2026-10-18 19:12:40.318265
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4e3b7a1d2c58"
+down_revision = "9b2c6e1e5b3f"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("sources", schema=None) as batch_op:
+        batch_op.create_index("ix_sources_last_updated", ["last_updated"], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("sources", schema=None) as batch_op:
+        batch_op.drop_index("ix_sources_last_updated")
@@ -0,0 +1,32 @@
+"""add changes table
+
+Revision ID: 9b2c6e1e5b3f
+Revises: 0c7cce998994
+Create Date: 2026-10-18 14:03:27.552931
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9b2c6e1e5b3f"
+down_revision = "0c7cce998994"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "changes",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("object_type", sa.String(length=20), nullable=False),
+        sa.Column("object_uuid", sa.String(length=36), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sqlite_autoincrement=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("changes")
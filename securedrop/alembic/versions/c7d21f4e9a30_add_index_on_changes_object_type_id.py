@@ -0,0 +1,25 @@
+"""add index on changes.object_type and id
+
+Revision ID: c7d21f4e9a30
+Revises: 4e3b7a1d2c58
+Create Date: 2026-10-18 20:41:08.604127
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c7d21f4e9a30"
+down_revision = "4e3b7a1d2c58"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("changes", schema=None) as batch_op:
+        batch_op.create_index("ix_changes_object_type_id", ["object_type", "id"], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("changes", schema=None) as batch_op:
+        batch_op.drop_index("ix_changes_object_type_id")
@@ -3,11 +3,13 @@ import re
 import typing
 from io import BytesIO
 from pathlib import Path
-from typing import BinaryIO, Dict, Optional
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
 
 import pretty_bad_protocol as gnupg
 from redis import Redis
 from sdconfig import SecureDropConfig
+from secure_tempfile import SecureTemporaryFile
+from static_resources import StaticResourceCache
 
 import redwood
 
@@ -112,7 +114,23 @@ class EncryptionManager:
         self._redis.hdel(self.REDIS_FINGERPRINT_HASH, source_filesystem_id)
 
     def get_journalist_public_key(self) -> str:
-        return self.journalist_pub_key.read_text()
+        return StaticResourceCache.get_default().get(
+            f"journalist-public-key:{self.journalist_pub_key}",
+            [self.journalist_pub_key],
+            self.journalist_pub_key.read_text,
+        )
+
+    def get_journalist_recipients(self) -> redwood.RecipientSet:
+        """Get the journalist key as a recipient set that can be used for encryption.
+
+        Parsing and validating the key is costly compared to encrypting a message, so it's only
+        done again when the key file has changed.
+        """
+        return StaticResourceCache.get_default().get(
+            f"journalist-recipients:{self.journalist_pub_key}",
+            [self.journalist_pub_key],
+            lambda: redwood.RecipientSet([self.get_journalist_public_key()]),
+        )
 
     def get_source_public_key(self, source_filesystem_id: str) -> str:
         source_key_fingerprint = self.get_source_key_fingerprint(source_filesystem_id)
@@ -129,6 +147,59 @@ class EncryptionManager:
         self._save_key_fingerprint_to_redis(source_filesystem_id, source_key_fingerprint)
         return source_key_fingerprint
 
+    def get_source_keys(
+        self, source_filesystem_ids: List[str]
+    ) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """Get the key fingerprints and public keys of several sources whose keys are in the
+        GPG keyring, like get_source_key_fingerprint() and get_source_public_key() do.
+
+        Fingerprints and keys that are cached in Redis are fetched with one request per hash,
+        instead of one per source. A fingerprint or public key that can't be found is None.
+        """
+        if not source_filesystem_ids:
+            return {}
+
+        fingerprints: Dict[str, Optional[str]] = dict(
+            zip(
+                source_filesystem_ids,
+                self._redis.hmget(self.REDIS_FINGERPRINT_HASH, source_filesystem_ids),
+            )
+        )
+        for source_filesystem_id, fingerprint in fingerprints.items():
+            if fingerprint:
+                continue
+            # If the fingerprint was not in Redis, get it directly from GPG
+            try:
+                source_key_details = self._get_source_key_details(source_filesystem_id)
+            except GpgKeyNotFoundError:
+                fingerprints[source_filesystem_id] = None
+                continue
+            fingerprints[source_filesystem_id] = source_key_details["fingerprint"]
+            self._save_key_fingerprint_to_redis(
+                source_filesystem_id, source_key_details["fingerprint"]
+            )
+
+        found_fingerprints = sorted(
+            {fingerprint for fingerprint in fingerprints.values() if fingerprint}
+        )
+        public_keys: Dict[str, Optional[str]] = {}
+        if found_fingerprints:
+            public_keys = dict(
+                zip(found_fingerprints, self._redis.hmget(self.REDIS_KEY_HASH, found_fingerprints))
+            )
+        for fingerprint, public_key in public_keys.items():
+            if public_key:
+                continue
+            try:
+                public_keys[fingerprint] = self._get_public_key(fingerprint)
+            except GpgKeyNotFoundError:
+                public_keys[fingerprint] = None
+
+        return {
+            source_filesystem_id: (fingerprint, public_keys[fingerprint] if fingerprint else None)
+            for source_filesystem_id, fingerprint in fingerprints.items()
+        }
+
     def get_source_secret_key_from_gpg(self, fingerprint: str, passphrase: str) -> str:
         secret_key = self.gpg().export_keys(fingerprint, secret=True, passphrase=passphrase)
         if not secret_key:
@@ -148,17 +219,57 @@ class EncryptionManager:
     def encrypt_source_message(self, message_in: str, encrypted_message_path_out: Path) -> None:
         redwood.encrypt_message(
             # A submission is only encrypted for the journalist key
-            recipients=[self.get_journalist_public_key()],
+            recipients=[self.get_journalist_recipients()],
             plaintext=message_in,
             destination=encrypted_message_path_out,
         )
 
+    def encrypt_source_messages(
+        self, messages_in: List[str], encrypted_message_paths_out: List[Path]
+    ) -> None:
+        """Encrypt several messages at once, spreading the work across all CPUs.
+
+        This is meant for bulk operations, like loading test data, rather than for requests.
+        """
+        redwood.encrypt_many(
+            # A submission is only encrypted for the journalist key
+            recipients=[self.get_journalist_recipients()],
+            plaintexts=messages_in,
+            destinations=encrypted_message_paths_out,
+            threads=os.cpu_count(),
+        )
+
     def encrypt_source_file(self, file_in: BinaryIO, encrypted_file_path_out: Path) -> None:
+        source_key = source_iv = None
+        if isinstance(file_in, SecureTemporaryFile):
+            # Let redwood read and decrypt the secure temporary file natively
+            source_key, source_iv = file_in.prepare_native_read()
         redwood.encrypt_stream(
             # A submission is only encrypted for the journalist key
-            recipients=[self.get_journalist_public_key()],
+            recipients=[self.get_journalist_recipients()],
             plaintext=file_in,
             destination=encrypted_file_path_out,
+            source_key=source_key,
+            source_iv=source_iv,
+        )
+
+    def compress_and_encrypt_source_file(
+        self, file_in: SecureTemporaryFile, filename: str, encrypted_file_path_out: Path
+    ) -> None:
+        """Gzip and encrypt a file submission that was spooled to disk while uploading.
+
+        Redwood reads the secure temporary file directly and does all the work without holding
+        the GIL, so concurrent uploads don't stall the other threads of the process.
+        """
+        source_key, source_iv = file_in.prepare_native_read()
+        redwood.compress_and_encrypt_file(
+            # A submission is only encrypted for the journalist key
+            recipients=[self.get_journalist_recipients()],
+            source=Path(file_in.filepath),
+            filename=filename,
+            destination=encrypted_file_path_out,
+            source_key=source_key,
+            source_iv=source_iv,
         )
 
     def encrypt_journalist_reply(
@@ -166,14 +277,28 @@ class EncryptionManager:
     ) -> None:
         redwood.encrypt_message(
             # A reply is encrypted for both the journalist key and the source key
-            recipients=[for_source.public_key, self.get_journalist_public_key()],
+            recipients=[for_source.public_key, self.get_journalist_recipients()],
             plaintext=reply_in,
             destination=encrypted_reply_path_out,
         )
 
+    def encrypt_journalist_replies(
+        self, for_source: "Source", replies_in: List[str], encrypted_reply_paths_out: List[Path]
+    ) -> None:
+        """Encrypt several replies to the same source at once, spreading the work across all CPUs.
+
+        This is meant for bulk operations, like loading test data, rather than for requests.
+        """
+        redwood.encrypt_many(
+            # A reply is encrypted for both the journalist key and the source key
+            recipients=[for_source.public_key, self.get_journalist_recipients()],
+            plaintexts=replies_in,
+            destinations=encrypted_reply_paths_out,
+            threads=os.cpu_count(),
+        )
+
     def decrypt_journalist_reply(self, for_source_user: "SourceUser", ciphertext_in: bytes) -> str:
         """Decrypt a reply sent by a journalist."""
-        # TODO: Avoid making a database query here
         for_source = for_source_user.get_db_record()
         if for_source.pgp_secret_key is not None:
             return redwood.decrypt(
@@ -189,6 +314,50 @@ class EncryptionManager:
 
         return out.data.decode("utf-8")
 
+    def decrypt_journalist_replies(
+        self, for_source_user: "SourceUser", ciphertexts_in: List[bytes]
+    ) -> List[Union[str, Exception]]:
+        """Decrypt several replies sent by a journalist, unlocking the source's key only once.
+
+        The results are returned in the same order as the ciphertexts; a reply that could not be
+        decrypted or decoded is returned as the exception that was raised for it.
+        """
+        if not ciphertexts_in:
+            # Most sources have no replies, so don't unlock their key for nothing
+            return []
+
+        for_source = for_source_user.get_db_record()
+        if for_source.pgp_secret_key is None:
+            # In practice this should be unreachable unless the Sequoia secret key migration failed
+            results: List[Union[str, Exception]] = []
+            for ciphertext_in in ciphertexts_in:
+                try:
+                    results.append(self.decrypt_journalist_reply(for_source_user, ciphertext_in))
+                except (GpgDecryptError, UnicodeDecodeError) as e:
+                    results.append(e)
+            return results
+
+        try:
+            plaintexts = redwood.decrypt_many(
+                ciphertexts_in,
+                secret_key=for_source.pgp_secret_key,
+                passphrase=for_source_user.gpg_secret,
+            )
+        except redwood.RedwoodError as e:
+            # The source's key could not be unlocked, so none of the replies can be decrypted
+            return [e] * len(ciphertexts_in)
+
+        results = []
+        for plaintext in plaintexts:
+            if isinstance(plaintext, Exception):
+                results.append(plaintext)
+                continue
+            try:
+                results.append(plaintext.decode())
+            except UnicodeDecodeError as e:
+                results.append(e)
+        return results
+
     def _get_source_key_details(self, source_filesystem_id: str) -> Dict[str, str]:
         for key in self.gpg().list_keys():
             for uid in key["uids"]:
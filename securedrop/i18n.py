@@ -16,7 +16,8 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 import collections
-from typing import DefaultDict, List, OrderedDict, Set
+from functools import lru_cache
+from typing import DefaultDict, List, Optional, OrderedDict, Set, Tuple
 
 from babel.core import (
     Locale,
@@ -28,6 +29,8 @@ from babel.core import (
 from flask import Flask, current_app, g, request, session
 from flask_babel import Babel
 from sdconfig import FALLBACK_LOCALE, SecureDropConfig
+from werkzeug.datastructures import LanguageAccept
+from werkzeug.http import parse_accept_header
 
 
 class RequestLocaleInfo:
@@ -210,18 +213,13 @@ def get_locale(config: SecureDropConfig) -> str:
     - config.DEFAULT_LOCALE
     - config.FALLBACK_LOCALE
     """
-    preferences: List[str] = []
-    if session and session.get("locale"):
-        preferences.append(session["locale"])
-    if request.args.get("l"):
-        preferences.insert(0, request.args["l"])
-    if not preferences:
-        preferences.extend(get_accepted_languages())
-    preferences.append(config.DEFAULT_LOCALE)
-    preferences.append(FALLBACK_LOCALE)
-
-    locales = current_app.config["LOCALES"]
-    negotiated = negotiate_locale(preferences, locales.keys())
+    negotiated = _negotiate_locale(
+        request.args.get("l"),
+        session.get("locale") if session else None,
+        request.headers.get("Accept-Language"),
+        config.DEFAULT_LOCALE,
+        tuple(current_app.config["LOCALES"].keys()),
+    )
 
     if not negotiated:
         raise ValueError("No usable locale")
@@ -229,12 +227,37 @@ def get_locale(config: SecureDropConfig) -> str:
     return negotiated
 
 
-def get_accepted_languages() -> List[str]:
+# Negotiating a locale means parsing every language tag involved, so the result is cached
+# for each combination of preferences that requests come with.
+@lru_cache(maxsize=1024)
+def _negotiate_locale(
+    requested_locale: Optional[str],
+    session_locale: Optional[str],
+    accept_language: Optional[str],
+    default_locale: str,
+    supported_locales: Tuple[str, ...],
+) -> Optional[str]:
+    preferences: List[str] = []
+    if session_locale:
+        preferences.append(session_locale)
+    if requested_locale:
+        preferences.insert(0, requested_locale)
+    if not preferences:
+        preferences.extend(
+            parse_accepted_languages(parse_accept_header(accept_language, LanguageAccept))
+        )
+    preferences.append(default_locale)
+    preferences.append(FALLBACK_LOCALE)
+
+    return negotiate_locale(preferences, supported_locales)
+
+
+def parse_accepted_languages(accepted_languages: LanguageAccept) -> List[str]:
     """
-    Convert a request's list of accepted languages into locale identifiers.
+    Convert a list of accepted languages into locale identifiers.
     """
     accept_languages = []
-    for code in request.accept_languages.values():
+    for code in accepted_languages.values():
         try:
             parsed = Locale.parse(code, "-")
             accept_languages.append(str(parsed))
@@ -255,11 +278,19 @@ def get_accepted_languages() -> List[str]:
     return accept_languages
 
 
+# There are only as many of these as there are supported locales
+@lru_cache(maxsize=None)
+def _get_request_locale_info(locale: str) -> RequestLocaleInfo:
+    return RequestLocaleInfo(locale)
+
+
 def set_locale(config: SecureDropConfig) -> None:
     """
     Update locale info in request and session.
     """
     locale = get_locale(config)
-    g.localeinfo = RequestLocaleInfo(locale)  # pylint: disable=assigning-non-slot
-    session["locale"] = locale
+    g.localeinfo = _get_request_locale_info(locale)  # pylint: disable=assigning-non-slot
+    # Only write to the session when needed, as it then has to be saved again
+    if session.get("locale") != locale:
+        session["locale"] = locale
     g.locales = current_app.config["LOCALES"]  # pylint: disable=assigning-non-slot
@@ -14,6 +14,7 @@ from journalist_app.sessions import Session, session
 from journalist_app.utils import get_source
 from models import InstanceConfig
 from sdconfig import SecureDropConfig
+from static_resources import StaticResourceCache
 from werkzeug import Response
 from werkzeug.exceptions import HTTPException, default_exceptions
 
@@ -31,12 +32,20 @@ def get_logo_url(app: Flask) -> str:
     default_logo_filename = "i/logo.png"
     custom_logo_path = Path(app.static_folder) / custom_logo_filename
     default_logo_path = Path(app.static_folder) / default_logo_filename
-    if custom_logo_path.is_file():
-        return url_for("static", filename=custom_logo_filename)
-    elif default_logo_path.is_file():
-        return url_for("static", filename=default_logo_filename)
 
-    raise FileNotFoundError
+    def find_logo() -> Optional[str]:
+        if custom_logo_path.is_file():
+            return custom_logo_filename
+        elif default_logo_path.is_file():
+            return default_logo_filename
+        return None
+
+    logo_filename = StaticResourceCache.get_default().get(
+        f"logo:{app.static_folder}", [custom_logo_path, default_logo_path], find_logo
+    )
+    if logo_filename is None:
+        raise FileNotFoundError
+    return url_for("static", filename=logo_filename)
 
 
 def create_app(config: SecureDropConfig) -> Flask:
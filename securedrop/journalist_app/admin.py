@@ -30,6 +30,7 @@ from journalist_app.utils import (
 )
 from markupsafe import Markup
 from models import (
+    Change,
     FirstOrLastNameError,
     InstanceConfig,
     InvalidUsernameException,
@@ -359,6 +360,7 @@ def make_blueprint() -> Blueprint:
         user = Journalist.query.get(user_id)
 
         if request.method == "POST":
+            names = (user.username, user.first_name, user.last_name)
             if request.form.get("username", None):
                 new_username = request.form["username"]
 
@@ -403,6 +405,8 @@ def make_blueprint() -> Blueprint:
 
             user.is_admin = bool(request.form.get("is_admin"))
 
+            if (user.username, user.first_name, user.last_name) != names:
+                Change.record_journalist(user)
             commit_account_changes(user)
 
         password = PassphraseGenerator.get_default().generate_passphrase(
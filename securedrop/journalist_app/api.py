@@ -1,17 +1,20 @@
 import collections.abc
+import gzip
 import json
 from datetime import datetime, timezone
 from os import path
-from typing import Set, Tuple, Union
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 from uuid import UUID
 
 import flask
 import werkzeug
 from db import db
-from flask import Blueprint, abort, jsonify, request
+from flask import Blueprint, abort, jsonify, request, url_for
 from journalist_app import utils
+from journalist_app.decorators import conditional_on_changes
 from journalist_app.sessions import session
 from models import (
+    Change,
     InvalidUsernameException,
     Journalist,
     LoginThrottledException,
@@ -21,8 +24,10 @@ from models import (
     Submission,
     WrongPasswordException,
 )
+from sdconfig import SecureDropConfig
 from sqlalchemy import Column
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query, joinedload
 from store import NotEncrypted, Storage
 from two_factor import OtpSecretInvalid, OtpTokenInvalid
 from werkzeug.exceptions import default_exceptions
@@ -35,6 +40,57 @@ def get_or_404(model: db.Model, object_id: str, column: Column) -> db.Model:
     return result
 
 
+# The largest page a client can request from the paginated list endpoints
+MAX_PAGE_LIMIT = 1000
+
+
+def paginate(query: Query, id_column: Column) -> Tuple[List[Any], Optional[str]]:
+    """Returns the results of query ordered by id_column, and the URL of the next page.
+
+    Pagination is opt-in: when the request gives a `limit`, only that many results with
+    IDs greater than `after` are returned, and the next page's URL is None once there
+    are no more results. Otherwise all results are returned.
+    """
+    query = query.order_by(id_column)
+    if "limit" not in request.args:
+        if "after" in request.args:
+            abort(400, "'after' requires 'limit'")
+        return query.all(), None
+
+    try:
+        limit = int(request.args["limit"])
+        after = int(request.args.get("after", 0))
+    except ValueError:
+        abort(400, "'limit' and 'after' must be integers")
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        abort(400, f"'limit' must be between 1 and {MAX_PAGE_LIMIT}")
+
+    results = query.filter(id_column > after).limit(limit + 1).all()
+    if len(results) <= limit:
+        return results, None
+    results = results[:limit]
+    next_url = url_for(
+        request.endpoint, **(request.view_args or {}), limit=limit, after=results[-1].id
+    )
+    return results, next_url
+
+
+def page_criteria(results: List[Any], id_column: Column) -> List[Any]:
+    """Returns criteria matching the range of IDs of a page returned by paginate(), to load
+    related rows for that page only.
+    """
+    if "limit" not in request.args or not results:
+        return []
+    return [id_column.between(results[0].id, results[-1].id)]
+
+
+def paginated(response: Dict[str, Any], next_url: Optional[str]) -> Dict[str, Any]:
+    """Adds the URL of the next page to a paginated response."""
+    if "limit" in request.args:
+        response["next"] = next_url
+    return response
+
+
 def make_blueprint() -> Blueprint:
     api = Blueprint("api", __name__)
 
@@ -47,10 +103,47 @@ def make_blueprint() -> Blueprint:
             "submissions_url": "/api/v1/submissions",
             "replies_url": "/api/v1/replies",
             "seen_url": "/api/v1/seen",
+            "changes_url": "/api/v1/changes",
             "auth_token_url": "/api/v1/token",
         }
         return jsonify(endpoints), 200
 
+    @api.after_request
+    def compress_response(response: flask.Response) -> flask.Response:
+        """Gzips large JSON responses for clients that accept it.
+
+        File downloads are already encrypted, so compressing them would be a waste.
+        """
+        config = SecureDropConfig.get_current()
+        if (
+            not config.JOURNALIST_API_COMPRESSION
+            or response.mimetype != "application/json"
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        if not request.accept_encodings["gzip"]:
+            return response
+
+        # Clients that accept gzip may get a compressed body, which is a different
+        # representation, so its ETag can only be weak. This applies to 304s for it too,
+        # so that their validators match those of the full response.
+        etag, _ = response.get_etag()
+        if etag:
+            response.set_etag(etag, weak=True)
+
+        if response.status_code == 304:
+            return response
+        data = response.get_data()
+        if len(data) < config.JOURNALIST_API_COMPRESSION_MIN_SIZE:
+            return response
+
+        response.set_data(gzip.compress(data, compresslevel=6))
+        response.headers["Content-Encoding"] = "gzip"
+        return response
+
     # Before every post, we validate the payload before processing the request
     @api.before_request
     def validate_data() -> None:
@@ -120,9 +213,13 @@ def make_blueprint() -> Blueprint:
             return abort(403, "Token authentication failed.")
 
     @api.route("/sources", methods=["GET"])
+    @conditional_on_changes
     def get_all_sources() -> Tuple[flask.Response, int]:
-        sources = Source.query.filter_by(pending=False, deleted_at=None).all()
-        return jsonify({"sources": [source.to_json() for source in sources]}), 200
+        sources, next_url = paginate(
+            Source.query.options(joinedload(Source.star)).filter_by(pending=False, deleted_at=None),
+            Source.id,
+        )
+        return jsonify(paginated({"sources": Source.to_json_bulk(sources)}, next_url)), 200
 
     @api.route("/sources/<source_uuid>", methods=["GET", "DELETE"])
     def single_source(source_uuid: str) -> Tuple[flask.Response, int]:
@@ -167,10 +264,31 @@ def make_blueprint() -> Blueprint:
             abort(405)
 
     @api.route("/sources/<source_uuid>/submissions", methods=["GET"])
+    @conditional_on_changes
     def all_source_submissions(source_uuid: str) -> Tuple[flask.Response, int]:
         source = get_or_404(Source, source_uuid, column=Source.uuid)
+        submissions, next_url = paginate(
+            Submission.query.filter(Submission.source_id == source.id), Submission.id
+        )
+        seen_by = (
+            Submission.seen_by_journalists(
+                Submission.source_id == source.id, *page_criteria(submissions, Submission.id)
+            )
+            if submissions
+            else {}
+        )
         return (
-            jsonify({"submissions": [submission.to_json() for submission in source.submissions]}),
+            jsonify(
+                paginated(
+                    {
+                        "submissions": [
+                            submission.to_json(seen_by.get(submission.id, set()))
+                            for submission in submissions
+                        ]
+                    },
+                    next_url,
+                )
+            ),
             200,
         )
 
@@ -205,11 +323,21 @@ def make_blueprint() -> Blueprint:
             abort(405)
 
     @api.route("/sources/<source_uuid>/replies", methods=["GET", "POST"])
+    @conditional_on_changes
     def all_source_replies(source_uuid: str) -> Tuple[flask.Response, int]:
         if request.method == "GET":
             source = get_or_404(Source, source_uuid, column=Source.uuid)
+            replies = (
+                Reply.query.options(joinedload(Reply.journalist))
+                .filter(Reply.source_id == source.id)
+                .order_by(Reply.id)
+                .all()
+            )
+            seen_by = Reply.seen_by_journalists(Reply.source_id == source.id)
             return (
-                jsonify({"replies": [reply.to_json() for reply in source.replies]}),
+                jsonify(
+                    {"replies": [reply.to_json(seen_by.get(reply.id, [])) for reply in replies]}
+                ),
                 200,
             )
         elif request.method == "POST":
@@ -254,6 +382,8 @@ def make_blueprint() -> Blueprint:
                 seen_reply = SeenReply(reply=reply, journalist=session.get_user())
                 db.session.add(seen_reply)
                 db.session.add(source)
+                Change.record(reply)
+                Change.record(source)
                 db.session.commit()
             except IntegrityError as e:
                 db.session.rollback()
@@ -288,27 +418,133 @@ def make_blueprint() -> Blueprint:
             abort(405)
 
     @api.route("/submissions", methods=["GET"])
+    @conditional_on_changes
     def get_all_submissions() -> Tuple[flask.Response, int]:
-        submissions = Submission.query.all()
+        submissions, next_url = paginate(
+            Submission.query.options(joinedload(Submission.source)), Submission.id
+        )
+        seen_by = (
+            Submission.seen_by_journalists(*page_criteria(submissions, Submission.id))
+            if submissions
+            else {}
+        )
         return (
             jsonify(
-                {
-                    "submissions": [
-                        submission.to_json() for submission in submissions if submission.source
-                    ]
-                }
+                paginated(
+                    {
+                        "submissions": [
+                            submission.to_json(seen_by.get(submission.id, set()))
+                            for submission in submissions
+                            if submission.source
+                        ]
+                    },
+                    next_url,
+                )
             ),
             200,
         )
 
     @api.route("/replies", methods=["GET"])
+    @conditional_on_changes
     def get_all_replies() -> Tuple[flask.Response, int]:
-        replies = Reply.query.all()
+        replies, next_url = paginate(
+            Reply.query.options(joinedload(Reply.source), joinedload(Reply.journalist)), Reply.id
+        )
+        seen_by = Reply.seen_by_journalists(*page_criteria(replies, Reply.id)) if replies else {}
         return (
-            jsonify({"replies": [reply.to_json() for reply in replies if reply.source]}),
+            jsonify(
+                paginated(
+                    {
+                        "replies": [
+                            reply.to_json(seen_by.get(reply.id, []))
+                            for reply in replies
+                            if reply.source
+                        ]
+                    },
+                    next_url,
+                )
+            ),
             200,
         )
 
+    @api.route("/changes", methods=["GET"])
+    def get_changes() -> Tuple[flask.Response, int]:
+        """
+        Lists the sources, submissions and replies changed since the cursor given as `since`,
+        and the UUIDs of those deleted since, with the cursor to pass next time.
+
+        Without `since`, only the current cursor is returned: clients fetch it, sync the full
+        collections, then poll for changes from it. Once the changes since a cursor have been
+        pruned, it gets a 410 and clients have to sync the full collections again.
+        """
+        cursor = Change.latest_cursor()
+        changes: Dict[str, Any] = {
+            "cursor": cursor,
+            "sources": [],
+            "submissions": [],
+            "replies": [],
+            "deleted_sources": [],
+            "deleted_submissions": [],
+            "deleted_replies": [],
+        }
+        if "since" not in request.args:
+            return jsonify(changes), 200
+
+        try:
+            since = int(request.args["since"])
+        except ValueError:
+            since = -1
+        if not 0 <= since <= cursor:
+            abort(400, "'since' must be a cursor returned by this endpoint")
+        if since < Change.oldest_cursor():
+            abort(410, "the changes since 'since' are no longer available")
+
+        source_uuids = Change.changed_uuids(Change.SOURCE, since, cursor)
+        sources = (
+            Source.query.options(joinedload(Source.star))
+            .filter(Source.uuid.in_(source_uuids))
+            .filter_by(pending=False, deleted_at=None)
+            .all()
+        )
+        changes["sources"] = Source.to_json_bulk(sources)
+
+        submission_uuids = Change.changed_uuids(Change.SUBMISSION, since, cursor)
+        submissions = (
+            Submission.query.options(joinedload(Submission.source))
+            .filter(Submission.uuid.in_(submission_uuids))
+            .all()
+        )
+        submission_seen_by = Submission.seen_by_journalists(Submission.uuid.in_(submission_uuids))
+        changes["submissions"] = [
+            submission.to_json(submission_seen_by.get(submission.id, set()))
+            for submission in submissions
+            if submission.source
+        ]
+
+        reply_uuids = Change.changed_uuids(Change.REPLY, since, cursor)
+        replies = (
+            Reply.query.options(joinedload(Reply.source), joinedload(Reply.journalist))
+            .filter(Reply.uuid.in_(reply_uuids))
+            .all()
+        )
+        reply_seen_by = Reply.seen_by_journalists(Reply.uuid.in_(reply_uuids))
+        changes["replies"] = [
+            reply.to_json(reply_seen_by.get(reply.id, [])) for reply in replies if reply.source
+        ]
+
+        # Whatever changed but can no longer be listed has been deleted
+        for key, changed_uuids in (
+            ("sources", source_uuids),
+            ("submissions", submission_uuids),
+            ("replies", reply_uuids),
+        ):
+            listed = {item["uuid"] for item in changes[key]}
+            changes["deleted_" + key] = sorted(
+                object_uuid for (object_uuid,) in changed_uuids if object_uuid not in listed
+            )
+
+        return jsonify(changes), 200
+
     @api.route("/seen", methods=["POST"])
     def seen() -> Tuple[flask.Response, int]:
         """
@@ -1,9 +1,14 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
 from functools import wraps
 from typing import Any, Callable
 
-from flask import flash, redirect, url_for
+import version
+from flask import current_app, flash, make_response, redirect, request, url_for
 from flask_babel import gettext
 from journalist_app.sessions import session
+from models import Change
+from werkzeug.http import is_resource_modified
 
 
 def admin_required(func: Callable) -> Callable:
@@ -15,3 +20,41 @@ def admin_required(func: Callable) -> Callable:
         return redirect(url_for("main.index"))
 
     return wrapper
+
+
+def conditional_on_changes(func: Callable) -> Callable:
+    """Answers conditional GET requests to an API collection without calling the view.
+
+    Every change to what the API lists is recorded as a Change, so the latest one
+    identifies the current state of all collections: it's used to derive the ETag and
+    Last-Modified validators of the view's responses.
+    """
+
+    @wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if request.method != "GET":
+            return func(*args, **kwargs)
+
+        latest = Change.latest()
+        etag = hashlib.sha256(
+            f"{version.__version__}:{request.full_path}:{latest.id if latest else 0}".encode()
+        ).hexdigest()
+        # Last-Modified only has a resolution of one second, so it's withheld until the
+        # second of the latest change is over, lest a change later in that second be missed
+        last_modified = None
+        if latest and datetime.utcnow() - latest.timestamp >= timedelta(seconds=1):
+            last_modified = latest.timestamp.replace(tzinfo=timezone.utc)
+
+        if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+            response = make_response(func(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        else:
+            # It stands for the view's JSON response, so it gets the same headers
+            response = current_app.response_class(status=304, mimetype="application/json")
+        response.set_etag(etag)
+        if last_modified is not None:
+            response.last_modified = last_modified
+        return response
+
+    return wrapper
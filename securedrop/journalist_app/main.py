@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Union
+from typing import List, Tuple, Union
 
 import store
 import werkzeug
@@ -20,11 +20,21 @@ from flask import (
 from flask_babel import gettext
 from journalist_app.forms import ReplyForm
 from journalist_app.sessions import session
-from journalist_app.utils import bulk_delete, download, get_source, validate_user
+from journalist_app.utils import (
+    bulk_delete,
+    download,
+    get_source,
+    parse_source_index_cursor,
+    source_index_cursor,
+    validate_user,
+)
 from markupsafe import Markup, escape
-from models import Reply, SeenReply, Source, SourceStar, Submission
-from sqlalchemy.orm import joinedload
+from models import Change, Reply, SeenReply, Source, SourceStar, Submission
+from sdconfig import SecureDropConfig
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import contains_eager
 from sqlalchemy.sql import func
+from sqlalchemy.sql.expression import ColumnElement
 from store import Storage
 
 
@@ -64,57 +74,81 @@ def make_blueprint() -> Blueprint:
 
     @view.route("/")
     def index() -> str:
-        # Gather the count of unread submissions for each source
-        # ID. This query will be joined in the queries for starred and
-        # unstarred sources below, and the unread counts added to
-        # their result sets as an extra column.
-        unread_stmt = (
-            db.session.query(Submission.source_id, func.count("*").label("num_unread"))
-            .filter_by(seen_files=None, seen_messages=None)
-            .group_by(Submission.source_id)
-            .subquery()
-        )
-
-        # Query for starred sources, along with their unread
-        # submission counts.
-        starred = (
-            db.session.query(Source, unread_stmt.c.num_unread)
+        # Sources are listed starred first, then most recently updated
+        # first. Each page picks up after the last source of the previous
+        # one (given by the "after" cursor) rather than at an offset, so
+        # that it takes the same time to load regardless of how far in it
+        # is, and it doesn't skip or repeat sources that were updated in
+        # the meantime. Starred and unstarred sources are queried
+        # separately, so that both are read in the order of the index on
+        # last_updated.
+        query = (
+            db.session.query(Source)
             .filter_by(pending=False, deleted_at=None)
             .filter(Source.last_updated.isnot(None))
-            .filter(SourceStar.starred.is_(True))
             .outerjoin(SourceStar)
-            .options(joinedload(Source.submissions))
-            .options(joinedload(Source.star))
-            .outerjoin(unread_stmt, Source.id == unread_stmt.c.source_id)
-            .order_by(Source.last_updated.desc())
-            .all()
+            .options(contains_eager(Source.star))
         )
 
-        # Now, add "num_unread" attributes to the source entities.
-        for source, num_unread in starred:
-            source.num_unread = num_unread or 0
-        starred = [source for source, num_unread in starred]
+        # The codename filter applies to every source, not just the ones
+        # on the current page
+        source_filter = request.args.get("filter", "").strip()
+        if source_filter:
+            query = query.filter(
+                func.lower(Source.journalist_designation).contains(
+                    source_filter.lower(), autoescape=True
+                )
+            )
 
-        # Query for sources without stars, along with their unread
-        # submission counts.
-        unstarred = (
-            db.session.query(Source, unread_stmt.c.num_unread)
-            .filter_by(pending=False, deleted_at=None)
-            .filter(Source.last_updated.isnot(None))
-            .filter(~Source.star.has(SourceStar.starred.is_(True)))
-            .options(joinedload(Source.submissions))
-            .options(joinedload(Source.star))
-            .outerjoin(unread_stmt, Source.id == unread_stmt.c.source_id)
-            .order_by(Source.last_updated.desc())
-            .all()
-        )
+        after_starred = True
+        after_last: List[ColumnElement] = []
+        cursor = request.args.get("after")
+        if cursor:
+            after_starred, after_last_updated, after_id = parse_source_index_cursor(cursor)
+            after_last.append(
+                or_(
+                    Source.last_updated < after_last_updated,
+                    and_(Source.last_updated == after_last_updated, Source.id < after_id),
+                )
+            )
+
+        page_size = SecureDropConfig.get_current().JOURNALIST_INDEX_PAGE_SIZE
+        rows: List[Tuple[Source, bool]] = []
+        if after_starred:
+            starred_query = query.filter(SourceStar.starred.is_(True), *after_last)
+            rows.extend(
+                (source, True)
+                for source in starred_query.order_by(
+                    Source.last_updated.desc(), Source.id.desc()
+                ).limit(page_size + 1)
+            )
+            # The unstarred sources are then listed from the first one
+            after_last = []
+        if len(rows) <= page_size:
+            unstarred_query = query.filter(SourceStar.starred.isnot(True), *after_last)
+            rows.extend(
+                (source, False)
+                for source in unstarred_query.order_by(
+                    Source.last_updated.desc(), Source.id.desc()
+                ).limit(page_size + 1 - len(rows))
+            )
 
-        # Again, add "num_unread" attributes to the source entities.
-        for source, num_unread in unstarred:
-            source.num_unread = num_unread or 0
-        unstarred = [source for source, num_unread in unstarred]
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = source_index_cursor(*rows[-1])
 
-        return render_template("index.html", unstarred=unstarred, starred=starred)
+        starred = [source for source, source_is_starred in rows if source_is_starred]
+        unstarred = [source for source, source_is_starred in rows if not source_is_starred]
+
+        return render_template(
+            "index.html",
+            unstarred=unstarred,
+            starred=starred,
+            source_filter=source_filter,
+            first_page=not cursor,
+            next_cursor=next_cursor,
+        )
 
     @view.route("/reply", methods=("POST",))
     def reply() -> werkzeug.Response:
@@ -150,6 +184,8 @@ def make_blueprint() -> Blueprint:
             db.session.add(reply)
             seen_reply = SeenReply(reply=reply, journalist=session.get_user())
             db.session.add(seen_reply)
+            Change.record(reply)
+            Change.record(g.source)
             db.session.commit()
             store.async_add_checksum_for_file(reply, Storage.get_default())
         except Exception as exc:
@@ -1,7 +1,7 @@
 import binascii
 import os
 from datetime import datetime, timezone
-from typing import List, Literal, Optional, Union
+from typing import List, Literal, Optional, Tuple, Union
 
 import argon2
 import flask
@@ -14,6 +14,7 @@ from journalist_app.sessions import session
 from markupsafe import Markup, escape
 from models import (
     ARGON2_PARAMS,
+    Change,
     FirstOrLastNameError,
     InvalidPasswordLength,
     InvalidUsernameException,
@@ -30,6 +31,8 @@ from models import (
     WrongPasswordException,
     get_one_or_else,
 )
+from source_user import _DesignationAllocator
+from sqlalchemy import or_
 from sqlalchemy.exc import IntegrityError
 from store import Storage, add_checksum_for_file
 from two_factor import HOTP, OtpSecretInvalid, OtpTokenInvalid
@@ -64,6 +67,30 @@ def get_source(filesystem_id: str, include_deleted: bool = False) -> Source:
     return get_one_or_else(query, current_app.logger, abort)
 
 
+def source_index_cursor(source: Source, starred: bool) -> str:
+    """
+    Return the cursor for the page of the source index that starts after
+    `source`, given whether it is starred
+    """
+    if source.last_updated is None:
+        raise ValueError("Sources that were never updated are not listed")
+    return f"{int(starred)}:{source.id}:{source.last_updated.isoformat()}"
+
+
+def parse_source_index_cursor(cursor: str) -> Tuple[bool, datetime, int]:
+    """
+    Return whether the source a cursor points after is starred, when it was
+    last updated and its ID; abort with a 400 if the cursor is invalid.
+    """
+    try:
+        starred, source_id, last_updated = cursor.split(":", 2)
+        if starred not in ("0", "1"):
+            raise ValueError(f"Invalid starred flag: {starred}")
+        return starred == "1", datetime.fromisoformat(last_updated), int(source_id)
+    except ValueError:
+        abort(400)
+
+
 def validate_user(
     username: str,
     password: Optional[str],
@@ -171,17 +198,34 @@ def mark_seen(targets: List[Union[Submission, Reply]], user: Journalist) -> None
     for t in targets:
         try:
             if isinstance(t, Submission):
-                t.downloaded = True
+                # Mark the submission downloaded only if it's still unread,
+                # in a single statement, so that only one of several
+                # concurrent requests decrements the unread counter
+                marked_read = (
+                    db.session.query(Submission)
+                    .filter(
+                        Submission.id == t.id,
+                        or_(Submission.downloaded.is_(None), Submission.downloaded.is_(False)),
+                        ~Submission.seen_files.any(),
+                        ~Submission.seen_messages.any(),
+                    )
+                    .update({Submission.downloaded: True}, synchronize_session=False)
+                )
+                db.session.expire(t, ["downloaded"])
+                if marked_read:
+                    t.source.update_counters(unread=-1)
                 if t.is_file:
                     sf = SeenFile(file_id=t.id, journalist_id=user.id)
                     db.session.add(sf)
                 elif t.is_message:
                     sm = SeenMessage(message_id=t.id, journalist_id=user.id)
                     db.session.add(sm)
+                Change.record(t)
                 db.session.commit()
             elif isinstance(t, Reply):
                 sr = SeenReply(reply_id=t.id, journalist_id=user.id)
                 db.session.add(sr)
+                Change.record(t)
                 db.session.commit()
         except IntegrityError as e:
             db.session.rollback()
@@ -244,6 +288,15 @@ def delete_file_object(file_object: Union[Submission, Reply]) -> None:
         current_app.logger.error("could not queue file for deletion: %s", e)
         raise
     finally:
+        if isinstance(file_object, Submission):
+            file_object.source.update_counters(
+                documents=-int(file_object.is_file),
+                messages=-int(file_object.is_message),
+                unread=-int(not file_object.seen),
+                total_size=-file_object.size,
+            )
+            Change.record(file_object.source)
+        Change.record(file_object)
         db.session.delete(file_object)
         db.session.commit()
 
@@ -283,6 +336,7 @@ def bulk_delete(
 
 def make_star_true(filesystem_id: str) -> None:
     source = get_source(filesystem_id)
+    Change.record(source)
     if source.star:
         source.star.starred = True
     else:
@@ -292,6 +346,7 @@ def make_star_true(filesystem_id: str) -> None:
 
 def make_star_false(filesystem_id: str) -> None:
     source = get_source(filesystem_id)
+    Change.record(source)
     if not source.star:
         source_star = SourceStar(source)
         db.session.add(source_star)
@@ -322,6 +377,8 @@ def col_delete(cols_selected: List[str]) -> werkzeug.Response:
     else:
         now = datetime.now(timezone.utc)
         sources = Source.query.filter(Source.filesystem_id.in_(cols_selected))
+        for source in sources:
+            Change.record(source)
         sources.update({Source.deleted_at: now}, synchronize_session="fetch")
         db.session.commit()
 
@@ -402,9 +459,16 @@ def delete_collection(filesystem_id: str) -> None:
 
     # Delete their entry in the db
     source = get_source(filesystem_id, include_deleted=True)
+    journalist_designation = source.journalist_designation
+    Change.record(source)
     db.session.delete(source)
     db.session.commit()
 
+    # Let new sources be given the deleted source's designation
+    _DesignationAllocator.get_default().release_journalist_designation(
+        db.session, journalist_designation
+    )
+
 
 def purge_deleted_sources() -> None:
     """
@@ -423,6 +487,7 @@ def purge_deleted_sources() -> None:
 def set_name(user: Journalist, first_name: Optional[str], last_name: Optional[str]) -> None:
     try:
         user.set_name(first_name, last_name)
+        Change.record_journalist(user)
         db.session.commit()
         flash(gettext("Name updated."), "success")
     except FirstOrLastNameError as e:
@@ -15,7 +15,7 @@ import secrets
 import string
 from itertools import cycle
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
 import journalist_app
 from db import db
@@ -181,23 +181,29 @@ def record_source_interaction(source: Source) -> None:
     db.session.flush()
 
 
-def submit_message(source: Source, journalist_who_saw: Optional[Journalist]) -> None:
+def submit_messages(source: Source, journalists_who_saw: List[Optional[Journalist]]) -> None:
     """
-    Adds a single message submitted by a source.
+    Adds messages submitted by a source, one for each entry of journalists_who_saw,
+    and encrypts them all at once.
     """
-    record_source_interaction(source)
-    fpath = Storage.get_default().save_message_submission(
+    first_count = source.interaction_count + 1
+    for _ in journalists_who_saw:
+        record_source_interaction(source)
+    fpaths = Storage.get_default().save_message_submissions(
         source.filesystem_id,
-        source.interaction_count,
+        first_count,
         source.journalist_filename,
-        next(messages),
+        [next(messages) for _ in journalists_who_saw],
     )
-    submission = Submission(source, fpath, Storage.get_default())
-    db.session.add(submission)
+    for fpath, journalist_who_saw in zip(fpaths, journalists_who_saw):
+        submission = Submission(source, fpath, Storage.get_default())
+        db.session.add(submission)
+        source.count_new_submission(submission)
 
-    if journalist_who_saw:
-        seen_message = SeenMessage(message=submission, journalist=journalist_who_saw)
-        db.session.add(seen_message)
+        if journalist_who_saw:
+            seen_message = SeenMessage(message=submission, journalist=journalist_who_saw)
+            db.session.add(seen_message)
+            source.update_counters(unread=-1)
 
 
 def submit_file(source: Source, journalist_who_saw: Optional[Journalist], size: int = 0) -> None:
@@ -220,35 +226,42 @@ def submit_file(source: Source, journalist_who_saw: Optional[Journalist], size:
 
     submission = Submission(source, fpath, Storage.get_default())
     db.session.add(submission)
+    source.count_new_submission(submission)
 
     if journalist_who_saw:
         seen_file = SeenFile(file=submission, journalist=journalist_who_saw)
         db.session.add(seen_file)
+        source.update_counters(unread=-1)
 
 
-def add_reply(
-    source: Source, journalist: Journalist, journalist_who_saw: Optional[Journalist]
-) -> None:
+def add_replies(source: Source, journalists: List[Tuple[Journalist, Optional[Journalist]]]) -> None:
     """
-    Adds a single reply to a source.
+    Adds replies to a source, one for each entry of journalists, which is the
+    journalist who replied and another journalist who saw the reply, if any.
+    The replies are all encrypted at once.
     """
-    record_source_interaction(source)
-    fname = f"{source.interaction_count}-{source.journalist_filename}-reply.gpg"
-    EncryptionManager.get_default().encrypt_journalist_reply(
+    fnames = []
+    for _ in journalists:
+        record_source_interaction(source)
+        fnames.append(f"{source.interaction_count}-{source.journalist_filename}-reply.gpg")
+    EncryptionManager.get_default().encrypt_journalist_replies(
         for_source=source,
-        reply_in=next(replies),
-        encrypted_reply_path_out=Path(Storage.get_default().path(source.filesystem_id, fname)),
+        replies_in=[next(replies) for _ in journalists],
+        encrypted_reply_paths_out=[
+            Path(Storage.get_default().path(source.filesystem_id, fname)) for fname in fnames
+        ],
     )
-    reply = Reply(journalist, source, fname, Storage.get_default())
-    db.session.add(reply)
+    for fname, (journalist, journalist_who_saw) in zip(fnames, journalists):
+        reply = Reply(journalist, source, fname, Storage.get_default())
+        db.session.add(reply)
 
-    # Journalist who replied has seen the reply
-    author_seen_reply = SeenReply(reply=reply, journalist=journalist)
-    db.session.add(author_seen_reply)
+        # Journalist who replied has seen the reply
+        author_seen_reply = SeenReply(reply=reply, journalist=journalist)
+        db.session.add(author_seen_reply)
 
-    if journalist_who_saw:
-        other_seen_reply = SeenReply(reply=reply, journalist=journalist_who_saw)
-        db.session.add(other_seen_reply)
+        if journalist_who_saw:
+            other_seen_reply = SeenReply(reply=reply, journalist=journalist_who_saw)
+            db.session.add(other_seen_reply)
 
     db.session.commit()
 
@@ -359,9 +372,13 @@ def add_sources(args: argparse.Namespace, journalists: Tuple[Journalist, ...]) -
     for i in range(1, args.source_count + 1):
         source, codename = add_source(use_gpg=args.gpg)
 
+        journalists_who_saw_messages = []
         for _ in range(args.messages_per_source):
-            submit_message(source, secrets.choice(journalists) if seen_message_count > 0 else None)
+            journalists_who_saw_messages.append(
+                secrets.choice(journalists) if seen_message_count > 0 else None
+            )
             seen_message_count -= 1
+        submit_messages(source, journalists_who_saw_messages)
 
         for _ in range(args.files_per_source):
             submit_file(
@@ -375,10 +392,12 @@ def add_sources(args: argparse.Namespace, journalists: Tuple[Journalist, ...]) -
             star_source(source)
 
         if i <= replied_sources_count:
+            reply_journalists = []
             for _ in range(args.replies_per_source):
                 journalist_who_replied = secrets.choice([dellsberg, journalist_to_be_deleted])
                 journalist_who_saw = secrets.choice([default_journalist, None])
-                add_reply(source, journalist_who_replied, journalist_who_saw)
+                reply_journalists.append((journalist_who_replied, journalist_who_saw))
+            add_replies(source, reply_journalists)
 
         print(
             f"Created source {i}/{args.source_count} (codename: '{codename}', "
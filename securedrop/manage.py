@@ -28,8 +28,13 @@ if not os.environ.get("SECUREDROP_ENV"):
 
 from db import db
 from management import SecureDropConfig, app_context
+from management.changes import prune_changes
 from management.run import run
-from management.sources import remove_pending_sources
+from management.sources import (
+    rebuild_source_counters,
+    remove_pending_sources,
+    show_designation_capacity,
+)
 from management.submissions import (
     add_check_db_disconnect_parser,
     add_check_fs_disconnect_parser,
@@ -365,6 +370,24 @@ def get_args() -> argparse.ArgumentParser:
     )
     remove_pending_sources_subp.set_defaults(func=remove_pending_sources)
 
+    designation_capacity_subp = subps.add_parser(
+        "designation-capacity",
+        help="Show how many journalist designations are still available for new sources.",
+    )
+    designation_capacity_subp.set_defaults(func=show_designation_capacity)
+
+    rebuild_source_counters_subp = subps.add_parser(
+        "rebuild-source-counters",
+        help="Recompute the submission counters of all sources from their submissions.",
+    )
+    rebuild_source_counters_subp.set_defaults(func=rebuild_source_counters)
+
+    prune_changes_subp = subps.add_parser(
+        "prune-changes",
+        help="Delete the changes listed by the Journalist API once they are past their retention.",
+    )
+    prune_changes_subp.set_defaults(func=prune_changes)
+
     add_check_db_disconnect_parser(subps)
     add_check_fs_disconnect_parser(subps)
     add_delete_db_disconnect_parser(subps)
@@ -0,0 +1,20 @@
+import argparse
+import datetime
+
+from management import SecureDropConfig, app_context
+from models import Change
+
+
+def prune_changes(args: argparse.Namespace) -> int:
+    """
+    Deletes the changes listed by the Journalist API once they are older
+    than JOURNALIST_API_CHANGES_RETENTION_DAYS.
+    """
+    retention_days = SecureDropConfig.get_current().JOURNALIST_API_CHANGES_RETENTION_DAYS
+    with app_context():
+        num_deleted = Change.prune(
+            datetime.datetime.utcnow() - datetime.timedelta(days=retention_days)
+        )
+
+    print(f"Pruned {num_deleted} change(s) older than {retention_days} day(s)")
+    return 0
@@ -5,6 +5,7 @@ from db import db
 from encryption import EncryptionManager, GpgKeyNotFoundError
 from management import app_context
 from models import Source
+from source_user import _DesignationAllocator
 
 
 def remove_pending_sources(args: argparse.Namespace) -> int:
@@ -45,9 +46,43 @@ def delete_pending_source(source: Source) -> None:
     """
     if source.pending:
         with app_context():
+            journalist_designation = source.journalist_designation
             try:
                 db.session.delete(source)
                 db.session.commit()
             except Exception as exc:
                 db.session.rollback()
                 print(f"ERROR: Could not remove pending source: {exc}.")
+                return
+
+            _DesignationAllocator.get_default().release_journalist_designation(
+                db.session, journalist_designation
+            )
+
+
+def show_designation_capacity(args: argparse.Namespace) -> int:
+    """
+    Shows how many journalist designations can still be given to new
+    sources, to tell when the word lists need to grow.
+    """
+    with app_context():
+        designation_allocator = _DesignationAllocator.get_default()
+        remaining_capacity = designation_allocator.remaining_capacity(db.session)
+
+    print(
+        f"{remaining_capacity} of {designation_allocator.capacity} "
+        "journalist designations are still available"
+    )
+    return 0
+
+
+def rebuild_source_counters(args: argparse.Namespace) -> int:
+    """
+    Recomputes the submission counters of all sources from their
+    submissions, in case they were ever to drift.
+    """
+    with app_context():
+        num_wrong = Source.rebuild_counters()
+
+    print(f"Rebuilt the submission counters of all sources; {num_wrong} source(s) were out of date")
+    return 0
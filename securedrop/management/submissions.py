@@ -9,7 +9,7 @@ from typing import List, Optional
 from db import db
 from flask.ctx import AppContext
 from management import app_context
-from models import Reply, Source, Submission
+from models import Change, Reply, Source, Submission
 from rm import secure_delete
 
 
@@ -70,10 +70,17 @@ def delete_disconnected_db_submissions(args: argparse.Namespace) -> None:
             remove = input("Enter 'y' to delete all submissions missing files: ") == "y"
         if remove:
             print(f"Removing submission IDs {ids}...")
+            for submission in disconnected_submissions:
+                Change.record(submission)
+            for source in {submission.source for submission in disconnected_submissions}:
+                if source is not None:
+                    Change.record(source)
             db.session.query(Submission).filter(Submission.id.in_(ids)).delete(
                 synchronize_session="fetch"
             )
             db.session.commit()
+            # The bulk delete bypasses the sources' submission counters
+            Source.rebuild_counters()
         else:
             print("Not removing disconnected submissions in database.")
 
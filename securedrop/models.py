@@ -5,7 +5,7 @@ import os
 import uuid
 from hmac import compare_digest
 from logging import Logger
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Set, Union
 
 import argon2
 
@@ -18,13 +18,34 @@ from encryption import EncryptionManager, GpgKeyNotFoundError
 from flask import url_for
 from flask_babel import gettext, ngettext
 from passphrases import PassphraseGenerator
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, LargeBinary, String, Text
+from redis import Redis
+from sdconfig import SecureDropConfig
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    and_,
+    func,
+    literal,
+    or_,
+    select,
+)
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Query, backref, relationship
 from sqlalchemy.orm.exc import MultipleResultsFound, NoResultFound
 from store import Storage
 
 _default_instance_config: Optional["InstanceConfig"] = None
+_default_instance_config_version: Optional[str] = None
+_instance_config_redis: Optional[Redis] = None
+
+# Stands in for the source UUID in the API URL templates of Source.to_json_bulk()
+_SOURCE_UUID_PLACEHOLDER = "__source_uuid__"
 
 ARGON2_PARAMS = {"memory_cost": 2**16, "time_cost": 4, "parallelism": 2, "type": argon2.Type.ID}
 
@@ -48,7 +69,7 @@ class Source(db.Model):
     uuid = Column(String(36), unique=True, nullable=False)
     filesystem_id = Column(String(96), unique=True, nullable=False)
     journalist_designation = Column(String(255), nullable=False)
-    last_updated = Column(DateTime)
+    last_updated = Column(DateTime, index=True)
     star = relationship("SourceStar", uselist=False, backref="source")
 
     # sources are "pending" and don't get displayed to journalists until they
@@ -66,6 +87,13 @@ class Source(db.Model):
     pgp_secret_key = Column(Text, nullable=True)
     pgp_fingerprint = Column(String(40), nullable=True)
 
+    # counts and total size of the source's submissions, kept up to date by
+    # update_counters() so that listing sources doesn't require loading them
+    num_documents = Column(Integer, nullable=False, default=0, server_default="0")
+    num_messages = Column(Integer, nullable=False, default=0, server_default="0")
+    num_unread = Column(Integer, nullable=False, default=0, server_default="0")
+    total_size = Column(Integer, nullable=False, default=0, server_default="0")
+
     def __init__(
         self,
         filesystem_id: str,
@@ -92,13 +120,81 @@ class Source(db.Model):
         )
 
     def documents_messages_count(self) -> "Dict[str, int]":
-        self.docs_msgs_count = {"messages": 0, "documents": 0}
-        for submission in self.submissions:
-            if submission.is_message:
-                self.docs_msgs_count["messages"] += 1
-            elif submission.is_file:
-                self.docs_msgs_count["documents"] += 1
-        return self.docs_msgs_count
+        return {"messages": self.num_messages, "documents": self.num_documents}
+
+    def update_counters(
+        self, documents: int = 0, messages: int = 0, unread: int = 0, total_size: int = 0
+    ) -> None:
+        """
+        Adjust the source's submission counters by the given amounts, as
+        part of the current transaction.
+
+        The counters are updated relative to their values in the database,
+        so that concurrent updates don't overwrite each other.
+        """
+        # Make sure a new source has been assigned its ID
+        db.session.flush()
+        db.session.query(Source).filter(Source.id == self.id).update(
+            {
+                Source.num_documents: Source.num_documents + documents,
+                Source.num_messages: Source.num_messages + messages,
+                Source.num_unread: Source.num_unread + unread,
+                Source.total_size: Source.total_size + total_size,
+            },
+            synchronize_session=False,
+        )
+        db.session.expire(self, ["num_documents", "num_messages", "num_unread", "total_size"])
+
+    def count_new_submission(self, submission: "Submission") -> None:
+        """Add a new, and so unread, submission to the source's counters."""
+        self.update_counters(
+            documents=int(submission.is_file),
+            messages=int(submission.is_message),
+            unread=1,
+            total_size=submission.size,
+        )
+
+    @classmethod
+    def rebuild_counters(cls) -> int:
+        """
+        Recompute the submission counters of every source from its
+        submissions.
+
+        Returns the number of sources whose counters were wrong.
+        """
+
+        def count_submissions(*criteria: Any) -> Any:
+            return (
+                select([func.count(Submission.id)])
+                .where(and_(Submission.source_id == cls.id, *criteria))
+                .as_scalar()
+            )
+
+        counters = {
+            cls.num_documents: count_submissions(
+                or_(
+                    Submission.filename.like("%doc.gz.gpg"),
+                    Submission.filename.like("%doc.zip.gpg"),
+                )
+            ),
+            cls.num_messages: count_submissions(Submission.filename.like("%msg.gpg")),
+            cls.num_unread: count_submissions(
+                or_(Submission.downloaded.is_(None), Submission.downloaded.is_(False)),
+                ~Submission.seen_files.any(),
+                ~Submission.seen_messages.any(),
+            ),
+            cls.total_size: select([func.coalesce(func.sum(Submission.size), 0)])
+            .where(Submission.source_id == cls.id)
+            .as_scalar(),
+        }
+        num_wrong = (
+            db.session.query(cls)
+            .filter(or_(*[column != value for column, value in counters.items()]))
+            .count()
+        )
+        db.session.query(cls).update(counters, synchronize_session=False)
+        db.session.commit()
+        return num_wrong
 
     @property
     def collection(self) -> "List[Union[Submission, Reply]]":
@@ -129,39 +225,75 @@ class Source(db.Model):
             return None
 
     def to_json(self) -> "Dict[str, object]":
-        docs_msg_count = self.documents_messages_count()
+        return Source.to_json_bulk([self])[0]
 
-        if self.last_updated:
-            last_updated = self.last_updated
-        else:
-            last_updated = datetime.datetime.now(tz=datetime.timezone.utc)
+    @staticmethod
+    def to_json_bulk(sources: "List[Source]") -> "List[Dict[str, object]]":
+        """Returns the JSON representations of sources, as to_json() would.
 
-        if self.star and self.star.starred:
-            starred = True
-        else:
-            starred = False
+        The keys of legacy sources are looked up together, and the API URLs are
+        built from templates, so that serializing many sources costs no extra
+        queries beyond loading their stars (see joinedload(Source.star)).
+        """
+        legacy_keys = EncryptionManager.get_default().get_source_keys(
+            [
+                source.filesystem_id
+                for source in sources
+                if source.pgp_fingerprint is None or not source.pgp_public_key
+            ]
+        )
 
-        return {
-            "uuid": self.uuid,
-            "url": url_for("api.single_source", source_uuid=self.uuid),
-            "journalist_designation": self.journalist_designation,
-            "is_flagged": False,
-            "is_starred": starred,
-            "last_updated": last_updated,
-            "interaction_count": self.interaction_count,
-            "key": {
-                "type": "PGP",
-                "public": self.public_key,
-                "fingerprint": self.fingerprint,
-            },
-            "number_of_documents": docs_msg_count["documents"],
-            "number_of_messages": docs_msg_count["messages"],
-            "submissions_url": url_for("api.all_source_submissions", source_uuid=self.uuid),
-            "add_star_url": url_for("api.add_star", source_uuid=self.uuid),
-            "remove_star_url": url_for("api.remove_star", source_uuid=self.uuid),
-            "replies_url": url_for("api.all_source_replies", source_uuid=self.uuid),
+        # url_for() is comparatively slow, so only build each URL once
+        url_templates = {
+            name: url_for(endpoint, source_uuid=_SOURCE_UUID_PLACEHOLDER)
+            for name, endpoint in (
+                ("url", "api.single_source"),
+                ("submissions_url", "api.all_source_submissions"),
+                ("add_star_url", "api.add_star"),
+                ("remove_star_url", "api.remove_star"),
+                ("replies_url", "api.all_source_replies"),
+            )
         }
 
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        serialized = []
+        for source in sources:
+            legacy_fingerprint, legacy_public_key = legacy_keys.get(
+                source.filesystem_id, (None, None)
+            )
+            if source.pgp_fingerprint is not None:
+                fingerprint: Optional[str] = source.pgp_fingerprint
+            else:
+                fingerprint = legacy_fingerprint
+
+            urls = {
+                name: template.replace(_SOURCE_UUID_PLACEHOLDER, source.uuid)
+                for name, template in url_templates.items()
+            }
+            serialized.append(
+                {
+                    "uuid": source.uuid,
+                    "url": urls["url"],
+                    "journalist_designation": source.journalist_designation,
+                    "is_flagged": False,
+                    "is_starred": bool(source.star and source.star.starred),
+                    "last_updated": source.last_updated or now,
+                    "interaction_count": source.interaction_count,
+                    "key": {
+                        "type": "PGP",
+                        "public": source.pgp_public_key or legacy_public_key,
+                        "fingerprint": fingerprint,
+                    },
+                    "number_of_documents": source.num_documents,
+                    "number_of_messages": source.num_messages,
+                    "submissions_url": urls["submissions_url"],
+                    "add_star_url": urls["add_star_url"],
+                    "remove_star_url": urls["remove_star_url"],
+                    "replies_url": urls["replies_url"],
+                }
+            )
+        return serialized
+
 
 class Submission(db.Model):
     MAX_MESSAGE_LEN = 100000
@@ -199,19 +331,32 @@ class Submission(db.Model):
     def is_message(self) -> bool:
         return self.filename.endswith("msg.gpg")
 
-    def to_json(self) -> "Dict[str, Any]":
-        seen_by = {
-            f.journalist.uuid
-            for f in SeenFile.query.filter(SeenFile.file_id == self.id)
-            if f.journalist
-        }
-        seen_by.update(
-            {
-                m.journalist.uuid
-                for m in SeenMessage.query.filter(SeenMessage.message_id == self.id)
-                if m.journalist
-            }
-        )
+    @staticmethod
+    def seen_by_journalists(*criteria: Any) -> "Dict[int, Set[str]]":
+        """Returns the UUIDs of the journalists who have seen each of the submissions
+        matching criteria, keyed by submission ID.
+
+        Only takes one query per seen table, so that listings can pass each
+        submission's set to to_json() instead of querying it per submission.
+        """
+        seen_by: Dict[int, Set[str]] = {}
+        for submission_id, journalist_id in (
+            (SeenFile.file_id, SeenFile.journalist_id),
+            (SeenMessage.message_id, SeenMessage.journalist_id),
+        ):
+            rows = (
+                db.session.query(submission_id, Journalist.uuid)
+                .join(Journalist, journalist_id == Journalist.id)
+                .join(Submission, submission_id == Submission.id)
+                .filter(*criteria)
+            )
+            for seen_id, journalist_uuid in rows:
+                seen_by.setdefault(seen_id, set()).add(journalist_uuid)
+        return seen_by
+
+    def to_json(self, seen_by: "Optional[Set[str]]" = None) -> "Dict[str, Any]":
+        if seen_by is None:
+            seen_by = Submission.seen_by_journalists(Submission.id == self.id).get(self.id, set())
         return {
             "source_url": (
                 url_for("api.single_source", source_uuid=self.source.uuid) if self.source else None
@@ -229,7 +374,7 @@ class Submission(db.Model):
             "size": self.size,
             "is_file": self.is_file,
             "is_message": self.is_message,
-            "is_read": self.seen,
+            "is_read": bool(self.downloaded or seen_by),
             "uuid": self.uuid,
             "download_url": (
                 url_for(
@@ -286,8 +431,25 @@ class Reply(db.Model):
     def __repr__(self) -> str:
         return f"<Reply {self.filename!r}>"
 
-    def to_json(self) -> "Dict[str, Any]":
-        seen_by = [r.journalist.uuid for r in SeenReply.query.filter(SeenReply.reply_id == self.id)]
+    @staticmethod
+    def seen_by_journalists(*criteria: Any) -> "Dict[int, List[str]]":
+        """Returns the UUIDs of the journalists who have seen each of the replies
+        matching criteria, keyed by reply ID, in a single query.
+        """
+        seen_by: Dict[int, List[str]] = {}
+        rows = (
+            db.session.query(SeenReply.reply_id, Journalist.uuid)
+            .join(Journalist, SeenReply.journalist_id == Journalist.id)
+            .join(Reply, SeenReply.reply_id == Reply.id)
+            .filter(*criteria)
+        )
+        for reply_id, journalist_uuid in rows:
+            seen_by.setdefault(reply_id, []).append(journalist_uuid)
+        return seen_by
+
+    def to_json(self, seen_by: "Optional[List[str]]" = None) -> "Dict[str, Any]":
+        if seen_by is None:
+            seen_by = Reply.seen_by_journalists(Reply.id == self.id).get(self.id, [])
         return {
             "source_url": (
                 url_for("api.single_source", source_uuid=self.source.uuid) if self.source else None
@@ -329,6 +491,120 @@ class SourceStar(db.Model):
         self.starred = starred
 
 
+class Change(db.Model):
+    """A change to a source, submission or reply as exposed by the journalist API, so that
+    clients can sync incrementally through GET /api/v1/changes.
+
+    Changes are recorded alongside the mutations they describe, in the same transaction,
+    and their IDs serve as the sync cursor. A change to an object that no longer exists
+    is a tombstone. Old changes are pruned, after which clients can no longer sync from
+    a cursor that precedes them.
+    """
+
+    __tablename__ = "changes"
+    __table_args__ = (
+        # Changes are listed by object type, within a range of cursors
+        db.Index("ix_changes_object_type_id", "object_type", "id"),
+        # AUTOINCREMENT, so that IDs are never reused and cursors keep increasing
+        {"sqlite_autoincrement": True},
+    )
+    id = Column(Integer, primary_key=True)
+    object_type = Column(String(20), nullable=False)
+    object_uuid = Column(String(36), nullable=False)
+    timestamp = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    SOURCE = "source"
+    SUBMISSION = "submission"
+    REPLY = "reply"
+
+    @staticmethod
+    def record(obj: "Union[Source, Submission, Reply]") -> None:
+        """Records that obj was created, changed or deleted. Stars and seen marks are
+        changes to the starred source and the seen submission or reply.
+        """
+        if isinstance(obj, Source):
+            object_type = Change.SOURCE
+        elif isinstance(obj, Submission):
+            object_type = Change.SUBMISSION
+        else:
+            object_type = Change.REPLY
+        db.session.add(Change(object_type=object_type, object_uuid=obj.uuid))
+
+    @staticmethod
+    def record_journalist(journalist: "Journalist") -> None:
+        """Records that the replies of journalist and the submissions and replies they have
+        seen changed, as they show the journalist's names and UUID.
+        """
+        now = datetime.datetime.utcnow()
+        changed = [
+            select([literal(Change.REPLY), Reply.uuid, literal(now)]).where(
+                Reply.journalist_id == journalist.id
+            ),
+            select([literal(Change.SUBMISSION), Submission.uuid, literal(now)]).where(
+                and_(SeenFile.file_id == Submission.id, SeenFile.journalist_id == journalist.id)
+            ),
+            select([literal(Change.SUBMISSION), Submission.uuid, literal(now)]).where(
+                and_(
+                    SeenMessage.message_id == Submission.id,
+                    SeenMessage.journalist_id == journalist.id,
+                )
+            ),
+            select([literal(Change.REPLY), Reply.uuid, literal(now)]).where(
+                and_(SeenReply.reply_id == Reply.id, SeenReply.journalist_id == journalist.id)
+            ),
+        ]
+        for query in changed:
+            db.session.execute(
+                Change.__table__.insert().from_select(
+                    ["object_type", "object_uuid", "timestamp"], query
+                )
+            )
+
+    @staticmethod
+    def latest_cursor() -> int:
+        return db.session.query(func.max(Change.id)).scalar() or 0
+
+    @staticmethod
+    def oldest_cursor() -> int:
+        """The oldest cursor that changes can still be listed from."""
+        oldest_id = db.session.query(func.min(Change.id)).scalar()
+        return oldest_id - 1 if oldest_id is not None else 0
+
+    @staticmethod
+    def latest() -> "Optional[Change]":
+        return Change.query.order_by(Change.id.desc()).first()
+
+    @staticmethod
+    def prune(before: datetime.datetime) -> int:
+        """Delete the changes recorded before the given time, and return how many were.
+
+        Only the oldest changes are deleted, up to the last one recorded before the given
+        time, so that no later change is left out when listing changes from a cursor that
+        is still valid. The latest change is kept, as the current cursor.
+        """
+        prune_until = (
+            db.session.query(func.max(Change.id)).filter(Change.timestamp < before).scalar()
+        )
+        if prune_until is None:
+            return 0
+        num_deleted = Change.query.filter(
+            Change.id <= prune_until, Change.id < Change.latest_cursor()
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return num_deleted
+
+    @staticmethod
+    def changed_uuids(object_type: str, since: int, until: int) -> Query:
+        """Query for the UUIDs of the objects of object_type changed after the change
+        since, up to and including the change until.
+        """
+        return (
+            db.session.query(Change.object_uuid)
+            .filter(Change.object_type == object_type, Change.id > since, Change.id <= until)
+            .distinct()
+        )
+
+
 class InvalidUsernameException(Exception):
     """Raised when a user logs in with an invalid username"""
 
@@ -732,6 +1008,7 @@ class Journalist(db.Model):
         Callers must commit the session themselves
         """
         deleted = self.get_deleted()
+        Change.record_journalist(self)
         # All replies should be reassociated with the "deleted" journalist
         for reply in Reply.query.filter_by(journalist_id=self.id).all():
             reply.journalist_id = deleted.id
@@ -874,13 +1151,47 @@ class InstanceConfig(db.Model):
 
         return new
 
+    # Incremented every time the configuration changes, so that each process only has to reload
+    # its copy of the configuration from the database when it is actually outdated
+    REDIS_VERSION_KEY = "sd/instance-config-version"
+
+    @classmethod
+    def _get_redis(cls) -> Redis:
+        global _instance_config_redis
+        if _instance_config_redis is None:
+            config = SecureDropConfig.get_current()
+            _instance_config_redis = Redis(decode_responses=True, **config.REDIS_KWARGS)
+        return _instance_config_redis
+
     @classmethod
     def get_default(cls, refresh: bool = False) -> "InstanceConfig":
-        global _default_instance_config
+        """Return this process' copy of the current configuration.
+
+        With refresh=True, the copy is reloaded from the database if the configuration was
+        changed since it was loaded, possibly by another process.
+        """
+        global _default_instance_config, _default_instance_config_version
         if (_default_instance_config is None) or (refresh is True):
-            _default_instance_config = InstanceConfig.get_current()
+            redis = cls._get_redis()
+            version = redis.get(cls.REDIS_VERSION_KEY)
+            if (
+                (_default_instance_config is None)
+                or (version is None)
+                or (version != _default_instance_config_version)
+            ):
+                # Keep a detached copy, which remains usable after the session it was loaded
+                # in is committed or closed at the end of the request
+                _default_instance_config = InstanceConfig.get_current().copy()
+                if version is None:
+                    redis.set(cls.REDIS_VERSION_KEY, 0, nx=True)
+                _default_instance_config_version = version
         return _default_instance_config
 
+    @classmethod
+    def invalidate_default(cls) -> None:
+        """Make every process reload its copy of the configuration on its next refresh."""
+        cls._get_redis().incr(cls.REDIS_VERSION_KEY)
+
     @classmethod
     def get_current(cls) -> "InstanceConfig":
         """If the database was created via db.create_all(), data migrations
@@ -924,6 +1235,7 @@ class InstanceConfig(db.Model):
         db.session.add(new)
 
         db.session.commit()
+        cls.invalidate_default()
 
     @classmethod
     def update_submission_prefs(
@@ -944,3 +1256,4 @@ class InstanceConfig(db.Model):
         db.session.add(new)
 
         db.session.commit()
+        cls.invalidate_default()
@@ -75,6 +75,25 @@ class SecureDropConfig:
 
     env: str = "prod"
 
+    # How many pre-generated key pairs to keep available for new sources
+    SOURCE_KEY_POOL_SIZE: int = 10
+
+    # How many source passphrases can be stretched with scrypt at the same time, and how many
+    # more logins can wait for their turn before the Source Interface starts rejecting them
+    SCRYPT_WORKERS: int = 4
+    SCRYPT_MAX_PENDING: int = 16
+
+    # How many sources to list on each page of the Journalist Interface's index
+    JOURNALIST_INDEX_PAGE_SIZE: int = 100
+
+    # Whether to gzip the Journalist API's JSON responses of at least this many bytes, for
+    # clients that accept it
+    JOURNALIST_API_COMPRESSION: bool = True
+    JOURNALIST_API_COMPRESSION_MIN_SIZE: int = 1024
+
+    # How many days the changes listed by the Journalist API's /changes endpoint are kept
+    JOURNALIST_API_CHANGES_RETENTION_DAYS: int = 30
+
     @property
     def TEMP_DIR(self) -> Path:
         # We use a directory under the SECUREDROP_DATA_ROOT instead of `/tmp` because
@@ -127,6 +146,22 @@ def _parse_config_from_file(config_module_name: str) -> SecureDropConfig:
 
     env = getattr(config_from_local_file, "env", "prod")
 
+    final_source_key_pool_size = getattr(config_from_local_file, "SOURCE_KEY_POOL_SIZE", 10)
+    final_scrypt_workers = getattr(config_from_local_file, "SCRYPT_WORKERS", 4)
+    final_scrypt_max_pending = getattr(config_from_local_file, "SCRYPT_MAX_PENDING", 16)
+    final_journalist_index_page_size = getattr(
+        config_from_local_file, "JOURNALIST_INDEX_PAGE_SIZE", 100
+    )
+    final_journalist_api_compression = getattr(
+        config_from_local_file, "JOURNALIST_API_COMPRESSION", True
+    )
+    final_journalist_api_compression_min_size = getattr(
+        config_from_local_file, "JOURNALIST_API_COMPRESSION_MIN_SIZE", 1024
+    )
+    final_journalist_api_changes_retention_days = getattr(
+        config_from_local_file, "JOURNALIST_API_CHANGES_RETENTION_DAYS", 30
+    )
+
     try:
         final_securedrop_root = Path(config_from_local_file.SECUREDROP_ROOT)
     except AttributeError:
@@ -222,4 +257,11 @@ def _parse_config_from_file(config_module_name: str) -> SecureDropConfig:
         SESSION_EXPIRATION_MINUTES=final_sess_expiration_mins,
         RQ_WORKER_NAME=final_worker_name,
         REDIS_PASSWORD=final_redis_password,
+        SOURCE_KEY_POOL_SIZE=final_source_key_pool_size,
+        SCRYPT_WORKERS=final_scrypt_workers,
+        SCRYPT_MAX_PENDING=final_scrypt_max_pending,
+        JOURNALIST_INDEX_PAGE_SIZE=final_journalist_index_page_size,
+        JOURNALIST_API_COMPRESSION=final_journalist_api_compression,
+        JOURNALIST_API_COMPRESSION_MIN_SIZE=final_journalist_api_compression_min_size,
+        JOURNALIST_API_CHANGES_RETENTION_DAYS=final_journalist_api_changes_retention_days,
     )
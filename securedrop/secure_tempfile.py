@@ -1,7 +1,7 @@
 import base64
 import os
 from tempfile import _TemporaryFileWrapper  # type: ignore
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
 
 from cryptography.exceptions import AlreadyFinalized
 from cryptography.hazmat.backends import default_backend
@@ -120,6 +120,30 @@ class SecureTemporaryFile(_TemporaryFileWrapper):
         else:
             return self.decryptor.update(self.file.read())
 
+    def prepare_native_read(self) -> Tuple[bytes, bytes]:
+        """Prepare the file to be read by native code, such as
+        `redwood.encrypt_stream()`, which reads the file on disk
+        directly and decrypts it on its own instead of calling
+        :meth:`read`.
+
+        Like :meth:`read`, this can only be done after the file has
+        been written to, and it cannot be written to afterwards.
+
+        Returns: the AES key and initialization vector the contents
+            of the file are encrypted with.
+        """
+        if self.last_action == "init":
+            raise AssertionError("You must write before reading!")
+        if self.last_action == "read":
+            raise AssertionError("The file has already been read!")
+        self.last_action = "read"
+
+        # Make sure everything that was written is on disk, and that
+        # the file is read from the beginning
+        self.file.flush()
+        self.seek(0, 0)
+        return self.key, self.iv
+
     def close(self) -> None:
         """The __del__ method in tempfile._TemporaryFileWrapper (which
         SecureTemporaryFile class inherits from) calls close() when the
@@ -1,14 +1,20 @@
-import functools
+from static_resources import StaticResourceCache
 
 FOCAL_VERSION = "20.04"
 
+OS_RELEASE_PATH = "/etc/os-release"
 
-@functools.lru_cache
-def get_os_release() -> str:
-    with open("/etc/os-release") as f:
+
+def _read_os_release() -> str:
+    with open(OS_RELEASE_PATH) as f:
         os_release = f.readlines()
         for line in os_release:
             if line.startswith("VERSION_ID="):
                 version_id = line.split("=")[1].strip().strip('"')
                 break
     return version_id
+
+
+def get_os_release() -> str:
+    # Cached, but read again if the server gets upgraded in place
+    return StaticResourceCache.get_default().get("os-release", [OS_RELEASE_PATH], _read_os_release)
@@ -17,7 +17,9 @@ from sdconfig import SecureDropConfig
 from source_app import api, info, main
 from source_app.decorators import ignore_static
 from source_app.utils import clear_session_and_redirect_to_logged_out_page
+from source_user import SourceKdfOverloadedError
 from startup import validate_journalist_key
+from static_resources import StaticResourceCache
 
 
 def get_logo_url(app: Flask) -> str:
@@ -28,12 +30,20 @@ def get_logo_url(app: Flask) -> str:
     default_logo_filename = "i/logo.png"
     custom_logo_path = Path(app.static_folder) / custom_logo_filename
     default_logo_path = Path(app.static_folder) / default_logo_filename
-    if custom_logo_path.is_file():
-        return url_for("static", filename=custom_logo_filename)
-    elif default_logo_path.is_file():
-        return url_for("static", filename=default_logo_filename)
 
-    raise FileNotFoundError
+    def find_logo() -> Optional[str]:
+        if custom_logo_path.is_file():
+            return custom_logo_filename
+        elif default_logo_path.is_file():
+            return default_logo_filename
+        return None
+
+    logo_filename = StaticResourceCache.get_default().get(
+        f"logo:{app.static_folder}", [custom_logo_path, default_logo_path], find_logo
+    )
+    if logo_filename is None:
+        raise FileNotFoundError
+    return url_for("static", filename=logo_filename)
 
 
 def create_app(config: SecureDropConfig) -> Flask:
@@ -128,6 +138,14 @@ def create_app(config: SecureDropConfig) -> Flask:
     def internal_error(error: werkzeug.exceptions.HTTPException) -> Tuple[str, int]:
         return render_template("error.html"), 500
 
+    @app.errorhandler(SourceKdfOverloadedError)
+    def kdf_overloaded(error: SourceKdfOverloadedError) -> werkzeug.Response:
+        # Fail fast rather than queueing even more logins behind the pending ones
+        app.logger.warning(f"Rejecting request: {error}")
+        response = make_response(render_template("error.html"), 503)
+        response.headers["Retry-After"] = "5"
+        return response
+
     # Obscure the creation time of source private keys by touching them all
     # on startup.
     private_keys = config.GPG_KEY_DIR / "private-keys-v1.d"
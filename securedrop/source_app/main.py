@@ -7,7 +7,7 @@ from typing import Union
 import store
 import werkzeug
 from db import db
-from encryption import EncryptionManager, GpgDecryptError, GpgKeyNotFoundError
+from encryption import EncryptionManager, GpgKeyNotFoundError
 from flask import (
     Blueprint,
     abort,
@@ -21,7 +21,7 @@ from flask import (
     url_for,
 )
 from flask_babel import gettext
-from models import InstanceConfig, Reply, Submission, get_one_or_else
+from models import Change, InstanceConfig, Reply, Submission, get_one_or_else
 from passphrases import DicewarePassphrase, PassphraseGenerator
 from sdconfig import SecureDropConfig
 from source_app.decorators import login_required
@@ -34,6 +34,7 @@ from source_app.utils import (
     flash_msg,
     normalize_timestamps,
 )
+from source_key_pool import SourceKeyPool
 from source_user import (
     InvalidPassphraseError,
     SourceDesignationCollisionError,
@@ -43,9 +44,6 @@ from source_user import (
 )
 from store import Storage
 
-import redwood
-from redwood import RedwoodError
-
 
 def make_blueprint(config: SecureDropConfig) -> Blueprint:
     view = Blueprint("main", __name__)
@@ -155,6 +153,8 @@ def make_blueprint(config: SecureDropConfig) -> Blueprint:
         else:
             min_message_length = 0
 
+        # Read all the replies first so they can be decrypted in one go
+        reply_files = []
         for reply in source_inbox:
             reply_path = Storage.get_default().path(
                 logged_in_source.filesystem_id,
@@ -162,19 +162,23 @@ def make_blueprint(config: SecureDropConfig) -> Blueprint:
             )
             try:
                 with open(reply_path, "rb") as f:
-                    contents = f.read()
-                decrypted_reply = EncryptionManager.get_default().decrypt_journalist_reply(
-                    for_source_user=logged_in_source,
-                    ciphertext_in=contents,
-                )
-                reply.decrypted = decrypted_reply
-            except UnicodeDecodeError:
-                current_app.logger.error(f"Could not decode reply {reply.filename}")
+                    reply_files.append((reply, reply_path, f.read()))
             except FileNotFoundError:
                 current_app.logger.error(f"Reply file missing: {reply.filename}")
-            except (GpgDecryptError, RedwoodError) as e:
-                current_app.logger.error(f"Could not decrypt reply {reply.filename}: {str(e)}")
+
+        decrypted_replies = EncryptionManager.get_default().decrypt_journalist_replies(
+            for_source_user=logged_in_source,
+            ciphertexts_in=[contents for _, _, contents in reply_files],
+        )
+        for (reply, reply_path, _), decrypted_reply in zip(reply_files, decrypted_replies):
+            if isinstance(decrypted_reply, UnicodeDecodeError):
+                current_app.logger.error(f"Could not decode reply {reply.filename}")
+            elif isinstance(decrypted_reply, Exception):
+                current_app.logger.error(
+                    f"Could not decrypt reply {reply.filename}: {str(decrypted_reply)}"
+                )
             else:
+                reply.decrypted = decrypted_reply
                 reply.date = datetime.utcfromtimestamp(os.stat(reply_path).st_mtime)
                 replies.append(reply)
 
@@ -299,10 +303,13 @@ def make_blueprint(config: SecureDropConfig) -> Blueprint:
         for fname in fnames:
             submission = Submission(logged_in_source_in_db, fname, Storage.get_default())
             db.session.add(submission)
+            logged_in_source_in_db.count_new_submission(submission)
+            Change.record(submission)
             new_submissions.append(submission)
 
         logged_in_source_in_db.pending = False
         logged_in_source_in_db.last_updated = datetime.now(timezone.utc)
+        Change.record(logged_in_source_in_db)
         db.session.commit()
 
         for sub in new_submissions:
@@ -326,6 +333,7 @@ def make_blueprint(config: SecureDropConfig) -> Blueprint:
         reply = get_one_or_else(query, current_app.logger, abort)
         reply.deleted_by_source = True
         db.session.add(reply)
+        Change.record(reply)
         db.session.commit()
 
         flash_msg("success", gettext("Success!"), gettext("Reply deleted"))
@@ -346,6 +354,7 @@ def make_blueprint(config: SecureDropConfig) -> Blueprint:
         for reply in replies:
             reply.deleted_by_source = True
             db.session.add(reply)
+            Change.record(reply)
         db.session.commit()
 
         flash_msg("success", gettext("Success!"), gettext("All replies have been deleted"))
@@ -370,13 +379,14 @@ def make_blueprint(config: SecureDropConfig) -> Blueprint:
         if source.fingerprint is None:
             # This legacy source didn't have a PGP keypair generated yet,
             # do it now.
-            public_key, secret_key, fingerprint = redwood.generate_source_key_pair(
+            public_key, secret_key, fingerprint = SourceKeyPool.get_default().get_key_pair(
                 source_user.gpg_secret, source_user.filesystem_id
             )
             source.pgp_public_key = public_key
             source.pgp_secret_key = secret_key
             source.pgp_fingerprint = fingerprint
             db.session.add(source)
+            Change.record(source)
             db.session.commit()
         elif source.pgp_secret_key is None:
             # Need to migrate the secret key out of GPG
@@ -1,8 +1,13 @@
+import json
 from datetime import datetime, timedelta, timezone
-from typing import TYPE_CHECKING
+from hashlib import sha256
+from typing import TYPE_CHECKING, Optional, Tuple
 
+import models
 import sqlalchemy
+from cryptography.fernet import Fernet, InvalidToken
 from flask import session
+from redis import Redis
 from sdconfig import SecureDropConfig
 from source_user import InvalidPassphraseError, SourceUser, authenticate_source_user
 
@@ -26,12 +31,69 @@ class UserHasBeenDeleted(_InvalidUserSession):
     pass
 
 
+_default_identity_cache: Optional["SourceIdentityCache"] = None
+
+
+class SourceIdentityCache:
+    """Server-side, expiring cache of the values derived from a logged-in source's passphrase.
+
+    Deriving the filesystem_id and the GPG secret from a passphrase takes two scrypt
+    computations, which is too expensive to repeat on every request. Instead they are derived
+    once at login and kept in Redis until the session expires. Each entry is encrypted with a
+    random key that only exists in the source's session cookie, and is stored under a hash of
+    that key, so the content of Redis alone is not enough to recover a source's secrets.
+    """
+
+    REDIS_KEY_PREFIX = "sd/source-identity/"
+
+    def __init__(self, redis: Redis) -> None:
+        self._redis = redis
+
+    @classmethod
+    def get_default(cls) -> "SourceIdentityCache":
+        global _default_identity_cache
+        if _default_identity_cache is None:
+            config = SecureDropConfig.get_current()
+            _default_identity_cache = cls(redis=Redis(**config.REDIS_KWARGS))
+        return _default_identity_cache
+
+    def _redis_key(self, token: str) -> str:
+        return self.REDIS_KEY_PREFIX + sha256(token.encode("utf-8")).hexdigest()
+
+    def store(self, filesystem_id: str, gpg_secret: str, lifetime: timedelta) -> str:
+        """Cache the source's derived values and return the token needed to retrieve them."""
+        token = Fernet.generate_key().decode("utf-8")
+        entry = json.dumps({"filesystem_id": filesystem_id, "gpg_secret": gpg_secret})
+        self._redis.setex(
+            name=self._redis_key(token),
+            time=max(int(lifetime.total_seconds()), 1),
+            value=Fernet(token.encode("utf-8")).encrypt(entry.encode("utf-8")),
+        )
+        return token
+
+    def retrieve(self, token: str) -> Optional[Tuple[str, str]]:
+        """Return the cached (filesystem_id, gpg_secret), or None if the entry is gone."""
+        encrypted_entry = self._redis.get(self._redis_key(token))
+        if encrypted_entry is None:
+            return None
+        try:
+            entry = json.loads(Fernet(token.encode("utf-8")).decrypt(encrypted_entry))
+        except (InvalidToken, ValueError):
+            return None
+        return entry["filesystem_id"], entry["gpg_secret"]
+
+    def evict(self, token: str) -> None:
+        self._redis.delete(self._redis_key(token))
+
+
 class SessionManager:
     """Helper to manage the user's session cookie accessible via flask.session."""
 
     # The keys in flask.session for the user's passphrase and expiration date
     _SESSION_COOKIE_KEY_FOR_CODENAME = "codename"
     _SESSION_COOKIE_KEY_FOR_EXPIRATION_DATE = "expires"
+    # The key in flask.session for the token of the user's cached identity
+    _SESSION_COOKIE_KEY_FOR_IDENTITY = "identity"
 
     @classmethod
     def log_user_in(
@@ -52,10 +114,18 @@ class SessionManager:
             datetime.now(timezone.utc) + session_duration
         )
 
+        # Cache the values derived from the passphrase so later requests don't re-derive them
+        cls._cache_identity(source_user, session_duration)
+
         return source_user
 
     @classmethod
     def log_user_out(cls) -> None:
+        # Remove the user's cached identity from the server
+        identity_token = session.get(cls._SESSION_COOKIE_KEY_FOR_IDENTITY)
+        if identity_token:
+            SourceIdentityCache.get_default().evict(identity_token)
+
         # Remove session data from the session cookie
         try:
             del session[cls._SESSION_COOKIE_KEY_FOR_CODENAME]
@@ -67,6 +137,11 @@ class SessionManager:
         except KeyError:
             pass
 
+        try:
+            del session[cls._SESSION_COOKIE_KEY_FOR_IDENTITY]
+        except KeyError:
+            pass
+
     @classmethod
     def get_logged_in_user(cls, db_session: sqlalchemy.orm.Session) -> SourceUser:
         # Retrieve the user's passphrase from the Flask session cookie
@@ -77,19 +152,24 @@ class SessionManager:
             cls.log_user_out()
             raise UserNotLoggedIn()
 
-        if datetime.now(timezone.utc) >= date_session_expires:
+        now = datetime.now(timezone.utc)
+        if now >= date_session_expires:
             cls.log_user_out()
             raise UserSessionExpired()
 
-        # Fetch the user's info
-        try:
-            source_user = authenticate_source_user(
-                db_session=db_session, supplied_passphrase=user_passphrase
-            )
-        except InvalidPassphraseError:
-            # The cookie contains a passphrase that is invalid: happens if the user was deleted
-            cls.log_user_out()
-            raise UserHasBeenDeleted()
+        # Fetch the user's info, using the cached identity if there is one
+        source_user = cls._get_cached_user(db_session)
+        if source_user is None:
+            try:
+                source_user = authenticate_source_user(
+                    db_session=db_session, supplied_passphrase=user_passphrase
+                )
+            except InvalidPassphraseError:
+                # The cookie contains a passphrase that is invalid: happens if the user was deleted
+                cls.log_user_out()
+                raise UserHasBeenDeleted()
+
+            cls._cache_identity(source_user, date_session_expires - now)
 
         return source_user
 
@@ -101,3 +181,39 @@ class SessionManager:
             return False
 
         return True
+
+    @classmethod
+    def _cache_identity(cls, source_user: SourceUser, lifetime: timedelta) -> None:
+        identity_cache = SourceIdentityCache.get_default()
+        previous_token = session.get(cls._SESSION_COOKIE_KEY_FOR_IDENTITY)
+        if previous_token:
+            identity_cache.evict(previous_token)
+
+        session[cls._SESSION_COOKIE_KEY_FOR_IDENTITY] = identity_cache.store(
+            filesystem_id=source_user.filesystem_id,
+            gpg_secret=source_user.gpg_secret,
+            lifetime=lifetime,
+        )
+
+    @classmethod
+    def _get_cached_user(cls, db_session: sqlalchemy.orm.Session) -> Optional[SourceUser]:
+        identity_token = session.get(cls._SESSION_COOKIE_KEY_FOR_IDENTITY)
+        if not identity_token:
+            return None
+
+        cached_identity = SourceIdentityCache.get_default().retrieve(identity_token)
+        if cached_identity is None:
+            return None
+
+        filesystem_id, gpg_secret = cached_identity
+        source_db_record = (
+            db_session.query(models.Source)
+            .filter_by(filesystem_id=filesystem_id, deleted_at=None)
+            .one_or_none()
+        )
+        if source_db_record is None:
+            # The source was deleted since they logged in
+            cls.log_user_out()
+            raise UserHasBeenDeleted()
+
+        return SourceUser(source_db_record, filesystem_id, gpg_secret)
@@ -5,11 +5,14 @@ import typing
 from hmac import compare_digest
 
 import werkzeug
+from db import db
 from flask import current_app, flash, redirect, render_template, url_for
 from flask.sessions import SessionMixin
 from flask_babel import gettext
 from markupsafe import Markup, escape
+from models import Submission
 from source_user import SourceUser
+from static_resources import StaticResourceCache
 from store import Storage
 
 if typing.TYPE_CHECKING:
@@ -72,10 +75,13 @@ def normalize_timestamps(logged_in_source: SourceUser) -> None:
     minimizes metadata that could be useful to investigators. See
     #301.
     """
-    source_in_db = logged_in_source.get_db_record()
+    # Only the filenames are needed, so don't load the (likely expired) source and submissions
+    submission_filenames = db.session.query(Submission.filename).filter_by(
+        source_id=logged_in_source.db_record_id
+    )
     sub_paths = [
-        Storage.get_default().path(logged_in_source.filesystem_id, submission.filename)
-        for submission in source_in_db.submissions
+        Storage.get_default().path(logged_in_source.filesystem_id, filename)
+        for (filename,) in submission_filenames
     ]
     if len(sub_paths) > 1:
         args = ["touch", "--no-create"]
@@ -105,8 +111,15 @@ def check_url_file(path: str, regexp: str) -> "Optional[str]":
         return None
 
 
+SOURCE_V3_URL_PATH = "/var/lib/securedrop/source_v3_url"
+
+
 def get_sourcev3_url() -> "Optional[str]":
-    return check_url_file("/var/lib/securedrop/source_v3_url", r"^[a-z0-9]{56}\.onion$")
+    return StaticResourceCache.get_default().get(
+        "source_v3_url",
+        [SOURCE_V3_URL_PATH],
+        lambda: check_url_file(SOURCE_V3_URL_PATH, r"^[a-z0-9]{56}\.onion$"),
+    )
 
 
 def fit_codenames_into_cookie(codenames: dict) -> dict:
@@ -0,0 +1,86 @@
+import hmac
+import json
+from hashlib import sha256
+from typing import Optional, Tuple
+
+from redis import Redis
+from sdconfig import SecureDropConfig
+
+import redwood
+
+_default_source_key_pool: Optional["SourceKeyPool"] = None
+
+
+class SourceKeyPool:
+    """A pool of pre-generated PGP key pairs for new sources.
+
+    Generating an RSA-4096 key pair takes seconds of CPU, which is too long to do within the
+    request that creates a source. Instead, key pairs are generated ahead of time by the
+    source key pool daemon (see scripts/source_key_pool) and stored in Redis until a new source
+    claims one. Pooled key pairs have no user ID and their secret key is protected with a
+    passphrase derived from the server's scrypt pepper; when claimed, the source's user ID is
+    added and the secret key is re-protected with the source's own passphrase.
+    """
+
+    REDIS_POOL_LIST = "sd/source-key-pool"
+
+    def __init__(self, redis: Redis, pool_passphrase: str, size: int) -> None:
+        self._redis = redis
+        self._pool_passphrase = pool_passphrase
+        self.size = size
+
+    @classmethod
+    def get_default(cls) -> "SourceKeyPool":
+        global _default_source_key_pool
+        if _default_source_key_pool is None:
+            config = SecureDropConfig.get_current()
+            _default_source_key_pool = cls(
+                redis=Redis(decode_responses=True, **config.REDIS_KWARGS),
+                pool_passphrase=hmac.new(
+                    config.SCRYPT_GPG_PEPPER.encode("utf-8"), b"source-key-pool", sha256
+                ).hexdigest(),
+                size=config.SOURCE_KEY_POOL_SIZE,
+            )
+        return _default_source_key_pool
+
+    def available(self) -> int:
+        return self._redis.llen(self.REDIS_POOL_LIST)
+
+    def refill(self) -> int:
+        """Generate key pairs until the pool is back to its configured size.
+
+        Returns the number of key pairs that were added.
+        """
+        added = 0
+        while self.available() < self.size:
+            secret_key, fingerprint = redwood.generate_unbound_key_pair(self._pool_passphrase)
+            self._redis.rpush(
+                self.REDIS_POOL_LIST,
+                json.dumps({"secret_key": secret_key, "fingerprint": fingerprint}),
+            )
+            added += 1
+        return added
+
+    def claim(self, passphrase: str, email: str) -> Optional[Tuple[str, str, str]]:
+        """Take a key pair out of the pool and bind it to a source.
+
+        Returns the public key, secret key and fingerprint like
+        `redwood.generate_source_key_pair()`, or None if the pool is empty.
+        """
+        pooled_key_pair = self._redis.lpop(self.REDIS_POOL_LIST)
+        if pooled_key_pair is None:
+            return None
+
+        return redwood.bind_source_key_pair(
+            json.loads(pooled_key_pair)["secret_key"],
+            self._pool_passphrase,
+            passphrase,
+            email,
+        )
+
+    def get_key_pair(self, passphrase: str, email: str) -> Tuple[str, str, str]:
+        """Claim a key pair from the pool, or generate one if the pool is empty."""
+        key_pair = self.claim(passphrase, email)
+        if key_pair is None:
+            key_pair = redwood.generate_source_key_pair(passphrase, email)
+        return key_pair
@@ -1,19 +1,23 @@
 import os
+import threading
 from base64 import b32encode
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from functools import lru_cache
+from hashlib import sha256
 from pathlib import Path
-from secrets import SystemRandom
-from typing import TYPE_CHECKING, List, Optional
+from secrets import SystemRandom, token_hex
+from typing import TYPE_CHECKING, Callable, Iterator, List, Optional, Tuple
 
 import models
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.kdf import scrypt
+from redis import Redis
 from sdconfig import SecureDropConfig
+from source_key_pool import SourceKeyPool
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-import redwood
-
 if TYPE_CHECKING:
     from passphrases import DicewarePassphrase
     from store import Storage
@@ -28,6 +32,7 @@ class SourceUser:
         self.db_record_id = db_record.id  # We don't store the actual record to force a refresh
 
     def get_db_record(self) -> models.Source:
+        # Within a request, the record comes from the session's identity map without a query
         return models.Source.query.get(self.db_record_id)
 
 
@@ -35,25 +40,31 @@ class InvalidPassphraseError(Exception):
     pass
 
 
+class SourceKdfOverloadedError(Exception):
+    """Too many source passphrases are already waiting to be stretched; try again later."""
+
+
 def authenticate_source_user(
     db_session: Session, supplied_passphrase: "DicewarePassphrase"
 ) -> SourceUser:
     """Try to authenticate a Source user using the passphrase they supplied via the login form."""
     # Validate the passphrase: does it map to an actual Source record in the DB?
-    scrypt_manager = _SourceScryptManager.get_default()
-    source_filesystem_id = scrypt_manager.derive_source_filesystem_id(supplied_passphrase)
-    source_db_record = (
-        db_session.query(models.Source)
-        .filter_by(
-            filesystem_id=source_filesystem_id,
-            deleted_at=None,
+    # The whole login holds a single slot, so that it can't be rejected once it got in
+    with _SourceKdfExecutor.get_default().reserve() as kdf_reservation:
+        source_filesystem_id = kdf_reservation.derive_filesystem_id(supplied_passphrase)
+        source_db_record = (
+            db_session.query(models.Source)
+            .filter_by(
+                filesystem_id=source_filesystem_id,
+                deleted_at=None,
+            )
+            .one_or_none()
         )
-        .one_or_none()
-    )
-    if source_db_record is None:
-        raise InvalidPassphraseError()
+        if source_db_record is None:
+            raise InvalidPassphraseError()
 
-    source_gpg_secret = scrypt_manager.derive_source_gpg_secret(supplied_passphrase)
+        # Only stretch the passphrase a second time once we know it belongs to a source
+        source_gpg_secret = kdf_reservation.derive_gpg_secret(supplied_passphrase)
     return SourceUser(source_db_record, source_filesystem_id, source_gpg_secret)
 
 
@@ -71,38 +82,17 @@ def create_source_user(
     source_app_storage: "Storage",
 ) -> SourceUser:
     # Derive the source's info from their passphrase
-    scrypt_manager = _SourceScryptManager.get_default()
-    filesystem_id = scrypt_manager.derive_source_filesystem_id(source_passphrase)
-    gpg_secret = scrypt_manager.derive_source_gpg_secret(source_passphrase)
+    filesystem_id, gpg_secret = _SourceKdfExecutor.get_default().derive(source_passphrase)
 
     # Create a unique journalist designation for the source
-    # TODO: Add unique=True to models.Source.journalist_designation to enforce uniqueness
-    #  as the logic below has a race condition (time we check VS time when we add to the DB)
-    designation_generation_attempts = 0
-    valid_designation = None
-    designation_generator = _DesignationGenerator.get_default()
-    while designation_generation_attempts < 50:
-        # Generate a designation
-        designation_generation_attempts += 1
-        new_designation = designation_generator.generate_journalist_designation()
-
-        # Check to see if it's already used by an existing source
-        existing_source_with_same_designation = (
-            db_session.query(models.Source)
-            .filter_by(journalist_designation=new_designation)
-            .one_or_none()
-        )
-        if not existing_source_with_same_designation:
-            # The designation is not already used - good to go
-            valid_designation = new_designation
-            break
-
+    designation_allocator = _DesignationAllocator.get_default()
+    valid_designation = designation_allocator.allocate_journalist_designation(db_session)
     if not valid_designation:
-        # Could not generate a designation that is not already used
+        # All the possible designations are already used
         raise SourceDesignationCollisionError()
 
-    # Generate PGP keys
-    public_key, secret_key, fingerprint = redwood.generate_source_key_pair(
+    # Generate PGP keys, or rather claim pre-generated ones if available
+    public_key, secret_key, fingerprint = SourceKeyPool.get_default().get_key_pair(
         gpg_secret, filesystem_id
     )
 
@@ -119,6 +109,7 @@ def create_source_user(
         db_session.commit()
     except IntegrityError:
         db_session.rollback()
+        designation_allocator.release_journalist_designation(db_session, valid_designation)
         raise SourcePassphraseCollisionError(
             f"Passphrase already used by another Source (filesystem_id {filesystem_id})"
         )
@@ -194,6 +185,111 @@ class _SourceScryptManager:
         return _default_scrypt_mgr
 
 
+_default_kdf_executor: Optional["_SourceKdfExecutor"] = None
+
+
+class _SourceKdfExecutor:
+    """Run the scrypt derivations for source passphrases on a bounded pool of threads.
+
+    Stretching a passphrase is expensive by design, so a burst of login attempts could otherwise
+    tie up every web server worker. Derivations run on a dedicated pool, and once max_pending
+    passphrases are already queued or running, new ones are rejected right away with
+    SourceKdfOverloadedError instead of waiting for a worker.
+    """
+
+    def __init__(
+        self, scrypt_manager: _SourceScryptManager, max_workers: int, max_pending: int
+    ) -> None:
+        self._scrypt_manager = scrypt_manager
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="source-kdf"
+        )
+        self._max_pending = max_pending
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_default(cls) -> "_SourceKdfExecutor":
+        global _default_kdf_executor
+        if _default_kdf_executor is None:
+            config = SecureDropConfig.get_current()
+            _default_kdf_executor = cls(
+                scrypt_manager=_SourceScryptManager.get_default(),
+                max_workers=config.SCRYPT_WORKERS,
+                max_pending=config.SCRYPT_MAX_PENDING,
+            )
+        return _default_kdf_executor
+
+    @property
+    def queue_length(self) -> int:
+        """The number of passphrases currently waiting for or undergoing derivation."""
+        return self._pending
+
+    @contextmanager
+    def reserve(self) -> Iterator["_SourceKdfReservation"]:
+        """Take a pending slot for deriving one passphrase, or raise SourceKdfOverloadedError.
+
+        The slot is held until the block exits, so that all the derivations made through the
+        reservation (e.g. both steps of a login) are admitted or rejected together.
+        """
+        with self._lock:
+            if self._pending >= self._max_pending:
+                raise SourceKdfOverloadedError(
+                    f"{self._pending} source passphrases already pending derivation"
+                )
+            self._pending += 1
+
+        try:
+            yield _SourceKdfReservation(self._executor, self._scrypt_manager)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def derive(self, source_passphrase: "DicewarePassphrase") -> Tuple[str, str]:
+        """Derive the filesystem ID and the GPG secret of a source from their passphrase."""
+        with self.reserve() as reservation:
+            return reservation.derive(source_passphrase)
+
+
+class _SourceKdfReservation:
+    """Derivations for one passphrase, run on a _SourceKdfExecutor's pool within its slot."""
+
+    def __init__(self, executor: ThreadPoolExecutor, scrypt_manager: _SourceScryptManager) -> None:
+        self._executor = executor
+        self._scrypt_manager = scrypt_manager
+
+    def derive(self, source_passphrase: "DicewarePassphrase") -> Tuple[str, str]:
+        """Derive the filesystem ID and the GPG secret of a source from their passphrase."""
+        filesystem_id, gpg_secret = self._run(
+            source_passphrase,
+            self._scrypt_manager.derive_source_filesystem_id,
+            self._scrypt_manager.derive_source_gpg_secret,
+        )
+        return filesystem_id, gpg_secret
+
+    def derive_filesystem_id(self, source_passphrase: "DicewarePassphrase") -> str:
+        """Derive only the filesystem ID of a source, which is enough to look them up."""
+        (filesystem_id,) = self._run(
+            source_passphrase, self._scrypt_manager.derive_source_filesystem_id
+        )
+        return filesystem_id
+
+    def derive_gpg_secret(self, source_passphrase: "DicewarePassphrase") -> str:
+        """Derive only the GPG secret of a source."""
+        (gpg_secret,) = self._run(source_passphrase, self._scrypt_manager.derive_source_gpg_secret)
+        return gpg_secret
+
+    def _run(
+        self,
+        source_passphrase: "DicewarePassphrase",
+        *derivations: Callable[["DicewarePassphrase"], str],
+    ) -> List[str]:
+        futures = [
+            self._executor.submit(derivation, source_passphrase) for derivation in derivations
+        ]
+        return [future.result() for future in futures]
+
+
 _default_designation_generator: Optional["_DesignationGenerator"] = None
 
 
@@ -238,3 +334,181 @@ class _DesignationGenerator:
             _default_designation_generator = cls(nouns=nouns, adjectives=adjectives)
 
         return _default_designation_generator
+
+
+_default_designation_allocator: Optional["_DesignationAllocator"] = None
+
+# How many bits are unset in each possible byte value
+_FREE_BITS_PER_BYTE = bytes(8 - bin(byte).count("1") for byte in range(256))
+
+
+class _DesignationAllocator(_DesignationGenerator):
+    """Allocate journalist designations that are not used by any other source.
+
+    Each adjective/noun pair has an index, and a bitmap over these indexes stored in Redis tracks
+    which designations are used, so that it's shared by every process. A designation is claimed
+    by atomically setting its bit, so the database doesn't need to be checked for collisions.
+
+    The bitmap is built from the sources in the database whenever it's missing from Redis, and
+    the designation of a source is released once the source is deleted, or failed to be stored.
+    """
+
+    REDIS_BITMAP_KEY_PREFIX = "sd/journalist-designations/"
+
+    # How many random designations to try before picking among the free ones directly, which
+    # is only needed once most designations are used
+    _MAX_RANDOM_ATTEMPTS = 16
+
+    # Sets the bit if the bitmap exists, otherwise returns -1 so it gets built first
+    _CLAIM_SCRIPT = """
+        if redis.call("EXISTS", KEYS[1]) == 0 then
+            return -1
+        end
+        return redis.call("SETBIT", KEYS[1], ARGV[1], 1)
+    """
+
+    # Clears the bit if the bitmap exists; otherwise it gets built from the database when needed
+    _RELEASE_SCRIPT = """
+        if redis.call("EXISTS", KEYS[1]) == 1 then
+            redis.call("SETBIT", KEYS[1], ARGV[1], 0)
+        end
+    """
+
+    def __init__(self, redis: Redis, nouns: List[str], adjectives: List[str]) -> None:
+        super().__init__(nouns=nouns, adjectives=adjectives)
+        self._noun_indexes = {noun: index for index, noun in enumerate(nouns)}
+        self._adjective_indexes = {adjective: index for index, adjective in enumerate(adjectives)}
+        if len(self._noun_indexes) != len(nouns):
+            raise ValueError("Nouns word list contains duplicates")
+        if len(self._adjective_indexes) != len(adjectives):
+            raise ValueError("Adjectives word list contains duplicates")
+
+        self._redis = redis
+        self._claim_script = redis.register_script(self._CLAIM_SCRIPT)
+        self._release_script = redis.register_script(self._RELEASE_SCRIPT)
+
+        # Changing the word lists changes the indexes, so each version gets its own bitmap
+        word_lists_digest = sha256("\n".join(adjectives + [""] + nouns).encode("utf-8"))
+        self._bitmap_key = self.REDIS_BITMAP_KEY_PREFIX + word_lists_digest.hexdigest()
+
+        self.capacity = len(adjectives) * len(nouns)
+        # The bits after the last designation are set when building the bitmap, so that its last
+        # byte has no free bits that don't match a designation
+        self._padding_bits = -self.capacity % 8
+
+    @classmethod
+    def get_default(cls) -> "_DesignationAllocator":
+        global _default_designation_allocator
+        if _default_designation_allocator is None:
+            config = SecureDropConfig.get_current()
+            nouns = Path(config.NOUNS).read_text().strip().splitlines()
+            adjectives = Path(config.ADJECTIVES).read_text().strip().splitlines()
+            _default_designation_allocator = cls(
+                redis=Redis(**config.REDIS_KWARGS), nouns=nouns, adjectives=adjectives
+            )
+        return _default_designation_allocator
+
+    def allocate_journalist_designation(self, db_session: Session) -> Optional[str]:
+        """Claim a random designation that is not used yet, or return None if they all are.
+
+        Every free designation has the same chance of being picked.
+        """
+        for _ in range(self._MAX_RANDOM_ATTEMPTS):
+            index = self._random_generator.randrange(self.capacity)
+            if self._claim(db_session, index):
+                return self._designation_at(index)
+
+        while True:
+            index = self._find_free_index(db_session)
+            if index is None:
+                return None
+            if self._claim(db_session, index):
+                return self._designation_at(index)
+
+    def release_journalist_designation(self, db_session: Session, designation: str) -> None:
+        """Make a designation available again, once no source in the database uses it."""
+        index = self._index_of(designation)
+        if index is None:
+            return
+
+        # Sources created before designations were allocated may share their designation
+        still_used = (
+            db_session.query(models.Source.id).filter_by(journalist_designation=designation).first()
+        )
+        if still_used is None:
+            self._release_script(keys=[self._bitmap_key], args=[index])
+
+    def remaining_capacity(self, db_session: Session) -> int:
+        """How many designations can still be allocated."""
+        self._build_bitmap(db_session)
+        return self.capacity + self._padding_bits - self._redis.bitcount(self._bitmap_key)
+
+    def _designation_at(self, index: int) -> str:
+        adjective_index, noun_index = divmod(index, len(self._nouns))
+        return f"{self._adjectives[adjective_index]} {self._nouns[noun_index]}"
+
+    def _index_of(self, designation: str) -> Optional[int]:
+        adjective, _, noun = designation.partition(" ")
+        adjective_index = self._adjective_indexes.get(adjective)
+        noun_index = self._noun_indexes.get(noun)
+        if adjective_index is None or noun_index is None:
+            # Not generated from the current word lists, so it can't collide with new ones
+            return None
+        return adjective_index * len(self._nouns) + noun_index
+
+    def _claim(self, db_session: Session, index: int) -> bool:
+        previous_bit = self._claim_script(keys=[self._bitmap_key], args=[index])
+        if previous_bit == -1:
+            self._build_bitmap(db_session)
+            previous_bit = self._claim_script(keys=[self._bitmap_key], args=[index])
+        return previous_bit == 0
+
+    def _build_bitmap(self, db_session: Session) -> None:
+        if self._redis.exists(self._bitmap_key):
+            return
+
+        # Build the bitmap under a temporary key so that it only becomes visible once complete
+        building_key = f"{self._bitmap_key}/building/{token_hex(8)}"
+        pipeline = self._redis.pipeline()
+        # Allocate the whole bitmap upfront, even when few designations are used
+        pipeline.setrange(building_key, (self.capacity + self._padding_bits) // 8 - 1, b"\0")
+        for (designation,) in db_session.query(models.Source.journalist_designation):
+            index = self._index_of(designation)
+            if index is not None:
+                pipeline.setbit(building_key, index, 1)
+        for index in range(self.capacity, self.capacity + self._padding_bits):
+            pipeline.setbit(building_key, index, 1)
+        # If another process built the bitmap at the same time, keep theirs
+        pipeline.renamenx(building_key, self._bitmap_key)
+        pipeline.delete(building_key)
+        pipeline.execute()
+
+    def _find_free_index(self, db_session: Session) -> Optional[int]:
+        self._build_bitmap(db_session)
+        bitmap = self._redis.get(self._bitmap_key) or b""
+        free_bits = sum(bitmap.translate(_FREE_BITS_PER_BYTE))
+        if free_bits == 0:
+            return None
+
+        # Pick one of the free bits at random, then find where it is
+        remaining = self._random_generator.randrange(free_bits)
+        chunk_size = 4096
+        for chunk_start in range(0, len(bitmap), chunk_size):
+            chunk = bitmap[chunk_start : chunk_start + chunk_size]
+            free_bits_in_chunk = sum(chunk.translate(_FREE_BITS_PER_BYTE))
+            if remaining >= free_bits_in_chunk:
+                remaining -= free_bits_in_chunk
+                continue
+
+            for byte_offset, byte in enumerate(chunk):
+                if remaining >= _FREE_BITS_PER_BYTE[byte]:
+                    remaining -= _FREE_BITS_PER_BYTE[byte]
+                    continue
+                # Redis numbers the bits of each byte starting from the most significant one
+                for bit in range(8):
+                    if not byte & (0x80 >> bit):
+                        if remaining == 0:
+                            return (chunk_start + byte_offset) * 8 + bit
+                        remaining -= 1
+
+        raise AssertionError("Free bit not found")
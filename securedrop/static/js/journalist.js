@@ -35,16 +35,6 @@ function show(selector, displayStyle = "revert") {
 }
 
 function enhance_ui() {
-  // Add the "quick filter" box for the list of sources
-  let filterContainer = document.getElementById("filter-container");
-  if (filterContainer) {
-    filterContainer.innerHTML = '<input id="filter" type="text" placeholder="' +
-      get_string("filter-by-codename-placeholder-string") +
-      '" aria-label="' +
-      get_string("filter-by-codename-placeholder-string") +
-      '" autofocus >';
-  }
-
   // Add the "select {all,none}" buttons for the list of sources
   let indexSelectContainer = document.getElementById("index-select-container");
   if (indexSelectContainer) {
@@ -160,6 +150,8 @@ ready(function() {
     });
   }
 
+  // The filter box searches every source when submitted; while typing, it
+  // also narrows down the sources already listed on the page
   let filterInput = document.getElementById("filter");
   if (filterInput) {
     filterInput.addEventListener("keyup", function() {
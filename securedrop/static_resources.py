@@ -0,0 +1,55 @@
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, TypeVar, Union
+
+T = TypeVar("T")
+
+# Identifies a version of a file; None if the file does not exist
+_FileVersion = Optional[Tuple[int, int, int]]
+
+_default_static_resource_cache: Optional["StaticResourceCache"] = None
+
+
+def _file_version(path: Union[str, Path]) -> _FileVersion:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class StaticResourceCache:
+    """Cache values derived from files that rarely change, such as the site logo or the
+    source interface address.
+
+    A cached value is only loaded again once one of the files it was derived from has been
+    modified, created or deleted; checking for that only takes a stat() per file.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, Tuple[Tuple[_FileVersion, ...], Any]] = {}
+
+    @classmethod
+    def get_default(cls) -> "StaticResourceCache":
+        global _default_static_resource_cache
+        if _default_static_resource_cache is None:
+            _default_static_resource_cache = cls()
+        return _default_static_resource_cache
+
+    def get(self, name: str, paths: Sequence[Union[str, Path]], load: Callable[[], T]) -> T:
+        """Return the value cached under name, calling load() to (re)compute it if any of the
+        files in paths has changed since it was cached.
+
+        Exceptions raised by load() are not cached.
+        """
+        versions = tuple(_file_version(path) for path in paths)
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == versions:
+            return entry[1]
+
+        value = load()
+        self._entries[name] = (versions, value)
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
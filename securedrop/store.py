@@ -6,6 +6,7 @@ import tempfile
 import typing
 import zipfile
 from hashlib import sha256
+from io import BytesIO
 from pathlib import Path
 from tempfile import _TemporaryFileWrapper
 from typing import BinaryIO, List, Optional, Type, Union
@@ -79,6 +80,42 @@ def safe_renames(old: str, new: str) -> None:
     os.rename(old, new)
 
 
+class GzipCompressingReader:
+    """Readable view of a stream's gzip-compressed contents.
+
+    Each call to `read()` pulls just enough data from the underlying
+    stream to return the requested amount of compressed data, so a
+    file can be compressed while it is being consumed (e.g. by the
+    encryptor) instead of being spooled to a temporary file first.
+    """
+
+    CHUNK_SIZE = 1024 * 8
+
+    def __init__(self, stream: BinaryIO, filename: str) -> None:
+        self._stream = stream
+        self._buffer = BytesIO()
+        self._gzf = gzip.GzipFile(filename=filename, mode="wb", fileobj=self._buffer, mtime=0)
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._gzf.closed and (size < 0 or self._buffer.tell() < size):
+            buf = self._stream.read(self.CHUNK_SIZE)
+            if buf:
+                self._gzf.write(buf)
+            else:
+                # Closing the gzip file flushes the trailer into the buffer
+                self._gzf.close()
+
+        compressed = self._buffer.getvalue()
+        if size < 0 or size >= len(compressed):
+            out, rest = compressed, b""
+        else:
+            out, rest = compressed[:size], compressed[size:]
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._buffer.write(rest)
+        return out
+
+
 class Storage:
     def __init__(self, storage_path: str, temp_dir: str) -> None:
         if not os.path.isabs(storage_path):
@@ -322,18 +359,20 @@ class Storage:
 
         encrypted_file_name = f"{count}-{journalist_filename}-doc.gz.gpg"
         encrypted_file_path = self.path(filesystem_id, encrypted_file_name)
-        with SecureTemporaryFile("/tmp") as stf:  # noqa: S108
-            with gzip.GzipFile(filename=sanitized_filename, mode="wb", fileobj=stf, mtime=0) as gzf:
-                # Buffer the stream into the gzip file to avoid excessive
-                # memory consumption
-                while True:
-                    buf = stream.read(1024 * 8)
-                    if not buf:
-                        break
-                    gzf.write(buf)
-
+        if isinstance(stream, SecureTemporaryFile):
+            # Large uploads were spooled to disk, redwood can compress and
+            # encrypt them natively
+            EncryptionManager.get_default().compress_and_encrypt_source_file(
+                file_in=stream,
+                filename=sanitized_filename,
+                encrypted_file_path_out=Path(encrypted_file_path),
+            )
+        else:
+            # The file is compressed as the encryptor reads it, so that the
+            # plaintext is only held in memory a chunk at a time and never
+            # spooled to disk a second time
             EncryptionManager.get_default().encrypt_source_file(
-                file_in=stf,
+                file_in=GzipCompressingReader(stream, sanitized_filename),
                 encrypted_file_path_out=Path(encrypted_file_path),
             )
 
@@ -364,6 +403,22 @@ class Storage:
         )
         return filename
 
+    def save_message_submissions(
+        self, filesystem_id: str, first_count: int, journalist_filename: str, messages: List[str]
+    ) -> List[str]:
+        """Save several messages from the same source, numbered from `first_count` onwards."""
+        filenames = [
+            f"{count}-{journalist_filename}-msg.gpg"
+            for count in range(first_count, first_count + len(messages))
+        ]
+        EncryptionManager.get_default().encrypt_source_messages(
+            messages_in=messages,
+            encrypted_message_paths_out=[
+                Path(self.path(filesystem_id, filename)) for filename in filenames
+            ],
+        )
+        return filenames
+
 
 def async_add_checksum_for_file(db_obj: "Union[Submission, Reply]", storage: Storage) -> Job:
     config = SecureDropConfig.get_current()
@@ -1,20 +1,72 @@
 import math
 from datetime import datetime
+from functools import lru_cache
+from typing import Optional, Tuple
 
-from babel import dates, units
+from babel import Locale, dates, units
+from babel.dates import DateTimePattern
 from flask_babel import get_locale, gettext
 from jinja2 import pass_eval_context
 from jinja2.nodes import EvalContext
 from markupsafe import Markup, escape
 
+NAMED_DATETIME_FORMATS = ("full", "long", "medium", "short")
+
+
+@lru_cache(maxsize=None)
+def _get_babel_locale(locale_identifier: Optional[str]) -> Locale:
+    return Locale.parse(locale_identifier)
+
+
+@lru_cache(maxsize=None)
+def _get_datetime_patterns(
+    locale_identifier: Optional[str], fmt: str
+) -> Tuple[Optional[str], Optional[DateTimePattern], DateTimePattern]:
+    """Return the datetime format, date pattern and time pattern of a named format, or the
+    pattern of a custom one.
+
+    Babel looks these up in the locale's data on every call, which adds up when a page
+    formats the dates of thousands of items, so they are only looked up once per locale.
+    """
+    locale = _get_babel_locale(locale_identifier)
+    if fmt in NAMED_DATETIME_FORMATS:
+        return (
+            dates.get_datetime_format(fmt, locale=locale).replace("'", ""),
+            dates.get_date_format(fmt, locale=locale),
+            dates.get_time_format(fmt, locale=locale),
+        )
+    return None, None, dates.parse_pattern(fmt)
+
+
+def _format_datetime(dt: datetime, fmt: str, locale_identifier: Optional[str]) -> str:
+    """Equivalent to babel.dates.format_datetime(dt, fmt, locale=locale_identifier)"""
+    locale = _get_babel_locale(locale_identifier)
+    datetime_format, date_pattern, time_pattern = _get_datetime_patterns(locale_identifier, fmt)
+    # Like Babel, assume naive datetimes are in UTC
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=dates.UTC)
+    if datetime_format is None or date_pattern is None:
+        return time_pattern.apply(dt, locale)
+    return datetime_format.replace("{0}", time_pattern.apply(dt.timetz(), locale)).replace(
+        "{1}", date_pattern.apply(dt.date(), locale)
+    )
+
+
+def _get_locale_identifier() -> str:
+    locale: Optional[Locale] = get_locale()
+    return str(locale)
+
 
 def rel_datetime_format(dt: datetime, fmt: str = "long", relative: bool = False) -> str:
     """Template filter for readable formatting of datetime.datetime"""
+    locale_identifier = _get_locale_identifier()
     if relative:
-        time = dates.format_timedelta(datetime.utcnow() - dt, locale=get_locale())
+        time = dates.format_timedelta(
+            datetime.utcnow() - dt, locale=_get_babel_locale(locale_identifier)
+        )
         return gettext("{time} ago").format(time=time)
     else:
-        return dates.format_datetime(dt, fmt, locale=get_locale())
+        return _format_datetime(dt, fmt, locale_identifier)
 
 
 @pass_eval_context
@@ -32,7 +84,7 @@ def filesizeformat(value: int) -> str:
         "digital-gigabyte",
         "digital-terabyte",
     ]
-    locale = get_locale()
+    locale = _get_babel_locale(_get_locale_identifier())
     base = 1024
     #
     # we are using the long length because the short length has no
@@ -40,7 +92,8 @@ def filesizeformat(value: int) -> str:
     # on purpose
     #
     if value < base:
-        return units.format_unit(value, "byte", locale=locale, length="long")
+        # The qualified unit name, which Babel would otherwise search the locale's units for
+        return units.format_unit(value, "digital-byte", locale=locale, length="long")
     else:
         i = min(int(math.log(value, base)), len(prefixes)) - 1
         prefix = prefixes[i]
@@ -50,4 +103,4 @@ def filesizeformat(value: int) -> str:
 
 def html_datetime_format(dt: datetime) -> str:
     """Return a datetime string that will pass HTML validation"""
-    return dates.format_datetime(dt, "yyyy-MM-dd HH:mm:ss.SSS")
+    return _format_datetime(dt, "yyyy-MM-dd HH:mm:ss.SSS", dates.LC_TIME)
@@ -18,6 +18,7 @@ import sdconfig
 from db import db
 from flask import Flask, url_for
 from journalist_app import create_app as create_journalist_app
+from models import InstanceConfig
 from passphrases import PassphraseGenerator
 from sdconfig import DEFAULT_SECUREDROP_ROOT, SecureDropConfig
 from source_app import create_app as create_source_app
@@ -161,6 +162,8 @@ def source_app(config: SecureDropConfig, app_storage: Storage) -> Generator[Flas
         app.config["SERVER_NAME"] = "localhost.localdomain"
         with app.app_context():
             db.create_all()
+            # Don't reuse the configuration cached from a previous test's database
+            InstanceConfig.invalidate_default()
             try:
                 yield app
             finally:
@@ -176,6 +179,8 @@ def journalist_app(config: SecureDropConfig, app_storage: Storage) -> Generator[
         app.config["SERVER_NAME"] = "localhost.localdomain"
         with app.app_context():
             db.create_all()
+            # Don't reuse the configuration cached from a previous test's database
+            InstanceConfig.invalidate_default()
             try:
                 yield app
             finally:
@@ -303,6 +303,7 @@ def create_source_and_submission(config_in_use: SecureDropConfig) -> Tuple[Sourc
         )
         submission = Submission(source_db_record, encrypted_file_name, app_storage)
         db_session.add(submission)
+        source_db_record.count_new_submission(submission)
         source_db_record.pending = False
         source_db_record.last_updated = datetime.now(timezone.utc)
         db_session.commit()
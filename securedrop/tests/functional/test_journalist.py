@@ -241,7 +241,7 @@ class TestJournalist:
 
         # And when the journalist clears the filter
         filter_box.clear()
-        filter_box.send_keys(Keys.RETURN)
+        filter_box.send_keys(Keys.BACKSPACE)
 
         # Then all sources are displayed
         for source in sources:
@@ -275,7 +275,7 @@ class TestJournalist:
 
         # And when the journalist clears the filter and then selects all sources
         filter_box.clear()
-        filter_box.send_keys(Keys.RETURN)
+        filter_box.send_keys(Keys.BACKSPACE)
         select_all.click()
         for source_row in source_rows:
             checkbox = source_row.find_element(By.CSS_SELECTOR, "input[type=checkbox]")
@@ -297,7 +297,7 @@ class TestJournalist:
 
         # And when the journalist clears the filter and leaves none selected
         filter_box.clear()
-        filter_box.send_keys(Keys.RETURN)
+        filter_box.send_keys(Keys.BACKSPACE)
         select_none.click()
 
         for source_row in source_rows:
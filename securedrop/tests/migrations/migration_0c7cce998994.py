@@ -0,0 +1,99 @@
+import uuid
+
+from db import db
+from journalist_app import create_app
+from sqlalchemy import text
+from sqlalchemy.exc import NoSuchColumnError
+
+
+def add_source():
+    params = {
+        "uuid": str(uuid.uuid4()),
+        "filesystem_id": str(uuid.uuid4()),
+        "journalist_designation": "mucky pine",
+        "interaction_count": 0,
+    }
+    sql = """\
+        INSERT INTO sources (uuid, filesystem_id, journalist_designation, interaction_count)
+        VALUES (:uuid, :filesystem_id, :journalist_designation, :interaction_count)"""
+    return db.engine.execute(text(sql), **params).lastrowid
+
+
+def add_submission(source_id, filename, size, downloaded=False):
+    params = {
+        "uuid": str(uuid.uuid4()),
+        "source_id": source_id,
+        "filename": filename,
+        "size": size,
+        "downloaded": downloaded,
+    }
+    sql = """\
+        INSERT INTO submissions (uuid, source_id, filename, size, downloaded)
+        VALUES (:uuid, :source_id, :filename, :size, :downloaded)"""
+    return db.engine.execute(text(sql), **params).lastrowid
+
+
+class UpgradeTester:
+    """Verify that the submission counters of existing sources are populated."""
+
+    def __init__(self, config):
+        self.config = config
+        self.app = create_app(config)
+        self.source_ids = []
+
+    def load_data(self):
+        with self.app.app_context():
+            # A source with submissions of every kind
+            source_id = add_source()
+            self.source_ids.append(source_id)
+            add_submission(source_id, "1-mucky_pine-msg.gpg", 10)
+            add_submission(source_id, "2-mucky_pine-doc.gz.gpg", 100, downloaded=True)
+            seen_file_id = add_submission(source_id, "3-mucky_pine-doc.zip.gpg", 1000)
+            seen_message_id = add_submission(source_id, "4-mucky_pine-msg.gpg", 10000)
+            db.engine.execute(
+                text("INSERT INTO seen_files (file_id, journalist_id) VALUES (:id, 1)"),
+                id=seen_file_id,
+            )
+            db.engine.execute(
+                text("INSERT INTO seen_messages (message_id, journalist_id) VALUES (:id, 1)"),
+                id=seen_message_id,
+            )
+
+            # A source without submissions
+            self.source_ids.append(add_source())
+
+    def check_upgrade(self):
+        with self.app.app_context():
+            sql = """\
+                SELECT num_documents, num_messages, num_unread, total_size
+                FROM sources
+                WHERE id = :id"""
+            counters = [
+                tuple(db.engine.execute(text(sql), id=source_id).fetchone())
+                for source_id in self.source_ids
+            ]
+            assert counters == [(2, 2, 1, 11110), (0, 0, 0, 0)]
+
+
+class DowngradeTester:
+    """Verify that the submission counters are removed."""
+
+    def __init__(self, config):
+        self.config = config
+        self.app = create_app(config)
+
+    def load_data(self):
+        with self.app.app_context():
+            source_id = add_source()
+            add_submission(source_id, "1-mucky_pine-msg.gpg", 10)
+
+    def check_downgrade(self):
+        with self.app.app_context():
+            sources = db.engine.execute(text("SELECT * FROM sources")).fetchall()
+            assert len(sources) == 1
+            for column in ("num_documents", "num_messages", "num_unread", "total_size"):
+                try:
+                    # This should produce an exception, as the column (should) be gone.
+                    assert sources[0][column] is None
+                except NoSuchColumnError:
+                    pass
@@ -0,0 +1,39 @@
+from db import db
+from journalist_app import create_app
+from sqlalchemy import text
+
+INDEX_QUERY = "SELECT name FROM sqlite_master WHERE type = 'index' AND name = :name"
+
+
+def has_last_updated_index():
+    return db.engine.execute(text(INDEX_QUERY), name="ix_sources_last_updated").first() is not None
+
+
+class UpgradeTester:
+    """Verify that the index on sources.last_updated is created."""
+
+    def __init__(self, config):
+        self.config = config
+        self.app = create_app(config)
+
+    def load_data(self):
+        pass
+
+    def check_upgrade(self):
+        with self.app.app_context():
+            assert has_last_updated_index()
+
+
+class DowngradeTester:
+    """Verify that the index on sources.last_updated is dropped."""
+
+    def __init__(self, config):
+        self.config = config
+        self.app = create_app(config)
+
+    def load_data(self):
+        pass
+
+    def check_downgrade(self):
+        with self.app.app_context():
+            assert not has_last_updated_index()
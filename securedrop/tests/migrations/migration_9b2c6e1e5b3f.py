@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+from db import db
+from journalist_app import create_app
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+
+def add_change(object_uuid):
+    params = {
+        "object_type": "source",
+        "object_uuid": object_uuid,
+        "timestamp": datetime.utcnow(),
+    }
+    sql = """\
+        INSERT INTO changes (object_type, object_uuid, timestamp)
+        VALUES (:object_type, :object_uuid, :timestamp)"""
+    return db.engine.execute(text(sql), **params).lastrowid
+
+
+class UpgradeTester:
+    """Verify that the changes table is created, and that its IDs are not reused."""
+
+    def __init__(self, config):
+        self.config = config
+        self.app = create_app(config)
+
+    def load_data(self):
+        pass
+
+    def check_upgrade(self):
+        with self.app.app_context():
+            first_id = add_change("0db4ea46-7a2c-4e88-84b1-5d1f7c4d0a9e")
+            db.engine.execute(text("DELETE FROM changes WHERE id = :id"), id=first_id)
+            assert add_change("0db4ea46-7a2c-4e88-84b1-5d1f7c4d0a9e") > first_id
+
+
+class DowngradeTester:
+    """Verify that the changes table is dropped."""
+
+    def __init__(self, config):
+        self.config = config
+        self.app = create_app(config)
+
+    def load_data(self):
+        with self.app.app_context():
+            add_change("0db4ea46-7a2c-4e88-84b1-5d1f7c4d0a9e")
+
+    def check_downgrade(self):
+        with self.app.app_context():
+            with pytest.raises(OperationalError, match="no such table"):
+                db.engine.execute(text("SELECT * FROM changes"))
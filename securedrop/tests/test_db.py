@@ -1,11 +1,15 @@
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
+from db import db
+from journalist_app.utils import delete_file_object, mark_seen
 from models import (
     InstanceConfig,
     Journalist,
     LoginThrottledException,
     Reply,
+    SeenMessage,
+    Source,
     Submission,
     get_one_or_else,
 )
@@ -93,6 +97,41 @@ def test_source_string_representation(journalist_app, test_source):
         test_source["source"].__repr__()
 
 
+def test_source_counters(journalist_app, test_journo, app_storage):
+    with journalist_app.app_context():
+        source, _ = db_helper.init_source(app_storage)
+        messages = db_helper.submit(app_storage, source, 2)
+        files = db_helper.submit(app_storage, source, 1, submission_type="file")
+
+        def counters():
+            db.session.refresh(source)
+            return source.num_documents, source.num_messages, source.num_unread, source.total_size
+
+        total_size = sum(submission.size for submission in messages + files)
+        assert counters() == (1, 2, 3, total_size)
+
+        # A submission is only unread until the first journalist sees it
+        other_journalist, _ = db_helper.init_journalist()
+        mark_seen(messages[:1], test_journo["journalist"])
+        mark_seen(messages[:1], other_journalist)
+        mark_seen(messages[:1], test_journo["journalist"])
+        assert counters() == (1, 2, 2, total_size)
+
+        # Including when it was seen without being marked downloaded
+        db.session.add(SeenMessage(message_id=messages[1].id, journalist_id=other_journalist.id))
+        db.session.commit()
+        source.update_counters(unread=-1)
+        db.session.commit()
+        mark_seen(messages[1:], test_journo["journalist"])
+        assert counters() == (1, 2, 1, total_size)
+
+        file_size = files[0].size
+        delete_file_object(files[0])
+        assert counters() == (0, 2, 1, total_size - file_size)
+
+        assert Source.rebuild_counters() == 0
+
+
 def test_only_one_active_instance_config_can_exist(config, source_app):
     """
     Checks that attempts to add multiple active InstanceConfig records fail.
@@ -120,3 +159,23 @@ def test_only_one_active_instance_config_can_exist(config, source_app):
     # now the commit of the first instance should fail
     with pytest.raises(IntegrityError):
         session.commit()
+
+
+def test_instance_config_default_is_reloaded_only_when_changed(source_app):
+    with source_app.app_context():
+        InstanceConfig.get_default(refresh=True)
+
+        # When refreshing the cached configuration while it is unchanged, it is not reloaded
+        with patch.object(InstanceConfig, "get_current") as get_current:
+            InstanceConfig.get_default(refresh=True)
+            get_current.assert_not_called()
+
+        # When the configuration gets changed, the next refresh picks up the change
+        InstanceConfig.set_organization_name("Walden Inquirer")
+        assert InstanceConfig.get_default().organization_name != "Walden Inquirer"
+        assert InstanceConfig.get_default(refresh=True).organization_name == "Walden Inquirer"
+
+        # And the cached configuration stays usable after the session was committed and closed
+        db.session.commit()
+        db.session.remove()
+        assert InstanceConfig.get_default(refresh=True).organization_name == "Walden Inquirer"
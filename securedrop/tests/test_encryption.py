@@ -1,4 +1,6 @@
+import os
 from pathlib import Path
+from unittest import mock
 from unittest.mock import MagicMock
 
 import pytest
@@ -42,6 +44,24 @@ class TestEncryptionManager:
         # And the public key was saved to Redis
         assert encryption_mgr._redis.hget(encryption_mgr.REDIS_KEY_HASH, source_key_fingerprint)
 
+    def test_get_source_keys(self, test_source):
+        # Given a source user with a key pair in the gpg keyring
+        source_user = test_source["source_user"]
+        encryption_mgr = EncryptionManager.get_default()
+        utils.create_legacy_gpg_key(encryption_mgr, source_user, test_source["source"])
+
+        # When fetching the keys of that source and of an invalid filesystem id together
+        source_keys = encryption_mgr.get_source_keys([source_user.filesystem_id, "1234test"])
+
+        # Then the source's key matches the one fetched on its own
+        assert source_keys[source_user.filesystem_id] == (
+            encryption_mgr.get_source_key_fingerprint(source_user.filesystem_id),
+            encryption_mgr.get_source_public_key(source_user.filesystem_id),
+        )
+
+        # And the invalid filesystem id has no key
+        assert source_keys["1234test"] == (None, None)
+
     def test_get_gpg_source_public_key_wrong_id(self, test_source):
         # Given an encryption manager
         encryption_mgr = EncryptionManager.get_default()
@@ -148,6 +168,41 @@ class TestEncryptionManager:
         decrypted_file = utils.decrypt_as_journalist(encrypted_file)
         assert decrypted_file == file_to_encrypt_path.read_bytes()
 
+    def test_get_journalist_recipients(self, config, tmp_path):
+        # Given an encryption manager using a copy of the journalist key
+        journalist_pub_key = tmp_path / "journalist.pub"
+        journalist_pub_key.write_text((config.SECUREDROP_DATA_ROOT / "journalist.pub").read_text())
+        encryption_mgr = EncryptionManager(
+            gpg_key_dir=tmp_path,
+            journalist_pub_key=journalist_pub_key,
+            redis=Redis(decode_responses=True, **config.REDIS_KWARGS),
+        )
+
+        # The journalist key is only parsed once
+        recipients = encryption_mgr.get_journalist_recipients()
+        with mock.patch("redwood.RecipientSet") as recipient_set:
+            assert encryption_mgr.get_journalist_recipients() is recipients
+        recipient_set.assert_not_called()
+
+        # Until the key file is replaced
+        public_key, secret_key, _ = redwood.generate_source_key_pair(
+            "correcthorsebatterystaple", "new-journalist-key@example.org"
+        )
+        journalist_pub_key.write_text(public_key)
+        stat = journalist_pub_key.stat()
+        os.utime(journalist_pub_key, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert encryption_mgr.get_journalist_recipients() is not recipients
+
+        # And submissions are then encrypted for the new key
+        encrypted_message_path = tmp_path / "message.gpg"
+        encryption_mgr.encrypt_source_message(
+            message_in="s3cr3t message", encrypted_message_path_out=encrypted_message_path
+        )
+        decrypted_message = redwood.decrypt(
+            encrypted_message_path.read_bytes(), secret_key, "correcthorsebatterystaple"
+        )
+        assert decrypted_message == b"s3cr3t message"
+
     def test_encrypt_and_decrypt_journalist_reply(
         self, source_app, test_source, tmp_path, app_storage
     ):
@@ -197,6 +252,53 @@ class TestEncryptionManager:
         decrypted_reply_for_journalist = utils.decrypt_as_journalist(encrypted_reply)
         assert decrypted_reply_for_journalist.decode() == journalist_reply
 
+    def test_decrypt_journalist_replies(self, source_app, test_source, tmp_path, app_storage):
+        # Given a source user
+        source_user1 = test_source["source_user"]
+        source1 = test_source["source"]
+        encryption_mgr = EncryptionManager.get_default()
+
+        # And another source user
+        with source_app.app_context():
+            source_user2 = create_source_user(
+                db_session=db.session,
+                source_passphrase=PassphraseGenerator.get_default().generate_passphrase(),
+                source_app_storage=app_storage,
+            )
+            source2 = source_user2.get_db_record()
+
+            # And replies sent to each of them
+            encrypted_replies = []
+            for i, for_source in enumerate([source1, source2, source1]):
+                encrypted_reply_path = tmp_path / f"reply{i}.gpg"
+                encryption_mgr.encrypt_journalist_reply(
+                    for_source=for_source,
+                    reply_in=f"s3cr3t message {i}",
+                    encrypted_reply_path_out=encrypted_reply_path,
+                )
+                encrypted_replies.append(encrypted_reply_path.read_bytes())
+
+        # When source1 decrypts all the replies at once
+        decrypted_replies = encryption_mgr.decrypt_journalist_replies(
+            for_source_user=source_user1,
+            ciphertexts_in=encrypted_replies,
+        )
+
+        # Then their own replies are decrypted, in order
+        assert decrypted_replies[0] == "s3cr3t message 0"
+        assert decrypted_replies[2] == "s3cr3t message 2"
+
+        # And the reply for source2 is returned as an error
+        assert isinstance(decrypted_replies[1], RedwoodError)
+
+        # And there is nothing to do when there are no replies, not even unlocking the key
+        with mock.patch.object(redwood, "decrypt_many") as decrypt_many, mock.patch.object(
+            source_user1, "get_db_record"
+        ) as get_db_record:
+            assert encryption_mgr.decrypt_journalist_replies(source_user1, []) == []
+        decrypt_many.assert_not_called()
+        get_db_record.assert_not_called()
+
     def test_gpg_encrypt_and_decrypt_journalist_reply(
         self, source_app, test_source, tmp_path, app_storage
     ):
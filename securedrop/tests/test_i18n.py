@@ -26,7 +26,7 @@ import pytest
 import source_app
 from babel.core import Locale, UnknownLocaleError
 from db import db
-from flask import render_template, render_template_string, request, session
+from flask import g, render_template, render_template_string, request, session
 from flask_babel import gettext
 from i18n import parse_locale_set
 from sdconfig import DEFAULT_SECUREDROP_ROOT, FALLBACK_LOCALE, SecureDropConfig
@@ -386,6 +386,46 @@ def test_valid_but_unusable_locales(caplog):
             assert "not in the set of usable locales" in caplog.text
 
 
+def test_locale_negotiation_is_cached():
+    test_config = create_config_for_i18n_test(supported_locales=["en_US", "fr_FR"])
+    app = source_app.create_app(test_config)
+    i18n._negotiate_locale.cache_clear()
+
+    # Requests with the same preferences only negotiate their locale once
+    for _ in range(3):
+        headers = Headers([("Accept-Language", "fr-FR,en;q=0.5")])
+        with app.test_request_context(headers=headers):
+            assert i18n.get_locale(test_config) == "fr_FR"
+    assert i18n._negotiate_locale.cache_info().misses == 1
+
+    # But requests with different ones get their own locale
+    with app.test_request_context("/?l=en_US", headers=headers):
+        assert i18n.get_locale(test_config) == "en_US"
+    with app.test_request_context(headers=Headers([("Accept-Language", "en-US")])):
+        assert i18n.get_locale(test_config) == "en_US"
+
+
+def test_set_locale_only_writes_changed_locale_to_session():
+    test_config = create_config_for_i18n_test(supported_locales=["en_US", "fr_FR"])
+    app = source_app.create_app(test_config)
+
+    with app.test_request_context(headers=Headers([("Accept-Language", "fr-FR")])):
+        # When the locale is already the one in the session, the session is left untouched
+        session["locale"] = "fr_FR"
+        session.modified = False
+        i18n.set_locale(test_config)
+        assert not session.modified
+        assert g.localeinfo.id == "fr_FR"
+
+    with app.test_request_context("/?l=en_US"):
+        # When it changes, the session is updated
+        session["locale"] = "fr_FR"
+        session.modified = False
+        i18n.set_locale(test_config)
+        assert session.modified
+        assert session["locale"] == "en_US"
+
+
 def test_language_tags():
     assert i18n.RequestLocaleInfo(Locale.parse("en")).language_tag == "en"
     assert i18n.RequestLocaleInfo(Locale.parse("en-US", sep="-")).language_tag == "en-US"
@@ -1,7 +1,9 @@
 import base64
 import binascii
+import dataclasses
 import os
 import random
+import re
 import time
 import zipfile
 from base64 import b64decode
@@ -31,9 +33,11 @@ from models import (
     SeenMessage,
     SeenReply,
     Source,
+    SourceStar,
     Submission,
 )
 from passphrases import PassphraseGenerator
+from sdconfig import SecureDropConfig
 from source_user import create_source_user
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import StaleDataError
@@ -50,6 +54,7 @@ from tests.utils.i18n import (
     xfail_untranslated_messages,
 )
 from tests.utils.instrument import InstrumentedApp
+from tests.utils.queries import record_queries
 from two_factor import TOTP
 
 from .utils import create_legacy_gpg_key, login_journalist
@@ -2324,12 +2329,9 @@ def test_message_filtering(journalist_app, test_admin):
 
 
 def test_orgname_default_set(journalist_app, test_admin):
-    class dummy_current:
-        organization_name = None
-
     with patch.object(InstanceConfig, "get_current") as iMock:
         with journalist_app.test_client() as app:
-            iMock.return_value = dummy_current()
+            iMock.return_value = InstanceConfig(organization_name=None)
             login_journalist(
                 app,
                 test_admin["username"],
@@ -3970,6 +3972,105 @@ def test_source_with_null_last_updated(journalist_app, test_journo, test_files):
         assert resp.status_code == 200
 
 
+def test_index_is_paginated(config, journalist_app, test_journo, app_storage):
+    sources = []
+    for _ in range(5):
+        source, _ = utils.db_helper.init_source(app_storage)
+        utils.db_helper.submit(app_storage, source, 1)
+        sources.append(source)
+    # Sources updated at the same time are listed by descending ID
+    sources[3].last_updated = sources[2].last_updated
+    db.session.add(sources[3])
+    db.session.add(SourceStar(sources[1]))
+    db.session.commit()
+
+    page_size_config = dataclasses.replace(config, JOURNALIST_INDEX_PAGE_SIZE=2)
+    with patch.object(SecureDropConfig, "get_current", return_value=page_size_config):
+        with journalist_app.test_client() as app:
+            login_journalist(
+                app,
+                test_journo["username"],
+                test_journo["password"],
+                test_journo["otp_secret"],
+            )
+
+            pages = []
+            url = url_for("main.index")
+            while url is not None:
+                resp = app.get(url)
+                assert resp.status_code == 200
+                text = resp.data.decode("utf-8")
+                pages.append(re.findall(r'data-source-designation="([^"]+)"', text))
+                next_page = re.search(r'href="([^"]+)" id="sources-next-page"', text)
+                url = next_page.group(1) if next_page else None
+
+            resp = app.get(url_for("main.index", after="not-a-cursor"))
+            assert resp.status_code == 400
+
+    expected = [sources[i].journalist_designation.lower() for i in (1, 4, 3, 2, 0)]
+    assert pages == [expected[0:2], expected[2:4], expected[4:]]
+
+
+def test_index_filter_applies_to_every_page(config, journalist_app, test_journo, app_storage):
+    sources = []
+    for _ in range(3):
+        source, _ = utils.db_helper.init_source(app_storage)
+        utils.db_helper.submit(app_storage, source, 1)
+        sources.append(source)
+    oldest_designation = sources[0].journalist_designation.lower()
+
+    page_size_config = dataclasses.replace(config, JOURNALIST_INDEX_PAGE_SIZE=1)
+    with patch.object(SecureDropConfig, "get_current", return_value=page_size_config):
+        with journalist_app.test_client() as app:
+            login_journalist(
+                app,
+                test_journo["username"],
+                test_journo["password"],
+                test_journo["otp_secret"],
+            )
+
+            # Without a filter, the oldest source is on the last page, and the
+            # page says that actions only apply to the sources it lists
+            text = app.get(url_for("main.index")).data.decode("utf-8")
+            assert f'data-source-designation="{oldest_designation}"' not in text
+            assert 'id="sources-page-note"' in text
+
+            # The filter finds it from the first page
+            resp = app.get(url_for("main.index", filter=oldest_designation.upper()))
+            text = resp.data.decode("utf-8")
+            assert re.findall(r'data-source-designation="([^"]+)"', text) == [oldest_designation]
+            assert 'id="sources-next-page"' not in text
+
+            # And a filter matching no source says so
+            text = app.get(url_for("main.index", filter="%")).data.decode("utf-8")
+            assert "data-source-designation" not in text
+            assert 'id="sources-clear-filter"' in text
+
+
+def test_index_reads_source_counters(journalist_app, test_journo, app_storage):
+    source, _ = utils.db_helper.init_source(app_storage)
+    messages = utils.db_helper.submit(app_storage, source, 2)
+    utils.db_helper.submit(app_storage, source, 1, submission_type="file")
+    mark_seen(messages[:1], test_journo["journalist"])
+
+    with journalist_app.test_client() as app:
+        login_journalist(
+            app,
+            test_journo["username"],
+            test_journo["password"],
+            test_journo["otp_secret"],
+        )
+        with record_queries() as queries:
+            resp = app.get(url_for("main.index"))
+        assert resp.status_code == 200
+
+    text = resp.data.decode("utf-8")
+    assert "1 doc" in text
+    assert "2 messages" in text
+    assert "2 unread" in text
+    assert queries.from_table("submissions") == []
+
+
 def test_does_set_cookie_headers(journalist_app, test_journo):
     with journalist_app.test_client() as app:
         response = app.get(url_for("main.login"))
@@ -1,16 +1,25 @@
 import binascii
+import dataclasses
+import gzip
 import hashlib
 import json
 import random
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
+from unittest.mock import patch
 from uuid import UUID, uuid4
 
 from db import db
 from encryption import EncryptionManager
 from flask import url_for
-from models import Journalist, Reply, Source, SourceStar, Submission
+from journalist_app.api import MAX_PAGE_LIMIT
+from journalist_app.utils import mark_seen
+from models import Change, Journalist, Reply, Source, SourceStar, Submission
+from sdconfig import SecureDropConfig
+from store import Storage
+from tests.utils import db_helper
 from tests.utils.api_helper import get_api_headers
+from tests.utils.queries import record_queries
 from two_factor import TOTP
 
 import redwood
@@ -36,6 +45,7 @@ def test_unauthenticated_user_gets_all_endpoints(journalist_app):
             "auth_token_url",
             "replies_url",
             "seen_url",
+            "changes_url",
         ]
         expected_endpoints.sort()
         sorted_observed_endpoints = list(response.json.keys())
@@ -174,6 +184,309 @@ def test_authorized_user_gets_all_sources(journalist_app, test_submissions, jour
             assert_valid_timestamp(source["last_updated"])
 
 
+def test_get_all_sources_query_count(journalist_app, test_source, journalist_api_token):
+    def get_all_sources():
+        with journalist_app.test_client() as app, record_queries() as queries:
+            response = app.get(
+                url_for("api.get_all_sources"),
+                headers=get_api_headers(journalist_api_token),
+            )
+        assert response.status_code == 200
+        return response.json["sources"], queries
+
+    with journalist_app.app_context():
+        sources, queries = get_all_sources()
+        assert len(sources) == 1
+
+        # Adding starred sources with submissions...
+        storage = Storage.get_default()
+        for _ in range(4):
+            source = db_helper.init_source(storage)["source"]
+            db_helper.submit(storage, source, 2)
+            db_helper.submit(storage, source, 1, submission_type="file")
+            db.session.add(SourceStar(source))
+        db.session.commit()
+
+        # ...doesn't add queries to the listing
+        sources, more_queries = get_all_sources()
+        assert len(sources) == 5
+        assert len(more_queries) == len(queries)
+        assert more_queries.from_table("source_stars") == []
+        assert more_queries.from_table("submissions") == []
+        assert sum(source["is_starred"] for source in sources) == 4
+        assert sum(source["number_of_documents"] for source in sources) == 4
+        assert sum(source["number_of_messages"] for source in sources) == 8
+
+
+def test_get_all_submissions_and_replies_query_count(journalist_app, journalist_api_token):
+    def add_conversation():
+        # A source with a message and a file seen by one journalist, and a reply
+        # seen by another
+        storage = Storage.get_default()
+        source = db_helper.init_source(storage)["source"]
+        submissions = db_helper.submit(storage, source, 1)
+        submissions += db_helper.submit(storage, source, 1, submission_type="file")
+        journalist, _ = db_helper.init_journalist()
+        mark_seen(submissions, journalist)
+        journalist, _ = db_helper.init_journalist()
+        db_helper.reply(storage, journalist, source, 1)
+
+    def get_all(endpoint, key):
+        with journalist_app.test_client() as app, record_queries() as queries:
+            response = app.get(url_for(endpoint), headers=get_api_headers(journalist_api_token))
+        assert response.status_code == 200
+        return response.json[key], queries
+
+    with journalist_app.app_context():
+        add_conversation()
+        submissions, submission_queries = get_all("api.get_all_submissions", "submissions")
+        replies, reply_queries = get_all("api.get_all_replies", "replies")
+        assert len(submissions) == 2
+        assert len(replies) == 1
+
+        # Adding conversations with other sources and journalists...
+        for _ in range(4):
+            add_conversation()
+
+        # ...doesn't add queries to the listings
+        submissions, more_queries = get_all("api.get_all_submissions", "submissions")
+        assert len(submissions) == 10
+        assert len(more_queries) == len(submission_queries)
+        assert all(submission["is_read"] for submission in submissions)
+        assert all(len(submission["seen_by"]) == 1 for submission in submissions)
+
+        replies, more_queries = get_all("api.get_all_replies", "replies")
+        assert len(replies) == 5
+        assert len(more_queries) == len(reply_queries)
+        assert all(reply["seen_by"] == [reply["journalist_uuid"]] for reply in replies)
+
+
+def test_get_changes(journalist_app, journalist_api_token, test_files):
+    with journalist_app.test_client() as app:
+        headers = get_api_headers(journalist_api_token)
+        source_uuid = test_files["uuid"]
+        seen_uuid, deleted_uuid = (submission.uuid for submission in test_files["submissions"])
+
+        # Without a cursor, only the current one is returned
+        response = app.get(url_for("api.get_changes"), headers=headers)
+        assert response.status_code == 200
+        cursor = response.json["cursor"]
+        assert response.json["sources"] == []
+
+        response = app.post(url_for("api.add_star", source_uuid=source_uuid), headers=headers)
+        assert response.status_code == 201
+        response = app.post(
+            url_for("api.seen"), data=json.dumps({"files": [seen_uuid]}), headers=headers
+        )
+        assert response.status_code == 200
+        response = app.delete(
+            url_for("api.single_submission", source_uuid=source_uuid, submission_uuid=deleted_uuid),
+            headers=headers,
+        )
+        assert response.status_code == 200
+
+        # Only what changed since the cursor is returned
+        response = app.get(url_for("api.get_changes", since=cursor), headers=headers)
+        assert response.status_code == 200
+        changes = response.json
+        assert changes["cursor"] > cursor
+        assert [source["uuid"] for source in changes["sources"]] == [source_uuid]
+        assert changes["sources"][0]["is_starred"]
+        assert changes["sources"][0]["number_of_documents"] == 1
+        assert [submission["uuid"] for submission in changes["submissions"]] == [seen_uuid]
+        assert changes["submissions"][0]["is_read"]
+        assert changes["deleted_submissions"] == [deleted_uuid]
+        assert changes["replies"] == []
+        assert changes["deleted_sources"] == []
+        assert changes["deleted_replies"] == []
+
+        # Deleted sources are tombstoned
+        response = app.delete(
+            url_for("api.single_source", source_uuid=source_uuid), headers=headers
+        )
+        assert response.status_code == 200
+        response = app.get(url_for("api.get_changes", since=changes["cursor"]), headers=headers)
+        assert response.status_code == 200
+        assert response.json["sources"] == []
+        assert response.json["deleted_sources"] == [source_uuid]
+
+        # Nothing changed since the latest cursor
+        cursor = response.json["cursor"]
+        response = app.get(url_for("api.get_changes", since=cursor), headers=headers)
+        assert response.status_code == 200
+        assert response.json["cursor"] == cursor
+        assert response.json["sources"] == []
+        assert response.json["deleted_sources"] == []
+
+        for since in ("not a cursor", -1, cursor + 1):
+            response = app.get(url_for("api.get_changes", since=since), headers=headers)
+            assert response.status_code == 400
+
+
+def test_get_changes_after_pruning(journalist_app, journalist_api_token, test_files):
+    with journalist_app.test_client() as app:
+        headers = get_api_headers(journalist_api_token)
+        source_uuid = test_files["uuid"]
+
+        response = app.get(url_for("api.get_changes"), headers=headers)
+        old_cursor = response.json["cursor"]
+        for _ in range(2):
+            response = app.post(url_for("api.add_star", source_uuid=source_uuid), headers=headers)
+            assert response.status_code == 201
+        response = app.get(url_for("api.get_changes"), headers=headers)
+        cursor = response.json["cursor"]
+
+        # When every change is past its retention, all but the latest one are pruned
+        assert Change.prune(datetime.utcnow() + timedelta(days=1)) > 0
+        assert Change.oldest_cursor() == cursor - 1
+
+        # Then the current cursor can still be synced from
+        response = app.get(url_for("api.get_changes", since=cursor), headers=headers)
+        assert response.status_code == 200
+        assert response.json["cursor"] == cursor
+        response = app.get(url_for("api.get_changes", since=cursor - 1), headers=headers)
+        assert response.status_code == 200
+        assert [source["uuid"] for source in response.json["sources"]] == [source_uuid]
+
+        # But older cursors are gone, as the changes since them are incomplete
+        response = app.get(url_for("api.get_changes", since=old_cursor), headers=headers)
+        assert response.status_code == 410
+
+
+def test_list_endpoints_are_paginated_on_request(
+    journalist_app, journalist_api_token, test_files, test_submissions
+):
+    with journalist_app.test_client() as app:
+        headers = get_api_headers(journalist_api_token)
+        list_endpoints = [
+            (url_for("api.get_all_sources"), "sources"),
+            (url_for("api.get_all_submissions"), "submissions"),
+            (url_for("api.get_all_replies"), "replies"),
+            (url_for("api.all_source_submissions", source_uuid=test_files["uuid"]), "submissions"),
+        ]
+        for url, key in list_endpoints:
+            # Without a limit, everything is returned at once
+            response = app.get(url, headers=headers)
+            assert response.status_code == 200
+            assert "next" not in response.json
+            everything = response.json[key]
+
+            # With a limit, following the next links returns the same
+            paginated = []
+            next_url = url + "?limit=1"
+            while next_url:
+                response = app.get(next_url, headers=headers)
+                assert response.status_code == 200
+                assert len(response.json[key]) <= 1
+                paginated.extend(response.json[key])
+                next_url = response.json["next"]
+            assert paginated == everything
+
+            for query in ("limit=0", f"limit={MAX_PAGE_LIMIT + 1}", "limit=x", "after=1"):
+                response = app.get(f"{url}?{query}", headers=headers)
+                assert response.status_code == 400
+
+
+def test_list_endpoints_answer_conditional_requests(
+    journalist_app, journalist_api_token, test_files
+):
+    with journalist_app.test_client() as app:
+        headers = get_api_headers(journalist_api_token)
+        list_urls = [
+            url_for("api.get_all_sources"),
+            url_for("api.get_all_submissions"),
+            url_for("api.get_all_replies"),
+            url_for("api.all_source_submissions", source_uuid=test_files["uuid"]),
+            url_for("api.all_source_replies", source_uuid=test_files["uuid"]),
+        ]
+        etags = {}
+        for url in list_urls:
+            response = app.get(url, headers=headers)
+            assert response.status_code == 200
+            etags[url] = response.headers["ETag"]
+
+            # Unchanged collections aren't listed again
+            with record_queries() as queries:
+                response = app.get(url, headers={**headers, "If-None-Match": etags[url]})
+            assert response.status_code == 304
+            assert response.data == b""
+            assert response.headers["ETag"] == etags[url]
+            assert queries.from_table("sources") == []
+            assert queries.from_table("submissions") == []
+            assert queries.from_table("replies") == []
+
+        # Each page has its own ETag
+        response = app.get(f"{list_urls[0]}?limit=1", headers=headers)
+        assert response.headers["ETag"] != etags[list_urls[0]]
+
+        # Any change makes the collections modified
+        response = app.post(
+            url_for("api.add_star", source_uuid=test_files["uuid"]), headers=headers
+        )
+        assert response.status_code == 201
+        for url in list_urls:
+            response = app.get(url, headers={**headers, "If-None-Match": etags[url]})
+            assert response.status_code == 200
+            assert response.headers["ETag"] != etags[url]
+
+
+def test_large_json_responses_are_compressed(
+    journalist_app, journalist_api_token, test_files, config
+):
+    with journalist_app.test_client() as app:
+        headers = get_api_headers(journalist_api_token)
+        sources_url = url_for("api.get_all_sources")
+        response = app.get(sources_url, headers=headers)
+        assert response.status_code == 200
+        assert "Content-Encoding" not in response.headers
+        assert "Accept-Encoding" in response.headers["Vary"]
+        uncompressed = response.data
+
+        gzip_headers = {**headers, "Accept-Encoding": "gzip"}
+        min_size_config = dataclasses.replace(
+            config, JOURNALIST_API_COMPRESSION_MIN_SIZE=len(uncompressed)
+        )
+        with patch.object(SecureDropConfig, "get_current", return_value=min_size_config):
+            response = app.get(sources_url, headers=gzip_headers)
+            assert response.headers["Content-Encoding"] == "gzip"
+            assert gzip.decompress(response.data) == uncompressed
+            assert response.headers["ETag"].startswith("W/")
+
+            # Not modified responses have the same validators and Vary header
+            not_modified = app.get(
+                sources_url,
+                headers={**gzip_headers, "If-None-Match": response.headers["ETag"]},
+            )
+            assert not_modified.status_code == 304
+            assert not_modified.headers["ETag"] == response.headers["ETag"]
+            assert "Accept-Encoding" in not_modified.headers["Vary"]
+
+            # Encrypted files aren't compressed
+            response = app.get(
+                url_for(
+                    "api.download_submission",
+                    source_uuid=test_files["uuid"],
+                    submission_uuid=test_files["submissions"][0].uuid,
+                ),
+                headers=gzip_headers,
+            )
+            assert response.status_code == 200
+            assert "Content-Encoding" not in response.headers
+
+        # Responses below the minimum size aren't compressed
+        larger_min_size_config = dataclasses.replace(
+            config, JOURNALIST_API_COMPRESSION_MIN_SIZE=len(uncompressed) + 1
+        )
+        with patch.object(SecureDropConfig, "get_current", return_value=larger_min_size_config):
+            response = app.get(sources_url, headers=gzip_headers)
+            assert "Content-Encoding" not in response.headers
+
+        disabled_config = dataclasses.replace(config, JOURNALIST_API_COMPRESSION=False)
+        with patch.object(SecureDropConfig, "get_current", return_value=disabled_config):
+            response = app.get(sources_url, headers=gzip_headers)
+            assert "Content-Encoding" not in response.headers
+
+
 def test_user_without_token_cannot_get_protected_endpoints(journalist_app, test_files):
     with journalist_app.app_context():
         uuid = test_files["source"].uuid
@@ -193,6 +506,7 @@ def test_user_without_token_cannot_get_protected_endpoints(journalist_app, test_
             ),
             url_for("api.get_all_submissions"),
             url_for("api.get_all_replies"),
+            url_for("api.get_changes"),
             url_for(
                 "api.single_reply",
                 source_uuid=uuid,
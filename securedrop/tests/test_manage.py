@@ -7,9 +7,10 @@ from unittest import mock
 
 import manage
 from management import submissions
-from models import Journalist, db
+from models import Change, Journalist, db
 from passphrases import PassphraseGenerator
 from source_user import create_source_user
+from tests.utils import db_helper
 
 YUBIKEY_HOTP = [
     "cb a0 5f ad 41 a2 ff 4e eb 53 56 3a 1b f7 23 2e ce fc dc",
@@ -218,3 +219,43 @@ def test_were_there_submissions_today(source_app, config, app_storage):
         db.session.commit()
         submissions.were_there_submissions_today(args, context)
         assert open(count_file).read() == "1"
+
+
+def test_show_designation_capacity(source_app, config, capsys):
+    with source_app.app_context():
+        args = argparse.Namespace(verbose=logging.DEBUG)
+        assert manage.show_designation_capacity(args) == 0
+        assert "journalist designations are still available" in capsys.readouterr().out
+
+
+def test_rebuild_source_counters(journalist_app, app_storage, config, capsys):
+    with journalist_app.app_context():
+        source, _ = db_helper.init_source(app_storage)
+        db_helper.submit(app_storage, source, 2)
+        source.num_messages = 0
+        db.session.commit()
+
+        args = argparse.Namespace(verbose=logging.DEBUG)
+        assert manage.rebuild_source_counters(args) == 0
+        assert "1 source(s) were out of date" in capsys.readouterr().out
+        db.session.refresh(source)
+        assert source.num_messages == 2
+
+
+def test_prune_changes(journalist_app, app_storage, config, capsys):
+    with journalist_app.app_context():
+        source, _ = db_helper.init_source(app_storage)
+        for days_ago in (60, 45, 1):
+            Change.record(source)
+            db.session.flush()
+            Change.query.order_by(Change.id.desc()).first().timestamp = (
+                datetime.datetime.utcnow() - datetime.timedelta(days=days_ago)
+            )
+        db.session.commit()
+        latest_cursor = Change.latest_cursor()
+
+        args = argparse.Namespace(verbose=logging.DEBUG)
+        assert manage.prune_changes(args) == 0
+        assert "Pruned 2 change(s) older than 30 day(s)" in capsys.readouterr().out
+        assert Change.oldest_cursor() == latest_cursor - 1
+        assert Change.latest_cursor() == latest_cursor
@@ -1,5 +1,10 @@
 # Integration tests for the redwood Python/Sequoia bridge
-from io import StringIO
+import gzip
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from pathlib import Path
 
 import pytest
 from secure_tempfile import SecureTemporaryFile
@@ -29,6 +34,74 @@ def test_encrypt_stream(tmp_path, key_pair):
     assert (SECRET_MESSAGE * iterations) == actual.decode()
 
 
+def test_recipient_set(tmp_path, key_pair):
+    (public_key, secret_key, fingerprint) = key_pair
+    recipients = redwood.RecipientSet([public_key])
+    for i in range(2):
+        file = tmp_path / f"message{i}.asc"
+        redwood.encrypt_message([recipients], SECRET_MESSAGE, file)
+        actual = redwood.decrypt(file.read_bytes(), secret_key, PASSPHRASE)
+        assert actual.decode() == SECRET_MESSAGE
+
+
+def test_recipient_set_invalid_key():
+    with pytest.raises(redwood.RedwoodError):
+        redwood.RecipientSet(["not a key"])
+
+
+def test_compress_and_encrypt_file(tmp_path, key_pair):
+    (public_key, secret_key, fingerprint) = key_pair
+    file = tmp_path / "file.gz.asc"
+    with SecureTemporaryFile("/tmp") as stf:
+        for _ in range(100_000):
+            stf.write(SECRET_MESSAGE.encode())
+        stf.flush()
+
+        redwood.compress_and_encrypt_file(
+            [public_key], Path(stf.filepath), "file.txt", file, stf.key, stf.iv
+        )
+    compressed = redwood.decrypt(file.read_bytes(), secret_key, PASSPHRASE)
+    assert gzip.decompress(compressed).decode() == SECRET_MESSAGE * 100_000
+    # The original filename is recorded in the gzip header
+    assert b"file.txt\x00" in compressed[:32]
+
+
+def test_encrypt_stream_native(tmp_path, key_pair):
+    (public_key, secret_key, fingerprint) = key_pair
+    plaintext = (SECRET_MESSAGE * 100_000).encode()
+
+    # In-memory streams, from their current position
+    stream = BytesIO(b"skipped" + plaintext)
+    stream.read(len(b"skipped"))
+    redwood.encrypt_stream([public_key], stream, tmp_path / "bytesio.asc")
+
+    # Regular files, from their current position
+    path = tmp_path / "plaintext"
+    path.write_bytes(b"skipped" + plaintext)
+    with path.open("rb") as f:
+        f.read(len(b"skipped"))
+        redwood.encrypt_stream([public_key], f, tmp_path / "file.asc")
+
+    # Secure temporary files, which are decrypted natively
+    with SecureTemporaryFile("/tmp") as stf:
+        stf.write(plaintext)
+        source_key, source_iv = stf.prepare_native_read()
+        redwood.encrypt_stream(
+            [public_key], stf, tmp_path / "stf.asc", source_key=source_key, source_iv=source_iv
+        )
+
+    # Wrappers that expose the file descriptor of the data they transform are
+    # read through Python
+    with gzip.open(tmp_path / "plaintext.gz", "wb") as gzf:
+        gzf.write(plaintext)
+    with gzip.open(tmp_path / "plaintext.gz", "rb") as gzf:
+        redwood.encrypt_stream([public_key], gzf, tmp_path / "gzip.asc")
+
+    for name in ["bytesio.asc", "file.asc", "stf.asc", "gzip.asc"]:
+        ciphertext = (tmp_path / name).read_bytes()
+        assert redwood.decrypt(ciphertext, secret_key, PASSPHRASE) == plaintext
+
+
 class DummyReadable:
     """A fake class with a read() method that fails"""
 
@@ -51,3 +124,149 @@ def test_encrypt_stream_bad(tmp_path, key_pair):
         redwood.encrypt_stream([public_key], StringIO(SECRET_MESSAGE), tmp_path / "file2.asc")
     with pytest.raises(redwood.RedwoodError, match='error: "RuntimeError: uhoh"'):
         redwood.encrypt_stream([public_key], DummyReadable(), tmp_path / "file3.asc")
+
+
+def test_decrypt_many(tmp_path, key_pair):
+    (public_key, secret_key, fingerprint) = key_pair
+    (other_public_key, _, _) = redwood.generate_source_key_pair(PASSPHRASE, "bar@example.org")
+    ciphertexts = []
+    for i, recipient in enumerate([public_key, other_public_key, public_key]):
+        file = tmp_path / f"message{i}.asc"
+        redwood.encrypt_message([recipient], f"{SECRET_MESSAGE} {i}", file)
+        ciphertexts.append(file.read_bytes())
+
+    results = redwood.decrypt_many(ciphertexts, secret_key, PASSPHRASE)
+    # The messages for this key are decrypted
+    assert results[0].decode() == f"{SECRET_MESSAGE} 0"
+    assert results[2].decode() == f"{SECRET_MESSAGE} 2"
+    # And the one for another key is returned as an error, without affecting the others
+    assert isinstance(results[1], redwood.RedwoodError)
+    assert "no matching pkesk" in str(results[1])
+
+    # A wrong passphrase fails for the whole batch
+    with pytest.raises(redwood.RedwoodError):
+        redwood.decrypt_many(ciphertexts, secret_key, "not the correct passphrase")
+
+
+def test_bind_source_key_pair():
+    (unbound_secret_key, fingerprint) = redwood.generate_unbound_key_pair("pool passphrase")
+    (public_key, secret_key, bound_fingerprint) = redwood.bind_source_key_pair(
+        unbound_secret_key, "pool passphrase", PASSPHRASE, "foo@example.org"
+    )
+    assert bound_fingerprint == fingerprint
+    assert redwood.is_valid_public_key(public_key) == fingerprint
+    assert redwood.is_valid_secret_key(secret_key, PASSPHRASE) == fingerprint
+    # The pool passphrase no longer unlocks the key
+    with pytest.raises(redwood.RedwoodError):
+        redwood.is_valid_secret_key(secret_key, "pool passphrase")
+
+
+def test_decrypt_stream(tmp_path, key_pair):
+    (public_key, secret_key, fingerprint) = key_pair
+    iterations = 100_000
+    ciphertext = tmp_path / "message.asc"
+    redwood.encrypt_message([public_key], SECRET_MESSAGE * iterations, ciphertext)
+
+    # From a path
+    plaintext = tmp_path / "from_path.txt"
+    redwood.decrypt_stream(ciphertext, plaintext, secret_key, PASSPHRASE)
+    assert plaintext.read_text() == SECRET_MESSAGE * iterations
+
+    # From a file object
+    plaintext = tmp_path / "from_file.txt"
+    with ciphertext.open("rb") as f:
+        redwood.decrypt_stream(f, plaintext, secret_key, PASSPHRASE)
+    assert plaintext.read_text() == SECRET_MESSAGE * iterations
+
+
+def test_decrypt_stream_bad(tmp_path, key_pair):
+    (public_key, secret_key, fingerprint) = key_pair
+    ciphertext = tmp_path / "message.asc"
+    redwood.encrypt_message([public_key], SECRET_MESSAGE, ciphertext)
+    plaintext = tmp_path / "message.txt"
+    with pytest.raises(redwood.RedwoodError):
+        redwood.decrypt_stream(ciphertext, plaintext, secret_key, "wrong passphrase")
+    assert not plaintext.exists()
+    with pytest.raises(redwood.RedwoodError):
+        redwood.decrypt_stream(StringIO("not a file"), plaintext, secret_key, PASSPHRASE)
+    assert not plaintext.exists()
+
+
+def test_encrypt_many(tmp_path, key_pair):
+    (public_key, secret_key, fingerprint) = key_pair
+    plaintexts = [SECRET_MESSAGE, SECRET_MESSAGE.encode(), "another message"]
+    destinations = [tmp_path / f"message{i}.asc" for i in range(len(plaintexts))]
+    redwood.encrypt_many([public_key], plaintexts, destinations, threads=2)
+    for plaintext, destination in zip(plaintexts, destinations):
+        actual = redwood.decrypt(destination.read_bytes(), secret_key, PASSPHRASE)
+        expected = plaintext.encode() if isinstance(plaintext, str) else plaintext
+        assert actual == expected
+
+
+def test_encrypt_many_bad(tmp_path, key_pair):
+    (public_key, secret_key, fingerprint) = key_pair
+    with pytest.raises(redwood.RedwoodError, match="Got 2 plaintexts but 1 destinations"):
+        redwood.encrypt_many([public_key], ["a", "b"], [tmp_path / "message.asc"])
+    assert not (tmp_path / "message.asc").exists()
+
+
+def test_threads(tmp_path, key_pair):
+    # The public key operations release the GIL, so they can run concurrently
+    (public_key, secret_key, fingerprint) = key_pair
+
+    def round_trip(i: int) -> str:
+        file = tmp_path / f"message{i}.asc"
+        redwood.encrypt_message([public_key], f"{SECRET_MESSAGE} {i}", file)
+        assert redwood.is_valid_secret_key(secret_key, PASSPHRASE) == fingerprint
+        return redwood.decrypt(file.read_bytes(), secret_key, PASSPHRASE).decode()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(round_trip, range(8)))
+    assert results == [f"{SECRET_MESSAGE} {i}" for i in range(8)]
+
+
+@pytest.mark.parametrize(
+    "function", ["generate_source_key_pair", "is_valid_secret_key", "encrypt_message", "decrypt"]
+)
+def test_threads_release_the_gil(tmp_path, key_pair, function):
+    # Another Python thread gets to run while a redwood call is in progress
+    (public_key, secret_key, fingerprint) = key_pair
+    ciphertext = tmp_path / "ciphertext.asc"
+    redwood.encrypt_message([public_key], SECRET_MESSAGE, ciphertext)
+    ciphertext_bytes = ciphertext.read_bytes()
+    destinations = (tmp_path / f"message{i}.asc" for i in range(100))
+    calls = {
+        "generate_source_key_pair": lambda: redwood.generate_source_key_pair(
+            PASSPHRASE, "foo@example.org"
+        ),
+        "is_valid_secret_key": lambda: redwood.is_valid_secret_key(secret_key, PASSPHRASE),
+        "encrypt_message": lambda: redwood.encrypt_message(
+            [public_key], SECRET_MESSAGE, next(destinations)
+        ),
+        "decrypt": lambda: redwood.decrypt(ciphertext_bytes, secret_key, PASSPHRASE),
+    }
+
+    started = threading.Event()
+    ran = threading.Event()
+
+    def other() -> None:
+        started.wait()
+        ran.set()
+
+    # Never force a thread switch, so the other thread can only take the GIL when the
+    # calling thread releases it
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1000)
+    thread = threading.Thread(target=other)
+    try:
+        thread.start()
+        started.set()
+        for _ in range(100):
+            calls[function]()
+            if ran.is_set():
+                break
+        assert ran.is_set()
+    finally:
+        started.set()
+        thread.join()
+        sys.setswitchinterval(switch_interval)
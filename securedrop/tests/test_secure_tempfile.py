@@ -1,6 +1,10 @@
 import os
 
 import pytest
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers import Cipher
+from cryptography.hazmat.primitives.ciphers.algorithms import AES
+from cryptography.hazmat.primitives.ciphers.modes import CTR
 from secure_tempfile import SecureTemporaryFile
 
 MESSAGE = "410,757,864,530"
@@ -99,3 +103,29 @@ def test_tmp_file_id_omits_invalid_chars():
     f = SecureTemporaryFile("/tmp")
     assert "/" not in f.tmp_file_id
     assert "\0" not in f.tmp_file_id
+
+
+def test_prepare_native_read():
+    f = SecureTemporaryFile("/tmp")
+    f.write(MESSAGE)
+    key, iv = f.prepare_native_read()
+
+    # Native code can decrypt the file on its own
+    decryptor = Cipher(AES(key), CTR(iv), default_backend()).decryptor()
+    with open(f.filepath, "rb") as fh:
+        assert decryptor.update(fh.read()).decode("utf-8") == MESSAGE
+
+    with pytest.raises(AssertionError) as err:
+        f.write(MESSAGE)
+    assert "You cannot write after reading!" in str(err)
+
+    with pytest.raises(AssertionError) as err:
+        f.prepare_native_read()
+    assert "The file has already been read!" in str(err)
+
+
+def test_prepare_native_read_before_writing():
+    f = SecureTemporaryFile("/tmp")
+    with pytest.raises(AssertionError) as err:
+        f.prepare_native_read()
+    assert "You must write before reading!" in str(err)
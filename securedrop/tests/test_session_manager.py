@@ -3,9 +3,11 @@ from unittest import mock
 
 import pytest
 from db import db
+from flask import session
 from passphrases import PassphraseGenerator
 from source_app.session_manager import (
     SessionManager,
+    SourceIdentityCache,
     UserHasBeenDeleted,
     UserNotLoggedIn,
     UserSessionExpired,
@@ -96,3 +98,80 @@ class TestSessionManager:
             # When querying the current user from the SessionManager, it fails with the right error
             with pytest.raises(UserHasBeenDeleted):
                 SessionManager.get_logged_in_user(db_session=db.session)
+
+    def test_get_logged_in_user_uses_cached_identity(self, source_app, app_storage):
+        # Given a source user
+        passphrase = PassphraseGenerator.get_default().generate_passphrase()
+        source_user = create_source_user(
+            db_session=db.session,
+            source_passphrase=passphrase,
+            source_app_storage=app_storage,
+        )
+
+        with source_app.test_request_context():
+            # Who previously logged in
+            SessionManager.log_user_in(db_session=db.session, supplied_passphrase=passphrase)
+
+            # When querying the current user from the SessionManager
+            with mock.patch(
+                "source_app.session_manager.authenticate_source_user"
+            ) as mock_authenticate:
+                logged_in_user = SessionManager.get_logged_in_user(db_session=db.session)
+
+            # Then the passphrase was not derived again
+            mock_authenticate.assert_not_called()
+
+            # And the cached identity matches the one derived at login
+            assert logged_in_user.db_record_id == source_user.db_record_id
+            assert logged_in_user.filesystem_id == source_user.filesystem_id
+            assert logged_in_user.gpg_secret == source_user.gpg_secret
+
+    def test_get_logged_in_user_but_cached_identity_expired(self, source_app, app_storage):
+        # Given a source user
+        passphrase = PassphraseGenerator.get_default().generate_passphrase()
+        source_user = create_source_user(
+            db_session=db.session,
+            source_passphrase=passphrase,
+            source_app_storage=app_storage,
+        )
+
+        with source_app.test_request_context():
+            # Who previously logged in
+            SessionManager.log_user_in(db_session=db.session, supplied_passphrase=passphrase)
+
+            # But whose cached identity is no longer available on the server
+            identity_token = session[SessionManager._SESSION_COOKIE_KEY_FOR_IDENTITY]
+            SourceIdentityCache.get_default().evict(identity_token)
+
+            # When querying the current user from the SessionManager, it succeeds
+            logged_in_user = SessionManager.get_logged_in_user(db_session=db.session)
+            assert logged_in_user.db_record_id == source_user.db_record_id
+            assert logged_in_user.gpg_secret == source_user.gpg_secret
+
+            # And the identity was cached again
+            new_identity_token = session[SessionManager._SESSION_COOKIE_KEY_FOR_IDENTITY]
+            assert new_identity_token != identity_token
+            assert SourceIdentityCache.get_default().retrieve(new_identity_token) == (
+                source_user.filesystem_id,
+                source_user.gpg_secret,
+            )
+
+    def test_log_user_out_evicts_cached_identity(self, source_app, app_storage):
+        # Given a source user
+        passphrase = PassphraseGenerator.get_default().generate_passphrase()
+        create_source_user(
+            db_session=db.session,
+            source_passphrase=passphrase,
+            source_app_storage=app_storage,
+        )
+
+        with source_app.test_request_context():
+            # Who previously logged in
+            SessionManager.log_user_in(db_session=db.session, supplied_passphrase=passphrase)
+            identity_token = session[SessionManager._SESSION_COOKIE_KEY_FOR_IDENTITY]
+
+            # When they log out
+            SessionManager.log_user_out()
+
+            # Then their cached identity was removed from the server
+            assert SourceIdentityCache.get_default().retrieve(identity_token) is None
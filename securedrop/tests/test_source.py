@@ -22,13 +22,14 @@ from passphrases import PassphraseGenerator
 from source_app import api as source_app_api
 from source_app import get_logo_url
 from source_app.session_manager import SessionManager
-from source_user import create_source_user
+from source_user import SourceKdfOverloadedError, _SourceKdfExecutor, create_source_user
 
 import redwood
 
 from . import utils
 from .utils.db_helper import new_codename, submit
 from .utils.instrument import InstrumentedApp
+from .utils.queries import record_queries
 
 GENERATE_DATA = {"tor2web_check": 'href="fake.onion"'}
 
@@ -70,12 +71,9 @@ def test_page_not_found(source_app):
 
 
 def test_orgname_default_set(source_app):
-    class dummy_current:
-        organization_name = None
-
     with patch.object(InstanceConfig, "get_current") as iMock:
         with source_app.test_client() as app:
-            iMock.return_value = dummy_current()
+            iMock.return_value = InstanceConfig(organization_name=None)
             resp = app.get(url_for("main.index"))
             assert resp.status_code == 200
             assert g.organization_name == "SecureDrop"
@@ -299,6 +297,23 @@ def test_user_must_log_in_for_protected_views(source_app):
         assert "Enter Codename" in text
 
 
+def test_login_when_kdf_overloaded(source_app):
+    with source_app.test_client() as app:
+        codename = new_codename(app, session)
+
+    with source_app.test_client() as app, mock.patch.object(
+        _SourceKdfExecutor, "reserve", side_effect=SourceKdfOverloadedError()
+    ):
+        resp = app.post(url_for("main.login"), data=dict(codename=codename))
+        assert resp.status_code == 503
+        assert resp.headers["Retry-After"]
+        assert not SessionManager.is_user_logged_in(db_session=db.session)
+
+        # Pages that do not need to derive a passphrase are still served
+        resp = app.get(url_for("main.index"))
+        assert resp.status_code == 200
+
+
 def test_login_with_whitespace(source_app):
     """
     Test that codenames with leading or trailing whitespace still work
@@ -368,8 +383,11 @@ def test_login_with_undecryptable_reply_files(source_app, app_storage):
     reply_file_path = Path(app_storage.path(source.filesystem_id, replies[0].filename))
     assert reply_file_path.exists()
 
-    with mock.patch("encryption.EncryptionManager.decrypt_journalist_reply") as repMock:
-        repMock.side_effect = GpgDecryptError()
+    def undecryptable_replies(for_source_user, ciphertexts_in):
+        return [GpgDecryptError()] * len(ciphertexts_in)
+
+    with mock.patch("encryption.EncryptionManager.decrypt_journalist_replies") as repMock:
+        repMock.side_effect = undecryptable_replies
         with source_app.test_client() as app:
             resp = app.get(url_for("main.login"))
             assert resp.status_code == 200
@@ -485,6 +503,26 @@ def test_submit_message(source_app):
         assert "Thanks! We received your message" in text
 
 
+def test_source_record_is_queried_once_per_request(source_app):
+    with source_app.test_client() as app:
+        new_codename(app, session)
+
+        with record_queries() as queries:
+            resp = app.get(url_for("main.lookup"))
+        assert resp.status_code == 200
+        assert len(queries.from_table("sources")) == 1
+
+        with record_queries() as queries:
+            resp = app.post(
+                url_for("main.submit"),
+                data=dict(msg="This is a test.", fh=(BytesIO(b"This is a file."), "test.txt")),
+            )
+        assert resp.status_code == 302
+        # Once when looking up the logged in source, and once to refresh its record after the
+        # submissions have been committed
+        assert len(queries.from_table("sources")) == 2
+
+
 def test_submit_empty_message(source_app):
     with source_app.test_client() as app:
         new_codename(app, session)
@@ -0,0 +1,80 @@
+from unittest import mock
+
+import pytest
+from redis import Redis
+from source_key_pool import SourceKeyPool
+
+import redwood
+
+POOL_PASSPHRASE = "pool passphrase"
+PASSPHRASE = "correcthorsebatterystaple"
+
+
+@pytest.fixture
+def source_key_pool(config):
+    redis = Redis(decode_responses=True, **config.REDIS_KWARGS)
+    redis.delete(SourceKeyPool.REDIS_POOL_LIST)
+    yield SourceKeyPool(redis=redis, pool_passphrase=POOL_PASSPHRASE, size=2)
+    redis.delete(SourceKeyPool.REDIS_POOL_LIST)
+
+
+class TestSourceKeyPool:
+    def test_get_default(self, config):
+        assert SourceKeyPool.get_default().size == config.SOURCE_KEY_POOL_SIZE
+
+    def test_refill(self, source_key_pool):
+        # Given an empty pool
+        assert source_key_pool.available() == 0
+
+        # When refilling it, it gets filled up to its size
+        assert source_key_pool.refill() == 2
+        assert source_key_pool.available() == 2
+
+        # And refilling a full pool does nothing
+        assert source_key_pool.refill() == 0
+        assert source_key_pool.available() == 2
+
+    def test_claim(self, source_key_pool, tmp_path):
+        # Given a pool with a key pair
+        source_key_pool.refill()
+
+        # When claiming a key pair for a source
+        public_key, secret_key, fingerprint = source_key_pool.claim(PASSPHRASE, "foo@example.org")
+
+        # It was taken out of the pool
+        assert source_key_pool.available() == 1
+
+        # And it is bound to the source and protected with the source's passphrase
+        assert redwood.is_valid_public_key(public_key) == fingerprint
+        assert redwood.is_valid_secret_key(secret_key, PASSPHRASE) == fingerprint
+        reply = tmp_path / "reply.gpg"
+        redwood.encrypt_message([public_key], "hello", reply)
+        assert redwood.decrypt(reply.read_bytes(), secret_key, PASSPHRASE) == b"hello"
+
+    def test_claim_empty_pool(self, source_key_pool):
+        assert source_key_pool.claim(PASSPHRASE, "foo@example.org") is None
+
+    def test_get_key_pair_falls_back_to_generating(self, source_key_pool):
+        # Given an empty pool
+        # When getting a key pair for a source, one gets generated instead
+        with mock.patch(
+            "redwood.generate_source_key_pair", wraps=redwood.generate_source_key_pair
+        ) as generate:
+            public_key, secret_key, fingerprint = source_key_pool.get_key_pair(
+                PASSPHRASE, "foo@example.org"
+            )
+        generate.assert_called_once_with(PASSPHRASE, "foo@example.org")
+        assert redwood.is_valid_secret_key(secret_key, PASSPHRASE) == fingerprint
+
+    def test_get_key_pair_from_pool(self, source_key_pool):
+        # Given a pool with key pairs
+        source_key_pool.refill()
+
+        # When getting a key pair for a source, no new key gets generated
+        with mock.patch("redwood.generate_source_key_pair") as generate:
+            public_key, secret_key, fingerprint = source_key_pool.get_key_pair(
+                PASSPHRASE, "foo@example.org"
+            )
+        generate.assert_not_called()
+        assert source_key_pool.available() == 1
+        assert redwood.is_valid_secret_key(secret_key, PASSPHRASE) == fingerprint
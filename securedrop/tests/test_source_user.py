@@ -1,23 +1,52 @@
+import threading
 from unittest import mock
+from uuid import uuid4
 
 import pytest
-import source_user
 from db import db
 from passphrases import PassphraseGenerator
+from redis import Redis
 from source_user import (
     InvalidPassphraseError,
     SourceDesignationCollisionError,
+    SourceKdfOverloadedError,
     SourcePassphraseCollisionError,
+    _DesignationAllocator,
     _DesignationGenerator,
+    _SourceKdfExecutor,
     _SourceScryptManager,
     authenticate_source_user,
     create_source_user,
 )
 
+from .utils.queries import record_queries
+
 TEST_SALT_GPG_SECRET = "YrPAwKMyWN66Y2WNSt+FS1KwfysMHwPISG0wmpb717k="
 TEST_SALT_FOR_FILESYSTEM_ID = "mEFXIwvxoBqjyxc/JypLdvgMRNRjApoaM0OBNrxJM2E="
 
 
+@pytest.fixture
+def make_designation_allocator(config):
+    """Create designation allocators with unique word lists, so that each test gets its own
+    bitmaps in Redis, and delete these bitmaps afterwards."""
+    redis = Redis(**config.REDIS_KWARGS)
+    designation_allocators = []
+
+    def _make_designation_allocator(nouns, adjectives=None):
+        designation_allocator = _DesignationAllocator(
+            redis=redis,
+            nouns=nouns,
+            adjectives=adjectives or ["tonic", "trivial", uuid4().hex],
+        )
+        designation_allocators.append(designation_allocator)
+        return designation_allocator
+
+    yield _make_designation_allocator
+
+    for designation_allocator in designation_allocators:
+        redis.delete(designation_allocator._bitmap_key)
+
+
 class TestSourceUser:
     def test_create_source_user(self, source_app, app_storage):
         # Given a passphrase
@@ -49,22 +78,51 @@ class TestSourceUser:
                 source_app_storage=app_storage,
             )
 
-    def test_create_source_user_designation_collision(self, source_app, app_storage):
-        # Given a source in the DB
-        existing_source = create_source_user(
-            db_session=db.session,
-            source_passphrase=PassphraseGenerator.get_default().generate_passphrase(),
-            source_app_storage=app_storage,
-        )
-        existing_designation = existing_source.get_db_record().journalist_designation
+    def test_create_source_user_passphrase_collision_releases_designation(
+        self, source_app, app_storage, make_designation_allocator
+    ):
+        # Given a source in the DB that was given a designation by an allocator
+        designation_allocator = make_designation_allocator(nouns=["ability"])
+        passphrase = PassphraseGenerator.get_default().generate_passphrase()
+        with mock.patch.object(
+            _DesignationAllocator, "get_default", return_value=designation_allocator
+        ):
+            create_source_user(
+                db_session=db.session,
+                source_passphrase=passphrase,
+                source_app_storage=app_storage,
+            )
+            assert designation_allocator.remaining_capacity(db.session) == 2
+
+            # When trying to create another with the same passphrase, it fails
+            with pytest.raises(SourcePassphraseCollisionError):
+                create_source_user(
+                    db_session=db.session,
+                    source_passphrase=passphrase,
+                    source_app_storage=app_storage,
+                )
+
+        # And the designation it was given is available again
+        assert designation_allocator.remaining_capacity(db.session) == 2
 
-        # And the next generated journalist designation will be identical to this source's
+    def test_create_source_user_designation_collision(
+        self, source_app, app_storage, make_designation_allocator
+    ):
+        # Given a designation allocator that can only allocate a single designation
+        designation_allocator = make_designation_allocator(
+            nouns=[uuid4().hex], adjectives=["tonic"]
+        )
         with mock.patch.object(
-            source_user._DesignationGenerator,
-            "generate_journalist_designation",
-            return_value=existing_designation,
+            _DesignationAllocator, "get_default", return_value=designation_allocator
         ):
-            # When trying to create another source, it fails, because the designation is the same
+            # And a source in the DB that was given this designation
+            create_source_user(
+                db_session=db.session,
+                source_passphrase=PassphraseGenerator.get_default().generate_passphrase(),
+                source_app_storage=app_storage,
+            )
+
+            # When trying to create another source, it fails, because no designation is left
             with pytest.raises(SourceDesignationCollisionError):
                 create_source_user(
                     db_session=db.session,
@@ -103,6 +161,79 @@ class TestSourceUser:
         with pytest.raises(InvalidPassphraseError):
             authenticate_source_user(db_session=db.session, supplied_passphrase=wrong_passphrase)
 
+    def test_authenticate_source_user_when_kdf_fills_up(self, source_app, app_storage):
+        # Given a source in the DB
+        passphrase = PassphraseGenerator.get_default().generate_passphrase()
+        source_user = create_source_user(
+            db_session=db.session,
+            source_passphrase=passphrase,
+            source_app_storage=app_storage,
+        )
+
+        # And an executor with a single slot, which other logins take as soon as it is free
+        scrypt_mgr = _SourceScryptManager.get_default()
+        kdf_executor = _SourceKdfExecutor(scrypt_mgr, max_workers=2, max_pending=1)
+        derive_source_filesystem_id = scrypt_mgr.derive_source_filesystem_id
+        rejected = []
+
+        def derive_then_flood(source_passphrase):
+            filesystem_id = derive_source_filesystem_id(source_passphrase)
+            try:
+                kdf_executor.derive("rehydrate flaring study raven fence extenuate linguist")
+            except SourceKdfOverloadedError as e:
+                rejected.append(e)
+            return filesystem_id
+
+        # When the source authenticates while the executor is saturated between the derivation
+        # of their filesystem ID and that of their GPG secret
+        with mock.patch("source_user._default_kdf_executor", kdf_executor), mock.patch.object(
+            scrypt_mgr, "derive_source_filesystem_id", derive_then_flood
+        ):
+            authenticated_user = authenticate_source_user(
+                db_session=db.session, supplied_passphrase=passphrase
+            )
+
+        # It succeeds, because the login held its slot, and the other login was rejected
+        assert authenticated_user.db_record_id == source_user.db_record_id
+        assert authenticated_user.gpg_secret == source_user.gpg_secret
+        assert len(rejected) == 1
+        assert kdf_executor.queue_length == 0
+
+    def test_authenticate_source_user_wrong_passphrase_skips_gpg_secret(self, source_app):
+        # When a user tries to authenticate using a passphrase that maps to no source
+        wrong_passphrase = "rehydrate flaring study raven fence extenuate linguist"
+        with mock.patch.object(
+            _SourceScryptManager, "derive_source_gpg_secret"
+        ) as derive_source_gpg_secret:
+            with pytest.raises(InvalidPassphraseError):
+                authenticate_source_user(
+                    db_session=db.session, supplied_passphrase=wrong_passphrase
+                )
+
+        # The passphrase is only stretched once, to look up the filesystem ID
+        derive_source_gpg_secret.assert_not_called()
+
+    def test_get_db_record(self, source_app, app_storage):
+        # Given a source user
+        source_user = create_source_user(
+            db_session=db.session,
+            source_passphrase=PassphraseGenerator.get_default().generate_passphrase(),
+            source_app_storage=app_storage,
+        )
+
+        # Their record is only queried once within the same database session
+        db_record = source_user.get_db_record()
+        with record_queries() as queries:
+            assert source_user.get_db_record() is db_record
+        assert queries.from_table("sources") == []
+
+        # And it is queried again once the session was closed
+        db.session.remove()
+        with record_queries() as queries:
+            assert source_user.get_db_record().id == source_user.db_record_id
+            assert source_user.get_db_record().id == source_user.db_record_id
+        assert len(queries.from_table("sources")) == 1
+
 
 class TestSourceScryptManager:
     def test(self):
@@ -132,6 +263,87 @@ class TestSourceScryptManager:
         assert scrypt_mgr
 
 
+class TestSourceKdfExecutor:
+    @staticmethod
+    def _scrypt_manager() -> _SourceScryptManager:
+        return _SourceScryptManager(
+            salt_for_gpg_secret=TEST_SALT_GPG_SECRET.encode(),
+            salt_for_filesystem_id=TEST_SALT_FOR_FILESYSTEM_ID.encode(),
+            scrypt_n=2**1,
+            scrypt_r=1,
+            scrypt_p=1,
+        )
+
+    def test(self):
+        # Given a passphrase
+        passphrase = "rehydrate flaring study raven fence extenuate linguist"
+        scrypt_mgr = self._scrypt_manager()
+        kdf_executor = _SourceKdfExecutor(scrypt_mgr, max_workers=2, max_pending=1)
+
+        # When deriving the passphrase's filesystem ID and GPG secret through the executor
+        filesystem_id, gpg_secret = kdf_executor.derive(passphrase)
+
+        # It succeeds and the same values as the scrypt manager's are returned
+        assert filesystem_id == scrypt_mgr.derive_source_filesystem_id(passphrase)
+        assert gpg_secret == scrypt_mgr.derive_source_gpg_secret(passphrase)
+        assert kdf_executor.queue_length == 0
+
+    def test_overloaded(self):
+        # Given an executor whose only slot is taken by a derivation that does not finish
+        scrypt_mgr = self._scrypt_manager()
+        kdf_executor = _SourceKdfExecutor(scrypt_mgr, max_workers=2, max_pending=1)
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_derivation(source_passphrase):
+            started.set()
+            release.wait()
+            return "slow"
+
+        with mock.patch.object(scrypt_mgr, "derive_source_filesystem_id", slow_derivation):
+            blocked = threading.Thread(target=kdf_executor.derive, args=("blocked",))
+            blocked.start()
+            started.wait()
+            assert kdf_executor.queue_length == 1
+
+            # When trying to derive another passphrase, it is rejected right away
+            with pytest.raises(SourceKdfOverloadedError):
+                kdf_executor.derive("rehydrate flaring study raven fence extenuate linguist")
+
+            release.set()
+            blocked.join()
+
+        # And the executor accepts derivations again once the pending one is done
+        assert kdf_executor.queue_length == 0
+        assert kdf_executor.derive("rehydrate flaring study raven fence extenuate linguist")
+
+    def test_reserve(self):
+        # Given a passphrase and an executor with a single slot
+        passphrase = "rehydrate flaring study raven fence extenuate linguist"
+        scrypt_mgr = self._scrypt_manager()
+        kdf_executor = _SourceKdfExecutor(scrypt_mgr, max_workers=2, max_pending=1)
+
+        # When deriving the passphrase in two steps within a reservation
+        with kdf_executor.reserve() as reservation:
+            filesystem_id = reservation.derive_filesystem_id(passphrase)
+
+            # Then other passphrases are rejected in between
+            assert kdf_executor.queue_length == 1
+            with pytest.raises(SourceKdfOverloadedError):
+                kdf_executor.derive("blocked")
+
+            # But the second step still gets to run
+            gpg_secret = reservation.derive_gpg_secret(passphrase)
+
+        assert filesystem_id == scrypt_mgr.derive_source_filesystem_id(passphrase)
+        assert gpg_secret == scrypt_mgr.derive_source_gpg_secret(passphrase)
+        assert kdf_executor.queue_length == 0
+
+    def test_get_default(self):
+        kdf_executor = _SourceKdfExecutor.get_default()
+        assert kdf_executor
+
+
 class TestDesignationGenerator:
     def test(self):
         # Given a designation generator
@@ -171,3 +383,112 @@ class TestDesignationGenerator:
         designation_generator = _DesignationGenerator.get_default()
         assert designation_generator
         assert designation_generator.generate_journalist_designation()
+
+
+class TestDesignationAllocator:
+    def test(self, source_app, make_designation_allocator):
+        # Given a designation allocator
+        designation_allocator = make_designation_allocator(nouns=["ability", "accent", "academia"])
+        assert designation_allocator.capacity == 9
+        assert designation_allocator.remaining_capacity(db.session) == 9
+
+        # When using it to allocate all the possible designations
+        designations = [
+            designation_allocator.allocate_journalist_designation(db.session) for _ in range(9)
+        ]
+
+        # It succeeds and they are all different
+        assert len(set(designations)) == 9
+        assert designation_allocator.remaining_capacity(db.session) == 0
+
+        # And no more designation can then be allocated
+        assert designation_allocator.allocate_journalist_designation(db.session) is None
+
+    def test_designations_used_in_database_are_not_allocated(
+        self, config, source_app, app_storage, make_designation_allocator
+    ):
+        # Given sources in the DB that were given designations by an allocator
+        designation_allocator = make_designation_allocator(nouns=["ability"])
+        with mock.patch.object(
+            _DesignationAllocator, "get_default", return_value=designation_allocator
+        ):
+            used_designations = {
+                create_source_user(
+                    db_session=db.session,
+                    source_passphrase=PassphraseGenerator.get_default().generate_passphrase(),
+                    source_app_storage=app_storage,
+                )
+                .get_db_record()
+                .journalist_designation
+                for _ in range(2)
+            }
+
+        # When the allocator's bitmap is lost, for example because Redis was restarted
+        Redis(**config.REDIS_KWARGS).delete(designation_allocator._bitmap_key)
+
+        # Then it is rebuilt from the DB and only the unused designation can be allocated
+        assert designation_allocator.remaining_capacity(db.session) == 1
+        designation = designation_allocator.allocate_journalist_designation(db.session)
+        assert designation not in used_designations
+        assert designation_allocator.allocate_journalist_designation(db.session) is None
+
+    def test_designations_of_deleted_sources_are_released(
+        self, source_app, app_storage, make_designation_allocator
+    ):
+        # Given sources in the DB that were given all the designations of an allocator
+        designation_allocator = make_designation_allocator(nouns=["ability"])
+        with mock.patch.object(
+            _DesignationAllocator, "get_default", return_value=designation_allocator
+        ):
+            sources = [
+                create_source_user(
+                    db_session=db.session,
+                    source_passphrase=PassphraseGenerator.get_default().generate_passphrase(),
+                    source_app_storage=app_storage,
+                ).get_db_record()
+                for _ in range(3)
+            ]
+        assert designation_allocator.remaining_capacity(db.session) == 0
+
+        # When one of them is deleted and its designation released
+        deleted_designation = sources[0].journalist_designation
+        db.session.delete(sources[0])
+        db.session.commit()
+        designation_allocator.release_journalist_designation(db.session, deleted_designation)
+
+        # Then it is the only one that can be allocated again
+        assert designation_allocator.remaining_capacity(db.session) == 1
+        assert designation_allocator.allocate_journalist_designation(db.session) == (
+            deleted_designation
+        )
+
+    def test_designations_still_in_use_are_not_released(
+        self, source_app, app_storage, make_designation_allocator
+    ):
+        # Given a source in the DB that was given a designation by an allocator
+        designation_allocator = make_designation_allocator(nouns=["ability"])
+        with mock.patch.object(
+            _DesignationAllocator, "get_default", return_value=designation_allocator
+        ):
+            source = create_source_user(
+                db_session=db.session,
+                source_passphrase=PassphraseGenerator.get_default().generate_passphrase(),
+                source_app_storage=app_storage,
+            ).get_db_record()
+
+        # When releasing its designation while the source still exists, nothing changes
+        designation_allocator.release_journalist_designation(
+            db.session, source.journalist_designation
+        )
+        assert designation_allocator.remaining_capacity(db.session) == 2
+
+    def test_word_lists_do_not_contain_duplicates(self, config):
+        with pytest.raises(ValueError):
+            _DesignationAllocator(
+                redis=Redis(**config.REDIS_KWARGS), nouns=["hello", "hello"], adjectives=["hello"]
+            )
+
+    def test_get_default(self, source_app):
+        designation_allocator = _DesignationAllocator.get_default()
+        assert designation_allocator.capacity > 0
+        assert designation_allocator.allocate_journalist_designation(db.session)
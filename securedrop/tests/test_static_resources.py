@@ -0,0 +1,67 @@
+import os
+from unittest import mock
+
+import pytest
+from static_resources import StaticResourceCache
+
+
+def _touch_later(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_value_is_loaded_once_while_file_is_unchanged(tmp_path):
+    path = tmp_path / "source_v3_url"
+    path.write_text("first")
+    cache = StaticResourceCache()
+    load = mock.Mock(side_effect=path.read_text)
+
+    assert cache.get("url", [path], load) == "first"
+    assert cache.get("url", [path], load) == "first"
+    assert load.call_count == 1
+
+
+def test_value_is_reloaded_when_file_changes(tmp_path):
+    path = tmp_path / "source_v3_url"
+    path.write_text("first")
+    cache = StaticResourceCache()
+    assert cache.get("url", [path], path.read_text) == "first"
+
+    # When the file is modified, the new contents are picked up
+    path.write_text("second")
+    _touch_later(path)
+    assert cache.get("url", [path], path.read_text) == "second"
+
+    # And also when it is deleted or created
+    path.unlink()
+    assert cache.get("url", [path], lambda: None) is None
+    path.write_text("third")
+    assert cache.get("url", [path], path.read_text) == "third"
+
+
+def test_values_depending_on_several_files(tmp_path):
+    custom_logo = tmp_path / "custom_logo.png"
+    default_logo = tmp_path / "logo.png"
+    default_logo.write_bytes(b"default")
+    cache = StaticResourceCache()
+
+    def find_logo():
+        return custom_logo.name if custom_logo.is_file() else default_logo.name
+
+    assert cache.get("logo", [custom_logo, default_logo], find_logo) == "logo.png"
+    custom_logo.write_bytes(b"custom")
+    assert cache.get("logo", [custom_logo, default_logo], find_logo) == "custom_logo.png"
+
+
+def test_exceptions_are_not_cached(tmp_path):
+    path = tmp_path / "os-release"
+    cache = StaticResourceCache()
+    load = mock.Mock(side_effect=[FileNotFoundError, "24.04"])
+
+    with pytest.raises(FileNotFoundError):
+        cache.get("os-release", [path], load)
+    assert cache.get("os-release", [path], load) == "24.04"
+
+
+def test_get_default():
+    assert StaticResourceCache.get_default() is StaticResourceCache.get_default()
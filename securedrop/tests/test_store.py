@@ -1,9 +1,11 @@
+import gzip
 import logging
 import os
 import re
 import stat
 import time
 import zipfile
+from io import BytesIO
 from pathlib import Path
 from tempfile import TemporaryDirectory
 from typing import Generator
@@ -15,6 +17,7 @@ from journalist_app import create_app
 from models import Reply, Submission
 from passphrases import PassphraseGenerator
 from rq.job import Job
+from secure_tempfile import SecureTemporaryFile
 from source_user import create_source_user
 from store import Storage, async_add_checksum_for_file, queued_add_checksum_for_file
 from tests import utils
@@ -323,6 +326,69 @@ def test_async_add_checksum_for_file(config, app_storage, db_model):
         assert db_obj.checksum == "sha256:" + expected_hash
 
 
+@pytest.mark.parametrize("read_size", [1, 1024, -1])
+def test_gzip_compressing_reader(read_size):
+    plaintext = os.urandom(64 * 1024) + b"A" * (256 * 1024)
+    reader = store.GzipCompressingReader(BytesIO(plaintext), "upload.txt")
+
+    compressed = b""
+    while True:
+        chunk = reader.read(read_size)
+        if not chunk:
+            break
+        if read_size > 0:
+            assert len(chunk) <= read_size
+        compressed += chunk
+
+    with gzip.GzipFile(fileobj=BytesIO(compressed)) as gzf:
+        assert gzf.read() == plaintext
+    # The original filename is recorded in the gzip header
+    assert b"upload.txt\x00" in compressed[:32]
+
+
+def test_save_file_submission(test_source, app_storage):
+    filesystem_id = test_source["filesystem_id"]
+    plaintext = b"a document submitted by a source"
+    encrypted_file_name = app_storage.save_file_submission(
+        filesystem_id, 1, "conscientious-objector", "doc.txt", BytesIO(plaintext)
+    )
+    assert encrypted_file_name == "1-conscientious-objector-doc.gz.gpg"
+
+    encrypted_file_path = Path(app_storage.path(filesystem_id, encrypted_file_name))
+    gzipped = utils.decrypt_as_journalist(encrypted_file_path.read_bytes())
+    assert gzip.decompress(gzipped) == plaintext
+
+
+def test_save_message_submissions(test_source, app_storage):
+    filesystem_id = test_source["filesystem_id"]
+    messages = ["first message", "second message", "third message"]
+    filenames = app_storage.save_message_submissions(
+        filesystem_id, 3, "conscientious-objector", messages
+    )
+    assert filenames == [
+        "3-conscientious-objector-msg.gpg",
+        "4-conscientious-objector-msg.gpg",
+        "5-conscientious-objector-msg.gpg",
+    ]
+    for filename, message in zip(filenames, messages):
+        encrypted_message_path = Path(app_storage.path(filesystem_id, filename))
+        assert utils.decrypt_as_journalist(encrypted_message_path.read_bytes()) == message.encode()
+
+
+def test_save_file_submission_spooled_to_disk(test_source, app_storage):
+    filesystem_id = test_source["filesystem_id"]
+    plaintext = os.urandom(1024 * 1024)
+    with SecureTemporaryFile("/tmp") as stf:
+        stf.write(plaintext)
+        encrypted_file_name = app_storage.save_file_submission(
+            filesystem_id, 1, "conscientious-objector", "doc.bin", stf
+        )
+
+    encrypted_file_path = Path(app_storage.path(filesystem_id, encrypted_file_name))
+    gzipped = utils.decrypt_as_journalist(encrypted_file_path.read_bytes())
+    assert gzip.decompress(gzipped) == plaintext
+
+
 def test_path_configuration_is_immutable(test_storage):
     """
     Check that the store's paths cannot be changed.
@@ -3,7 +3,7 @@ import os
 
 from db import db
 from management import submissions
-from models import Submission
+from models import Change, Source, Submission
 from tests import utils
 
 
@@ -31,12 +31,25 @@ def test_delete_disconnected_db_submissions(journalist_app, app_storage, config)
         assert disconnects[0].filename == source.submissions[0].filename
 
         # remove the disconnected Submission
+        disconnected_uuid = disconnects[0].uuid
+        cursor = Change.latest_cursor()
         args = argparse.Namespace(force=True, store_dir=config.STORE_DIR)
         submissions.delete_disconnected_db_submissions(args)
 
         assert db.session.query(Submission).filter(Submission.id == submission_id).count() == 0
         assert db.session.query(Submission).filter(Submission.source_id == source_id).count() == 1
 
+        # and that the source's counters no longer include it
+        source = db.session.query(Source).get(source_id)
+        assert (source.num_messages, source.num_unread) == (1, 1)
+
+        # and that API clients are told about it
+        latest = Change.latest_cursor()
+        assert Change.changed_uuids(Change.SUBMISSION, cursor, latest).all() == [
+            (disconnected_uuid,)
+        ]
+        assert Change.changed_uuids(Change.SOURCE, cursor, latest).all() == [(source.uuid,)]
+
 
 def test_delete_disconnected_fs_submissions(journalist_app, app_storage, config):
     """
@@ -1,13 +1,17 @@
 import subprocess
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from unittest import mock
 
 import journalist_app
+import pytest
 import source_app
 import template_filters
+from babel import Locale, dates, units
 from db import db
 from flask import session
 from tests.test_i18n import create_config_for_i18n_test
+from tests.utils.i18n import get_supported_locales
 
 
 def verify_rel_datetime_format(app):
@@ -70,6 +74,50 @@ def verify_filesizeformat(app):
         assert "072\u202fTo" in template_filters.filesizeformat(value)
 
 
+@pytest.mark.parametrize("locale", get_supported_locales())
+def test_filters_match_babel(locale):
+    # The filters format with patterns looked up once per locale, which must give Babel's output
+    babel_locale = Locale.parse(locale)
+    with mock.patch.object(template_filters, "get_locale", return_value=babel_locale):
+        dt = datetime(2016, 1, 1, 1, 1, 1, 123456)
+        for value in (
+            dt,
+            dt.replace(tzinfo=timezone.utc),
+            dt.replace(tzinfo=timezone(timedelta(hours=2))),
+        ):
+            for fmt in (
+                "full",
+                "long",
+                "medium",
+                "short",
+                "yyyy-MM-dd HH:mm:ss.SSS",
+                "h:mm a zzzz xxx",
+            ):
+                assert template_filters.rel_datetime_format(value, fmt) == dates.format_datetime(
+                    value, fmt, locale=babel_locale
+                )
+
+        for value in (0, 1, 2, 5, 1023):
+            assert template_filters.filesizeformat(value) == units.format_unit(
+                value, "byte", length="long", locale=babel_locale
+            )
+        for value, unit, size in (
+            (1024, "digital-kilobyte", 1.0),
+            (1536, "digital-kilobyte", 1.5),
+            (3 * 1024**2, "digital-megabyte", 3.0),
+            (3 * 1024**4, "digital-terabyte", 3.0),
+        ):
+            assert template_filters.filesizeformat(value) == units.format_unit(
+                size, unit, length="short", locale=babel_locale
+            )
+
+
+def test_html_datetime_format():
+    assert template_filters.html_datetime_format(datetime(2016, 1, 1, 1, 1, 1, 123456)) == (
+        "2016-01-01 01:01:01.123"
+    )
+
+
 # We can't use fixtures because these options are set at app init time, and we
 # can't modify them after.
 def test_source_filters():
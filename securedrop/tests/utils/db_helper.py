@@ -149,6 +149,7 @@ def submit(storage, source, num_submissions, submission_type="message"):
         submissions.append(submission)
         db.session.add(source)
         db.session.add(submission)
+        source.count_new_submission(submission)
 
     db.session.commit()
     return submissions
@@ -1,6 +1,7 @@
 import collections
 import contextlib
 import functools
+import json
 import os
 from pathlib import Path
 from typing import Dict, Generator, Iterable, List, Optional, Tuple
@@ -21,6 +22,16 @@ def get_test_locales(default_locale: str = "en_US") -> List[str]:
     return sorted(list(locales))
 
 
+def get_supported_locales(default_locale: str = "en_US") -> List[str]:
+    """
+    Returns every locale SecureDrop can be configured to support.
+    """
+    i18n_conf = Path(__file__).absolute().parent.parent.parent / "i18n.json"
+    locales = set(json.loads(i18n_conf.read_text())["supported_locales"])
+    locales.add(default_locale)
+    return sorted(locales)
+
+
 @functools.lru_cache(maxsize=None)
 def get_plural_tests() -> Dict[str, Tuple[int, ...]]:
     return collections.defaultdict(
@@ -0,0 +1,35 @@
+"""Testing utilities to check which SQL queries a piece of code makes."""
+
+import re
+from contextlib import contextmanager
+
+from db import db
+from sqlalchemy import event
+
+
+class RecordedQueries(list):
+    """The SQL statements executed while recording."""
+
+    def from_table(self, table_name):
+        """The SELECT statements reading from the given table."""
+        pattern = re.compile(rf"^\s*SELECT\b.*\bFROM {table_name}\b", re.DOTALL)
+        return [statement for statement in self if pattern.search(statement)]
+
+
+@contextmanager
+def record_queries():
+    """Record the statements executed through the app's database engine.
+
+    Must be used within an app context.
+    """
+    queries = RecordedQueries()
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        queries.append(statement)
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)